@@ -0,0 +1,190 @@
+"""
+Utilitários compartilhados pelos servidores assíncronos (ASGI)
+"""
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse as StarletteJSONResponse, Response
+from starlette.routing import Match, Route
+
+import metrics
+from profiler import UNMATCHED, SamplingProfiler, admin_enabled, profiler_from_env
+from compression import Compressor, compressor_from_env, encoded_etag, server_timing
+from serializers import serializer_from_env
+
+
+class JSONResponse(StarletteJSONResponse):
+    """
+    Resposta JSON com a mesma serialização do jsonify do Flask
+    (chaves ordenadas, separadores compactos, ASCII e quebra de linha final),
+    para que o tamanho das respostas seja idêntico entre as variantes
+    síncrona e assíncrona; o serializador é o mesmo (JSON_SERIALIZER)
+    """
+
+    serializer = serializer_from_env()
+
+    def render(self, content) -> bytes:
+        return self.serializer.encode(content)
+
+
+class CompressionMiddleware:
+    """
+    Equivalente ASGI do compression.enable_compression dos servidores Flask
+    Respostas em partes (more_body) são repassadas sem compressão
+    """
+
+    def __init__(self, app, compressor: Compressor):
+        self.app = app
+        self.compressor = compressor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.compressor.enabled:
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get('accept-encoding')
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            headers = MutableHeaders(raw=start['headers'])
+            if (not message.get('more_body') and 'content-encoding' not in headers
+                    and 200 <= start['status'] and start['status'] not in (204, 304)):
+                headers.add_vary_header('Accept-Encoding')
+                body, encoding, elapsed_ms = self.compressor.compress(message.get('body', b''),
+                                                                      accept_encoding)
+                if encoding:
+                    headers['Content-Encoding'] = encoding
+                    headers['Content-Length'] = str(len(body))
+                    if 'etag' in headers:
+                        headers['ETag'] = encoded_etag(headers['etag'], encoding)
+                    headers.append('Server-Timing', server_timing(encoding, elapsed_ms))
+                    message = {**message, 'body': body}
+            await send(start)
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+
+def route_path(scope) -> str:
+    """Caminho do Route que atende a requisição (antes do roteamento do Starlette)"""
+    for route in getattr(scope.get('app'), 'routes', ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED
+
+
+class MetricsMiddleware:
+    """
+    Equivalente ASGI do metrics.enable_metrics dos servidores Flask
+    A rota é o caminho do Route que atendeu a requisição; os endpoints podem
+    definir request.state.metrics_operation e request.state.metrics_error
+    """
+
+    def __init__(self, app, request_metrics: metrics.RequestMetrics, path: str = '/metrics'):
+        self.app = app
+        self.metrics = request_metrics
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] == self.path:
+            await self.app(scope, receive, send)
+            return
+        route = route_path(scope)
+        start = self.metrics.start(route)
+        status = 500
+        size = 0
+
+        async def send_measured(message):
+            nonlocal status, size
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                headers = MutableHeaders(raw=message['headers'])
+                headers.append('Server-Timing', metrics.server_timing(elapsed_ms))
+            elif message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_measured)
+        finally:
+            state = scope.get('state', {})
+            self.metrics.finish(route, scope['method'], status, size, start,
+                                state.get('metrics_operation', ''), state.get('metrics_error'))
+
+
+class ProfilingMiddleware:
+    """
+    Equivalente ASGI do profiler.enable_profiling: rotula a task da requisição
+    com a rota (os endpoints podem acrescentar detalhes com profiler.annotate)
+    """
+
+    def __init__(self, app, profiler: SamplingProfiler, prefix: str = '/admin/profile'):
+        self.app = app
+        self.profiler = profiler
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if (scope['type'] != 'http' or scope['path'].startswith(self.prefix)
+                or not (self.profiler.running or self.profiler.autostart)):
+            await self.app(scope, receive, send)
+            return
+        self.profiler.enter(route_path(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.leave()
+
+
+request_metrics = metrics.RequestMetrics()
+profiler = profiler_from_env()
+
+
+async def metrics_endpoint(request):
+    """Métricas no formato de texto do Prometheus"""
+    return Response(request_metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+async def profile_status(request):
+    return JSONResponse(profiler.status())
+
+
+async def profile_start(request):
+    data = await request.json() if await request.body() else {}
+    profiler.start(data.get('interval_ms'))
+    return JSONResponse(profiler.status())
+
+
+async def profile_stop(request):
+    data = await request.json() if await request.body() else {}
+    profiler.stop()
+    files = profiler.write(data.get('name') or time.strftime('%Y%m%d-%H%M%S'))
+    return JSONResponse({**profiler.status(), 'files': files})
+
+
+# Rotas de controle do profiler (PROFILE_ADMIN=1 ou PROFILE=1)
+PROFILER_ROUTES = [
+    Route('/admin/profile', profile_status, methods=['GET']),
+    Route('/admin/profile/start', profile_start, methods=['POST']),
+    Route('/admin/profile/stop', profile_stop, methods=['POST']),
+] if admin_enabled() else []
+
+
+# Equivalente ao CORS(app), às métricas, ao profiler e à compressão dos servidores
+# Flask (as métricas envolvem a compressão, como nos servidores Flask)
+MIDDLEWARE = [
+    Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+    Middleware(MetricsMiddleware, request_metrics=request_metrics),
+    Middleware(ProfilingMiddleware, profiler=profiler),
+    Middleware(CompressionMiddleware, compressor=compressor_from_env())
+]
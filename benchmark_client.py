@@ -1,19 +1,133 @@
 """
 Cliente de teste para comparar performance REST vs GraphQL
 """
+import argparse
+import hashlib
 import requests
+import threading
 import time
 import json
-from typing import List, Dict, Tuple
+from contextlib import contextmanager
+from typing import Callable, List, Dict, Optional, Tuple
+
+from load_generator import LoadEngine
+from results_writer import ResultsWriter
+from timed_http import connect_time_ms, create_session, reset_connect_time, server_timing_ms
+
+# Erro devolvido pelo servidor quando o hash da persisted query é desconhecido
+PERSISTED_QUERY_NOT_FOUND = 'PersistedQueryNotFound'
+
+# Cenários do experimento: nome -> (endpoint REST, query GraphQL)
+SCENARIOS = {
+    # Cenário 1: REST retorna todos os campos do usuário; GraphQL solicita apenas nome e email
+    'simple_user': ("/api/users/1", """
+        {
+            user(id: 1) {
+                name
+                email
+            }
+        }
+        """),
+    # Cenário 2: REST retorna usuário com posts completos e comentários;
+    # GraphQL solicita apenas campos específicos
+    'user_with_posts': ("/api/users/1/full", """
+        {
+            user(id: 1) {
+                name
+                email
+                posts(limit: 5) {
+                    title
+                }
+            }
+        }
+        """),
+    # Cenário 3: REST retorna tudo; GraphQL solicita estrutura aninhada específica
+    'nested_data': ("/api/users/1/full", """
+        {
+            user(id: 1) {
+                name
+                email
+                posts(limit: 5) {
+                    title
+                    likes
+                    comments(limit: 3) {
+                        author
+                        text
+                    }
+                }
+            }
+        }
+        """),
+}
+
+# Endpoints REST com sparse fieldsets que retornam os mesmos campos das queries GraphQL
+SPARSE_REST_ENDPOINTS = {
+    'simple_user': "/api/users/1?fields=name,email",
+    'user_with_posts': "/api/users/1/full?fields=name,email,posts.title",
+    'nested_data': "/api/users/1/full?fields=name,email,posts.title,posts.likes,"
+                   "posts.comments.author,posts.comments.text",
+}
+
+
+def reused_fraction(connect_times: List[float]) -> float:
+    """Fração das requisições que reutilizaram uma conexão (connect_ms zero)"""
+    if not connect_times:
+        return 0.0
+    return sum(1 for connect_ms in connect_times if connect_ms == 0) / len(connect_times)
 
 
 class BenchmarkClient:
     """Cliente para realizar benchmarks entre REST e GraphQL"""
     
     def __init__(self, rest_url: str = "http://localhost:5000", 
-                 graphql_url: str = "http://localhost:5001/graphql"):
+                 graphql_url: str = "http://localhost:5001/graphql",
+                 persisted_queries: bool = False, cold_connections: bool = False,
+                 results_writer: Optional[ResultsWriter] = None,
+                 conditional_requests: bool = False, sparse_rest: bool = False,
+                 accept_encoding: Optional[str] = None, profile: bool = False):
         self.rest_url = rest_url
         self.graphql_url = graphql_url
+        # Envia apenas o hash das queries GraphQL (Automatic Persisted Queries)
+        self.persisted_queries = persisted_queries
+        # Por padrão cada thread reutiliza conexões keep-alive de uma sessão;
+        # com cold_connections=True toda requisição abre uma conexão nova
+        self.cold_connections = cold_connections
+        # Requisições REST condicionais: reenvia o último ETag recebido (If-None-Match)
+        # e conta o 304 Not Modified como resposta de 0 bytes de corpo
+        self.conditional_requests = conditional_requests
+        # Usa ?fields= nos endpoints REST (SPARSE_REST_ENDPOINTS) em vez das respostas completas
+        self.sparse_rest = sparse_rest
+        # Accept-Encoding enviado em todas as requisições (None = padrão do requests)
+        self.accept_encoding = accept_encoding
+        # Coleta um profile por cenário nos servidores (exige PROFILE_ADMIN=1 neles)
+        self.profile = profile
+        # Se informado, cada medição é gravada no arquivo JSONL assim que é feita
+        self.results_writer = results_writer
+        # Detalhes da última medição (bytes enviados, round trips, status, tempo
+        # de conexão) e sessão HTTP, por thread para permitir medições concorrentes
+        self._local = threading.local()
+    
+    @property
+    def last_measurement(self) -> Dict:
+        return getattr(self._local, 'last_measurement', {})
+    
+    @last_measurement.setter
+    def last_measurement(self, value: Dict):
+        self._local.last_measurement = value
+    
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Envia a requisição pela sessão da thread (ou por uma sessão nova, no modo frio)"""
+        if self.accept_encoding is not None:
+            kwargs['headers'] = {'Accept-Encoding': self.accept_encoding,
+                                 **(kwargs.get('headers') or {})}
+        if self.cold_connections:
+            with create_session(pool_size=1) as session:
+                return session.request(method, url, **kwargs)
+        
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = create_session()
+        return session.request(method, url, **kwargs)
     
     def warmup(self, repetitions: int = 5):
         """
@@ -23,14 +137,14 @@ class BenchmarkClient:
         for i in range(repetitions):
             # Warm-up REST
             try:
-                requests.get(f"{self.rest_url}/api/users/1")
+                self._send('GET', f"{self.rest_url}/api/users/1")
             except:
                 pass
             
             # Warm-up GraphQL
             try:
                 query = '{ user(id: 1) { name } }'
-                requests.post(self.graphql_url, json={'query': query})
+                self._send('POST', self.graphql_url, json={'query': query})
             except:
                 pass
         
@@ -39,59 +153,127 @@ class BenchmarkClient:
     def measure_rest_request(self, endpoint: str) -> Tuple[float, int]:
         """
         Mede tempo de resposta e tamanho da resposta para REST
+        O tempo de abertura de conexão fica em last_measurement['connect_ms']
         Retorna: (tempo_ms, tamanho_bytes)
         """
+        url = f"{self.rest_url}{endpoint}"
+        headers = {}
+        etags = None
+        if self.conditional_requests:
+            etags = getattr(self._local, 'etags', None)
+            if etags is None:
+                etags = self._local.etags = {}
+            if url in etags:
+                headers['If-None-Match'] = etags[url]
+        
+        reset_connect_time()
         start_time = time.perf_counter()
-        response = requests.get(f"{self.rest_url}{endpoint}")
+        response = self._send('GET', url, headers=headers)
         end_time = time.perf_counter()
         
         response_time_ms = (end_time - start_time) * 1000
         response_size_bytes = len(response.content)
+        if etags is not None and response.headers.get('ETag'):
+            etags[url] = response.headers['ETag']
+        
+        self._record_measurement(response, response_time_ms, request_bytes=0, round_trips=1)
         
         return response_time_ms, response_size_bytes
     
-    def measure_graphql_request(self, query: str, variables: dict = None) -> Tuple[float, int]:
+    def measure_graphql_request(self, query: str, variables: dict = None,
+                                persisted: bool = None) -> Tuple[float, int]:
         """
         Mede tempo de resposta e tamanho da resposta para GraphQL
+        Com persisted=True envia apenas o hash da query (APQ); se o servidor
+        ainda não conhece o hash, reenvia hash + texto, dentro do tempo medido
         Retorna: (tempo_ms, tamanho_bytes)
         """
-        payload = {'query': query}
+        if persisted is None:
+            persisted = self.persisted_queries
+        
+        payload = {}
+        if persisted:
+            query_hash = hashlib.sha256(query.encode('utf-8')).hexdigest()
+            payload['extensions'] = {'persistedQuery': {'version': 1, 'sha256Hash': query_hash}}
+        else:
+            payload['query'] = query
         if variables:
             payload['variables'] = variables
         
+        reset_connect_time()
         start_time = time.perf_counter()
-        response = requests.post(self.graphql_url, json=payload)
+        response = self._send('POST', self.graphql_url, json=payload)
+        request_bytes = len(response.request.body or b'')
+        round_trips = 1
+        if persisted and PERSISTED_QUERY_NOT_FOUND in response.json().get('errors', []):
+            payload['query'] = query
+            response = self._send('POST', self.graphql_url, json=payload)
+            request_bytes += len(response.request.body or b'')
+            round_trips += 1
         end_time = time.perf_counter()
         
         response_time_ms = (end_time - start_time) * 1000
         response_size_bytes = len(response.content)
+        self._record_measurement(response, response_time_ms, request_bytes, round_trips)
         
         return response_time_ms, response_size_bytes
     
-    def run_scenario_simple_user(self, repetitions: int = 100) -> Dict:
+    def _record_measurement(self, response: requests.Response, response_time_ms: float,
+                            request_bytes: int, round_trips: int):
         """
-        Cenário 1: Busca simples - Nome e email do usuário
+        Guarda os detalhes da medição, separando o tempo de abertura de conexão
+        (connect_ms, zero quando a conexão keep-alive é reutilizada) do tempo de
+        envio, processamento no servidor e recebimento (request_ms)
+        O tamanho retornado pelas medições é o corpo decodificado; wire_bytes é o
+        corpo como trafegou na rede (comprimido, se o servidor comprimiu) e
+        compress_ms o tempo de compressão informado pelo servidor (Server-Timing)
+        server_ms é o tempo total no servidor (Server-Timing `app`, None se ausente);
+        a diferença para o tempo medido é rede + cliente
         """
-        print(f"\n=== Cenário 1: Busca Simples (Nome e Email) ===")
-        print(f"Executando {repetitions} repetições...\n")
-        
+        connect_ms = connect_time_ms()
+        timings = server_timing_ms(response.headers.get('Server-Timing'))
+        try:
+            wire_bytes = response.raw.tell()
+        except (AttributeError, OSError):
+            wire_bytes = len(response.content)
+        self.last_measurement = {
+            'request_bytes': request_bytes,
+            'round_trips': round_trips,
+            'status': response.status_code,
+            'connect_ms': connect_ms,
+            'request_ms': response_time_ms - connect_ms,
+            'wire_bytes': wire_bytes,
+            'content_encoding': response.headers.get('Content-Encoding', 'identity'),
+            'compress_ms': timings.get('compress', 0.0),
+            'server_ms': timings.get('app')
+        }
+    
+    def _stream(self, api: str, scenario: str, response_time_ms: float, response_size_bytes: int):
+        """Grava a medição no arquivo de resultados incremental, se houver"""
+        if self.results_writer is not None:
+            self.results_writer.write(api, scenario, response_time_ms, response_size_bytes,
+                                      connect_ms=self.last_measurement.get('connect_ms'),
+                                      wire_bytes=self.last_measurement.get('wire_bytes'),
+                                      compress_ms=self.last_measurement.get('compress_ms'),
+                                      server_ms=self.last_measurement.get('server_ms'))
+    
+    def _run_scenario(self, scenario: str, rest_endpoint: str, graphql_query: str,
+                      repetitions: int) -> Dict:
+        """Executa um cenário alternando requisições REST e GraphQL"""
+        rest_endpoint = self._rest_endpoint(scenario, rest_endpoint)
         rest_times = []
         rest_sizes = []
+        rest_wire_sizes = []
+        rest_compress_times = []
+        rest_server_times = []
+        rest_connect_times = []
         graphql_times = []
         graphql_sizes = []
-        
-        # REST: retorna todos os campos do usuário
-        rest_endpoint = "/api/users/1"
-        
-        # GraphQL: solicita apenas nome e email
-        graphql_query = """
-        {
-            user(id: 1) {
-                name
-                email
-            }
-        }
-        """
+        graphql_wire_sizes = []
+        graphql_compress_times = []
+        graphql_server_times = []
+        graphql_request_sizes = []
+        graphql_connect_times = []
         
         for i in range(repetitions):
             # Teste REST
@@ -99,6 +281,11 @@ class BenchmarkClient:
                 rest_time, rest_size = self.measure_rest_request(rest_endpoint)
                 rest_times.append(rest_time)
                 rest_sizes.append(rest_size)
+                rest_wire_sizes.append(self.last_measurement['wire_bytes'])
+                rest_compress_times.append(self.last_measurement['compress_ms'])
+                rest_server_times.append(self.last_measurement['server_ms'])
+                rest_connect_times.append(self.last_measurement['connect_ms'])
+                self._stream('rest', scenario, rest_time, rest_size)
             except Exception as e:
                 print(f"Erro REST na iteração {i+1}: {e}")
             
@@ -107,18 +294,56 @@ class BenchmarkClient:
                 gql_time, gql_size = self.measure_graphql_request(graphql_query)
                 graphql_times.append(gql_time)
                 graphql_sizes.append(gql_size)
+                graphql_wire_sizes.append(self.last_measurement['wire_bytes'])
+                graphql_compress_times.append(self.last_measurement['compress_ms'])
+                graphql_server_times.append(self.last_measurement['server_ms'])
+                graphql_request_sizes.append(self.last_measurement['request_bytes'])
+                graphql_connect_times.append(self.last_measurement['connect_ms'])
+                self._stream('graphql', scenario, gql_time, gql_size)
             except Exception as e:
                 print(f"Erro GraphQL na iteração {i+1}: {e}")
             
             if (i + 1) % 20 == 0:
                 print(f"Progresso: {i+1}/{repetitions}")
         
+        # Keep-alive só economiza conexões se o servidor as mantiver abertas: o
+        # servidor do Werkzeug (Flask) fala HTTP/1.1, mas desde a versão 2.1 envia
+        # Connection: close em toda resposta
+        rest_reused = reused_fraction(rest_connect_times)
+        graphql_reused = reused_fraction(graphql_connect_times)
+        if not self.cold_connections:
+            print(f"Conexões reutilizadas: REST {rest_reused:.0%}, GraphQL {graphql_reused:.0%}")
+        
         return {
-            'scenario': 'simple_user',
-            'rest': {'times': rest_times, 'sizes': rest_sizes},
-            'graphql': {'times': graphql_times, 'sizes': graphql_sizes}
+            'scenario': scenario,
+            'connections': 'cold' if self.cold_connections else 'keep-alive',
+            'conditional': self.conditional_requests,
+            'sparse_rest': self.sparse_rest,
+            'accept_encoding': self.accept_encoding,
+            'rest': {'times': rest_times, 'sizes': rest_sizes, 'wire_sizes': rest_wire_sizes,
+                     'compress_times': rest_compress_times,
+                     'server_times': rest_server_times,
+                     'connect_times': rest_connect_times,
+                     'reused_connections': rest_reused},
+            'graphql': {'times': graphql_times, 'sizes': graphql_sizes,
+                        'wire_sizes': graphql_wire_sizes,
+                        'compress_times': graphql_compress_times,
+                        'server_times': graphql_server_times,
+                        'request_sizes': graphql_request_sizes,
+                        'connect_times': graphql_connect_times,
+                        'reused_connections': graphql_reused}
         }
     
+    def run_scenario_simple_user(self, repetitions: int = 100) -> Dict:
+        """
+        Cenário 1: Busca simples - Nome e email do usuário
+        """
+        print(f"\n=== Cenário 1: Busca Simples (Nome e Email) ===")
+        print(f"Executando {repetitions} repetições...\n")
+        
+        rest_endpoint, graphql_query = SCENARIOS['simple_user']
+        return self._run_scenario('simple_user', rest_endpoint, graphql_query, repetitions)
+    
     def run_scenario_user_with_posts(self, repetitions: int = 100) -> Dict:
         """
         Cenário 2: Busca complexa - Usuário com títulos de 5 posts
@@ -126,52 +351,8 @@ class BenchmarkClient:
         print(f"\n=== Cenário 2: Busca Complexa (Usuário + Posts) ===")
         print(f"Executando {repetitions} repetições...\n")
         
-        rest_times = []
-        rest_sizes = []
-        graphql_times = []
-        graphql_sizes = []
-        
-        # REST: retorna usuário completo com posts completos e comentários
-        rest_endpoint = "/api/users/1/full"
-        
-        # GraphQL: solicita apenas campos específicos
-        graphql_query = """
-        {
-            user(id: 1) {
-                name
-                email
-                posts(limit: 5) {
-                    title
-                }
-            }
-        }
-        """
-        
-        for i in range(repetitions):
-            # Teste REST
-            try:
-                rest_time, rest_size = self.measure_rest_request(rest_endpoint)
-                rest_times.append(rest_time)
-                rest_sizes.append(rest_size)
-            except Exception as e:
-                print(f"Erro REST na iteração {i+1}: {e}")
-            
-            # Teste GraphQL
-            try:
-                gql_time, gql_size = self.measure_graphql_request(graphql_query)
-                graphql_times.append(gql_time)
-                graphql_sizes.append(gql_size)
-            except Exception as e:
-                print(f"Erro GraphQL na iteração {i+1}: {e}")
-            
-            if (i + 1) % 20 == 0:
-                print(f"Progresso: {i+1}/{repetitions}")
-        
-        return {
-            'scenario': 'user_with_posts',
-            'rest': {'times': rest_times, 'sizes': rest_sizes},
-            'graphql': {'times': graphql_times, 'sizes': graphql_sizes}
-        }
+        rest_endpoint, graphql_query = SCENARIOS['user_with_posts']
+        return self._run_scenario('user_with_posts', rest_endpoint, graphql_query, repetitions)
     
     def run_scenario_nested_data(self, repetitions: int = 100) -> Dict:
         """
@@ -180,57 +361,102 @@ class BenchmarkClient:
         print(f"\n=== Cenário 3: Busca Aninhada (Usuário + Posts + Comentários) ===")
         print(f"Executando {repetitions} repetições...\n")
         
-        rest_times = []
-        rest_sizes = []
-        graphql_times = []
-        graphql_sizes = []
-        
-        # REST: retorna tudo
-        rest_endpoint = "/api/users/1/full"
+        rest_endpoint, graphql_query = SCENARIOS['nested_data']
+        return self._run_scenario('nested_data', rest_endpoint, graphql_query, repetitions)
+    
+    def _rest_endpoint(self, scenario: str, endpoint: str) -> str:
+        """Endpoint REST do cenário (com sparse fieldsets, se ativados)"""
+        return SPARSE_REST_ENDPOINTS[scenario] if self.sparse_rest else endpoint
+    
+    def _checked(self, measure: Callable[[], Tuple[float, int]], api: str,
+                 scenario: str) -> Callable[[], Tuple[float, int]]:
+        """
+        Envolve uma medição para que respostas HTTP de erro contem como falha
+        e medições bem-sucedidas sejam gravadas no arquivo de resultados
+        """
+        def request_fn():
+            result = measure()
+            status = self.last_measurement.get('status', 200)
+            if status >= 400:
+                raise RuntimeError(f"HTTP {status}")
+            self._stream(api, scenario, *result)
+            return result
+        return request_fn
+    
+    def run_load_scenario(self, scenario: str, mode: str = 'closed', concurrency: int = 10,
+                          duration: float = 10.0, rate: Optional[float] = None,
+                          keep_samples: bool = True) -> Dict:
+        """
+        Executa um cenário sob carga concorrente, primeiro REST e depois GraphQL
+        mode='closed': `concurrency` usuários virtuais em loop durante `duration` segundos
+        mode='open': chegadas a `rate` req/s durante `duration` segundos
+        keep_samples=False guarda apenas os histogramas (memória constante)
         
-        # GraphQL: solicita estrutura aninhada específica
-        graphql_query = """
-        {
-            user(id: 1) {
-                name
-                email
-                posts(limit: 5) {
-                    title
-                    likes
-                    comments(limit: 3) {
-                        author
-                        text
-                    }
-                }
-            }
-        }
+        Com as amostras, cada API recebe também `times` e `sizes` (requisições
+        bem-sucedidas, como no loop sequencial) para o statistical_analysis; sem
+        elas, `stream` aponta o JSONL com as medições individuais
         """
+        rest_endpoint, graphql_query = SCENARIOS[scenario]
+        rest_endpoint = self._rest_endpoint(scenario, rest_endpoint)
+        print(f"\n=== Carga {mode}-loop: {scenario} (concorrência {concurrency}) ===")
         
-        for i in range(repetitions):
-            # Teste REST
-            try:
-                rest_time, rest_size = self.measure_rest_request(rest_endpoint)
-                rest_times.append(rest_time)
-                rest_sizes.append(rest_size)
-            except Exception as e:
-                print(f"Erro REST na iteração {i+1}: {e}")
+        result = {'scenario': scenario, 'sparse_rest': self.sparse_rest}
+        if self.results_writer is not None:
+            result['stream'] = self.results_writer.path
+        for api, measure in (
+            ('rest', lambda: self.measure_rest_request(rest_endpoint)),
+            ('graphql', lambda: self.measure_graphql_request(graphql_query)),
+        ):
+            engine = LoadEngine(self._checked(measure, api, scenario), concurrency, keep_samples)
+            if mode == 'open':
+                if not rate:
+                    raise ValueError("O modo open-loop exige uma taxa de chegada (rate)")
+                result[api] = engine.run_open_loop(rate, duration)
+            else:
+                result[api] = engine.run_closed_loop(duration)
             
-            # Teste GraphQL
-            try:
-                gql_time, gql_size = self.measure_graphql_request(graphql_query)
-                graphql_times.append(gql_time)
-                graphql_sizes.append(gql_size)
-            except Exception as e:
-                print(f"Erro GraphQL na iteração {i+1}: {e}")
-            
-            if (i + 1) % 20 == 0:
-                print(f"Progresso: {i+1}/{repetitions}")
+            summary = result[api]
+            if 'samples' in summary:
+                succeeded = [sample for sample in summary['samples'] if not sample['error']]
+                summary['times'] = [sample['latency_ms'] for sample in succeeded]
+                summary['sizes'] = [sample['size_bytes'] for sample in succeeded]
+            # No modo aberto, os percentis reportados incluem o tempo de fila
+            latency = summary.get('corrected_latency_ms', summary['latency_ms'])
+            print(f"  {api.upper():8} {summary['throughput_rps']:8.1f} req/s  "
+                  f"p50 {latency['p50']:7.2f} ms  "
+                  f"p99 {latency['p99']:7.2f} ms  "
+                  f"p99.9 {latency['p99.9']:7.2f} ms  "
+                  f"erros {summary['error_rate']*100:.1f}%")
         
-        return {
-            'scenario': 'nested_data',
-            'rest': {'times': rest_times, 'sizes': rest_sizes},
-            'graphql': {'times': graphql_times, 'sizes': graphql_sizes}
-        }
+        return result
+    
+    @contextmanager
+    def profiling(self, scenario: str):
+        """
+        Amostra a CPU dos dois servidores durante o bloco; ao sair, cada servidor
+        grava as pilhas em <PROFILE_DIR>/<cenário>/ e o dicionário produzido
+        recebe os arquivos gravados por API
+        """
+        profiles = {}
+        if not self.profile:
+            yield profiles
+            return
+        admin_urls = {'rest': f"{self.rest_url}/admin/profile",
+                      'graphql': f"{self.graphql_url.rsplit('/graphql', 1)[0]}/admin/profile"}
+        for api, url in admin_urls.items():
+            response = requests.post(f"{url}/start", json={}, timeout=10)
+            if response.status_code == 404:
+                raise RuntimeError(f"Profiler indisponível em {url} (inicie o servidor com PROFILE_ADMIN=1)")
+            response.raise_for_status()
+        try:
+            yield profiles
+        finally:
+            for api, url in admin_urls.items():
+                response = requests.post(f"{url}/stop", json={'name': scenario}, timeout=30)
+                response.raise_for_status()
+                profiles[api] = response.json()['files']
+                print(f"  Profile {api.upper()}: {response.json()['samples']} amostras, "
+                      f"{len(profiles[api])} arquivo(s)")
     
     def save_results(self, results: List[Dict], filename: str = "results.json"):
         """Salva resultados em arquivo JSON"""
@@ -240,19 +466,73 @@ class BenchmarkClient:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark REST vs GraphQL")
+    parser.add_argument('--rest-url', default="http://localhost:5000")
+    parser.add_argument('--graphql-url', default="http://localhost:5001/graphql")
+    parser.add_argument('--output', default="results.json")
+    parser.add_argument('--stream', default="results.jsonl",
+                        help="Arquivo JSONL gravado incrementalmente ('' desativa)")
+    parser.add_argument('--append', action='store_true',
+                        help="Continua o arquivo JSONL existente em vez de recriá-lo")
+    parser.add_argument('--persisted', action='store_true',
+                        help="Envia apenas o hash das queries GraphQL (persisted queries)")
+    parser.add_argument('--cold', action='store_true',
+                        help="Abre uma conexão nova por requisição (sem keep-alive)")
+    parser.add_argument('--conditional', action='store_true',
+                        help="Requisições REST com If-None-Match (mede o ganho de 304 Not Modified; "
+                             "servidores com RESPONSE_CACHE_SIZE > 0)")
+    parser.add_argument('--accept-encoding', default=None,
+                        help="Accept-Encoding das requisições (ex.: gzip, br, zstd, identity)")
+    parser.add_argument('--sparse-rest', action='store_true',
+                        help="Endpoints REST com ?fields= equivalentes às queries GraphQL")
+    parser.add_argument('--load', choices=['closed', 'open'], default=None,
+                        help="Executa os cenários sob carga concorrente em vez do loop sequencial")
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help="Usuários virtuais (closed) ou requisições simultâneas (open)")
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help="Duração de cada execução de carga em segundos")
+    parser.add_argument('--rate', type=float, default=None,
+                        help="Taxa de chegada em req/s (modo open)")
+    parser.add_argument('--no-samples', action='store_true',
+                        help="No modo de carga, guarda apenas histogramas (testes longos)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Coleta um profile de CPU por cenário (servidores com PROFILE_ADMIN=1)")
+    args = parser.parse_args()
+    
     # Exemplo de uso
-    client = BenchmarkClient()
+    writer = ResultsWriter(args.stream, append=args.append) if args.stream else None
+    client = BenchmarkClient(args.rest_url, args.graphql_url, persisted_queries=args.persisted,
+                             cold_connections=args.cold, results_writer=writer,
+                             conditional_requests=args.conditional,
+                             sparse_rest=args.sparse_rest,
+                             accept_encoding=args.accept_encoding,
+                             profile=args.profile)
     
     # Warm-up
     client.warmup(5)
     
     # Executar cenários
     results = []
-    results.append(client.run_scenario_simple_user(100))
-    results.append(client.run_scenario_user_with_posts(100))
-    results.append(client.run_scenario_nested_data(100))
+    if args.load:
+        runs = [(scenario, lambda scenario=scenario: client.run_load_scenario(
+                    scenario, args.load, args.concurrency, args.duration, args.rate,
+                    keep_samples=not args.no_samples))
+                for scenario in SCENARIOS]
+    else:
+        runs = [('simple_user', lambda: client.run_scenario_simple_user(100)),
+                ('user_with_posts', lambda: client.run_scenario_user_with_posts(100)),
+                ('nested_data', lambda: client.run_scenario_nested_data(100))]
+    for scenario, run in runs:
+        with client.profiling(scenario) as profiles:
+            result = run()
+        if profiles:
+            result['profiles'] = profiles
+        results.append(result)
     
     # Salvar resultados
-    client.save_results(results)
+    client.save_results(results, args.output)
+    if writer:
+        writer.close()
+        print(f"Medições individuais em: {args.stream}")
     
     print("\n✓ Benchmark concluído!")
@@ -0,0 +1,88 @@
+"""
+Benchmark de regressão do endpoint REST /api/users/<id>/full
+
+Chama o endpoint repetidamente (cliente de teste do Flask, cache de respostas
+desativado) e acompanha o tamanho da resposta e o RSS do processo. Como a
+resposta é montada sem alterar os registros de data.py, ambos devem ficar
+estáveis; o script também confere que os registros de origem não mudaram.
+"""
+import argparse
+import copy
+import gc
+import resource
+import sys
+import time
+
+import data
+import rest_server
+
+
+def current_rss_mb() -> float:
+    """RSS atual do processo em MB (no Linux via /proc; senão o pico de ru_maxrss)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss é em KB no Linux e em bytes no macOS
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regressão de memória do endpoint /full")
+    parser.add_argument('--calls', type=int, default=1_000_000)
+    parser.add_argument('--user-id', type=int, default=1)
+    parser.add_argument('--samples', type=int, default=20,
+                        help="Número de pontos de medição ao longo da execução")
+    parser.add_argument('--rss-tolerance-mb', type=float, default=5.0,
+                        help="Crescimento de RSS aceito entre o primeiro e o último ponto")
+    args = parser.parse_args()
+
+    rest_server.response_cache.max_size = 0
+    client = rest_server.app.test_client()
+    url = f"/api/users/{args.user_id}/full"
+    source_posts = copy.deepcopy(data.POSTS)
+
+    print("="*70)
+    print(f"REGRESSÃO DO ENDPOINT {url} ({args.calls:,} chamadas)")
+    print("="*70)
+    print(f"{'Chamadas':>12}{'Tamanho (bytes)':>18}{'RSS (MB)':>12}{'µs/chamada':>12}")
+
+    # Aquecimento: imports preguiçosos, caches internos do Flask/Werkzeug
+    for _ in range(1000):
+        client.get(url)
+    gc.collect()
+
+    interval = max(1, args.calls // args.samples)
+    sizes = set()
+    points = []
+    start = time.perf_counter()
+    last_time = start
+    for call in range(1, args.calls + 1):
+        response = client.get(url)
+        if call % interval == 0 or call == args.calls:
+            now = time.perf_counter()
+            size = len(response.data)
+            sizes.add(size)
+            points.append(current_rss_mb())
+            calls_in_interval = interval if call % interval == 0 else call % interval
+            print(f"{call:>12,}{size:>18}{points[-1]:>12.1f}"
+                  f"{(now - last_time) / calls_in_interval * 1e6:>12.1f}")
+            last_time = now
+
+    growth = points[-1] - points[0]
+    unchanged = data.POSTS == source_posts
+    print("\n" + "="*70)
+    print(f"Tempo total: {time.perf_counter() - start:.1f} s")
+    print(f"Tamanhos de resposta distintos: {sorted(sizes)}")
+    print(f"Crescimento de RSS: {growth:+.1f} MB (tolerância {args.rss_tolerance_mb} MB)")
+    print(f"Registros de data.POSTS inalterados: {'SIM' if unchanged else 'NÃO'}")
+
+    ok = len(sizes) == 1 and growth <= args.rss_tolerance_mb and unchanged
+    print("✓ Estável" if ok else "✗ Regressão detectada")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark do cache de documentos GraphQL: tempo de CPU por requisição com e sem cache
+
+Executa as queries dos cenários do experimento pelo endpoint /graphql (via
+cliente de teste do Flask, sem rede) e mede o tempo de CPU do processo.
+"""
+import argparse
+import time
+
+import graphql_server
+from benchmark_client import SCENARIOS
+
+# Mesmas queries dos cenários do benchmark_client
+SCENARIO_QUERIES = {name: query for name, (_, query) in SCENARIOS.items()}
+
+
+def measure_cpu_per_request(client, query: str, repetitions: int) -> float:
+    """Tempo médio de CPU (ms) por requisição"""
+    start = time.process_time()
+    for _ in range(repetitions):
+        client.post('/graphql', json={'query': query})
+    return (time.process_time() - start) / repetitions * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do cache de documentos GraphQL")
+    parser.add_argument('--repetitions', type=int, default=2000)
+    args = parser.parse_args()
+
+    client = graphql_server.app.test_client()
+    cache = graphql_server.document_cache
+    cache_size = cache.max_size or 256
+
+    print("="*70)
+    print(f"CACHE DE DOCUMENTOS GRAPHQL ({args.repetitions} requisições por cenário)")
+    print("="*70)
+    print(f"{'Cenário':<18}{'Sem cache (ms)':>16}{'Com cache (ms)':>16}{'Redução':>10}")
+
+    for scenario, query in SCENARIO_QUERIES.items():
+        cache.max_size = 0
+        measure_cpu_per_request(client, query, 50)
+        without_cache = measure_cpu_per_request(client, query, args.repetitions)
+
+        cache.max_size = cache_size
+        cache.clear()
+        measure_cpu_per_request(client, query, 50)
+        with_cache = measure_cpu_per_request(client, query, args.repetitions)
+
+        reduction = (without_cache - with_cache) / without_cache * 100
+        print(f"{scenario:<18}{without_cache:>16.3f}{with_cache:>16.3f}{reduction:>9.1f}%")
+
+    print("\nContadores do cache:", cache.stats())
+
+
+if __name__ == "__main__":
+    main()
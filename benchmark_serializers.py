@@ -0,0 +1,105 @@
+"""
+Micro-benchmark dos serializadores JSON por cenário
+
+Para cada cenário do experimento monta o payload REST (como a rota faria) e
+o resultado GraphQL, e mede o tempo de montagem + serialização por resposta
+com cada serializador disponível, com e sem registros pré-serializados
+(apenas REST). Todas as variantes devem produzir exatamente os mesmos bytes.
+"""
+import argparse
+import time
+from typing import Callable, Dict
+
+import graphql_server
+import rest_views
+from benchmark_client import SCENARIOS
+from data import get_all_users, load_generated, set_backend
+from data_generator import add_scale_arguments, backend_from_args, generator_from_args
+from loaders import RequestContext
+from projection import parse_projection
+from serializers import SERIALIZERS, EncodedRecordCache, get_serializer
+
+
+def rest_payload_builders() -> Dict[str, Callable]:
+    """Montagem do payload REST de cada cenário, sem HTTP nem cache de respostas"""
+    builders = {}
+    for scenario, (endpoint, _) in SCENARIOS.items():
+        if endpoint.endswith('/full'):
+            builders[scenario] = lambda: rest_views.build_user_with_posts_and_comments(1)
+        else:
+            builders[scenario] = lambda: rest_views.embed_relations(
+                parse_projection('users'), [rest_views.get_user_by_id(1)], [])[0]
+    builders['all_users'] = lambda: rest_views.embed_relations(
+        parse_projection('users'), get_all_users(), [])
+    return builders
+
+
+def graphql_payload_builders() -> Dict[str, Callable]:
+    """Execução das queries dos cenários (sem cache de resolvers) até o corpo da resposta"""
+    def builder(query):
+        return lambda: graphql_server.format_result(
+            graphql_server.execute_query(query, context=RequestContext()))
+    return {scenario: builder(query) for scenario, (_, query) in SCENARIOS.items()}
+
+
+def measure_us(build: Callable, encode: Callable, iterations: int) -> float:
+    """Tempo médio (µs) de montagem + serialização por resposta"""
+    for _ in range(min(iterations, 100)):
+        encode(build())
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encode(build())
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark dos serializadores JSON")
+    parser.add_argument('--iterations', type=int, default=5000)
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+    backend = backend_from_args(args)
+    set_backend(backend)
+    load_generated(generator_from_args(args))
+
+    serializers = []
+    for name in SERIALIZERS:
+        try:
+            serializers.append(get_serializer(name))
+        except ValueError as error:
+            print(f"Ignorando {name}: {error}")
+
+    print("="*78)
+    print(f"SERIALIZAÇÃO JSON ({args.iterations} respostas por variante, µs por resposta)")
+    print("="*78)
+    print(f"{'API':<9}{'Cenário':<18}{'Variante':<22}{'Bytes':>8}{'µs':>10}{'vs stdlib':>11}")
+
+    record_encodings = rest_views.record_encodings
+    mismatches = 0
+    for api, builders in (('REST', rest_payload_builders()),
+                          ('GraphQL', graphql_payload_builders())):
+        for scenario, build in builders.items():
+            rest_views.record_encodings = EncodedRecordCache(serializers[0], 0)
+            reference = serializers[0].encode(build())
+            baseline = None
+            variants = [(serializer.name, serializer, 0) for serializer in serializers]
+            if api == 'REST':
+                variants += [(f"{serializer.name}+pré-serializado", serializer, 1_000_000)
+                             for serializer in serializers]
+            for label, serializer, cache_size in variants:
+                rest_views.record_encodings = EncodedRecordCache(serializer, cache_size)
+                body = serializer.encode(build())
+                if body != reference:
+                    mismatches += 1
+                    label += ' (DIFERENTE)'
+                elapsed = measure_us(build, serializer.encode, args.iterations)
+                baseline = baseline or elapsed
+                print(f"{api:<9}{scenario:<18}{label:<22}{len(body):>8}{elapsed:>10.1f}"
+                      f"{baseline / elapsed:>10.2f}x")
+    rest_views.record_encodings = record_encodings
+
+    print("\n" + ("✓ Todas as variantes produziram os mesmos bytes" if not mismatches
+                  else f"✗ {mismatches} variante(s) com saída diferente"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Intervalos de confiança bootstrap e testes não paramétricos para REST vs GraphQL
+
+As latências são assimétricas à direita, então além do teste t pareado a
+análise usa:
+- bootstrap (percentil) da diferença GraphQL - REST na média, p95 e p99;
+- Wilcoxon (pareado) e Mann-Whitney (independente);
+- tamanhos de efeito (Cohen d_z, Hedges g, delta de Cliff).
+
+As reamostragens são vetorizadas em lotes (matrizes de índices) e divididas
+entre processos; cada processo recebe um fluxo independente derivado da
+mesma semente (SeedSequence.spawn), então o resultado é reprodutível para a
+mesma semente e número de workers.
+"""
+import math
+import os
+from multiprocessing import Pool
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from scipy import stats
+
+# Estatísticas suportadas: nome -> percentil (None = média)
+STATISTICS = {'mean': None, 'median': 50, 'p95': 95, 'p99': 99}
+
+# Elementos por lote de reamostragem (limita a memória de cada processo)
+BATCH_ELEMENTS = 2_000_000
+
+# Abaixo deste total de elementos sorteados, um único processo é mais rápido
+PARALLEL_THRESHOLD = 20_000_000
+
+
+def _statistic(values: np.ndarray, statistic: str) -> np.ndarray:
+    """Estatística ao longo do último eixo"""
+    percent = STATISTICS[statistic]
+    if percent is None:
+        return values.mean(axis=-1)
+    return np.percentile(values, percent, axis=-1)
+
+
+def _resample_differences(rest: np.ndarray, graphql: np.ndarray, statistic: str,
+                          resamples: int, seed: np.random.SeedSequence,
+                          paired: bool) -> np.ndarray:
+    """Diferenças GraphQL - REST da estatística em `resamples` reamostragens"""
+    rng = np.random.default_rng(seed)
+    batch = max(1, BATCH_ELEMENTS // max(len(rest), len(graphql)))
+    differences = np.empty(resamples)
+    done = 0
+    while done < resamples:
+        size = min(batch, resamples - done)
+        rest_index = rng.integers(0, len(rest), (size, len(rest)))
+        # Pareado: o mesmo sorteio de pares (i-ésima medição REST e GraphQL)
+        graphql_index = rest_index if paired else rng.integers(0, len(graphql), (size, len(graphql)))
+        differences[done:done + size] = (_statistic(graphql[graphql_index], statistic) -
+                                         _statistic(rest[rest_index], statistic))
+        done += size
+    return differences
+
+
+def _resample_worker(args):
+    return _resample_differences(*args)
+
+
+def bootstrap_difference(rest_values: Sequence[float], graphql_values: Sequence[float],
+                         statistic: str = 'mean', resamples: int = 10_000,
+                         confidence: float = 0.95, seed: Optional[int] = None,
+                         workers: Optional[int] = None, paired: Optional[bool] = None) -> Dict:
+    """
+    Intervalo de confiança bootstrap (percentil) para estatística(GraphQL) - estatística(REST)
+    paired=None reamostra pares quando as amostras têm o mesmo tamanho
+    workers=None usa todos os núcleos quando o volume de reamostragem compensa
+    """
+    if statistic not in STATISTICS:
+        raise ValueError(f"Estatística desconhecida: {statistic}")
+    rest = np.asarray(rest_values, dtype=np.float64)
+    graphql = np.asarray(graphql_values, dtype=np.float64)
+    if not len(rest) or not len(graphql):
+        raise ValueError("As amostras não podem ser vazias")
+    if paired is None:
+        paired = len(rest) == len(graphql)
+    elif paired and len(rest) != len(graphql):
+        raise ValueError("Amostras pareadas precisam ter o mesmo tamanho")
+
+    if workers is None:
+        elements = resamples * (len(rest) + len(graphql))
+        workers = (os.cpu_count() or 1) if elements >= PARALLEL_THRESHOLD else 1
+    workers = max(1, min(workers, resamples))
+
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [resamples // workers + (i < resamples % workers) for i in range(workers)]
+    tasks = [(rest, graphql, statistic, share, worker_seed, paired)
+             for share, worker_seed in zip(shares, seeds)]
+    if workers == 1:
+        differences = _resample_worker(tasks[0])
+    else:
+        with Pool(workers) as pool:
+            differences = np.concatenate(pool.map(_resample_worker, tasks))
+
+    alpha = (1 - confidence) / 2
+    low, high = np.percentile(differences, [alpha * 100, (1 - alpha) * 100])
+    return {
+        'statistic': statistic,
+        'difference': float(_statistic(graphql, statistic) - _statistic(rest, statistic)),
+        'ci_low': float(low),
+        'ci_high': float(high),
+        'confidence': confidence,
+        'resamples': resamples,
+        'paired': paired
+    }
+
+
+def nonparametric_tests(rest_values: Sequence[float], graphql_values: Sequence[float]) -> Dict:
+    """
+    Testes unilaterais (H1: GraphQL < REST)
+    Wilcoxon signed-rank só é aplicado quando as amostras são pareáveis
+    """
+    rest = np.asarray(rest_values, dtype=np.float64)
+    graphql = np.asarray(graphql_values, dtype=np.float64)
+    results = {}
+
+    if len(rest) == len(graphql) and np.any(graphql != rest):
+        statistic, p_value = stats.wilcoxon(graphql, rest, alternative='less')
+        results['wilcoxon'] = {'statistic': float(statistic), 'p_value': float(p_value),
+                               'significant_at_0.05': p_value < 0.05}
+
+    statistic, p_value = stats.mannwhitneyu(graphql, rest, alternative='less')
+    results['mann_whitney'] = {'statistic': float(statistic), 'p_value': float(p_value),
+                               'significant_at_0.05': p_value < 0.05}
+    return results
+
+
+def effect_sizes(rest_values: Sequence[float], graphql_values: Sequence[float]) -> Dict:
+    """
+    Tamanhos de efeito de GraphQL em relação a REST (negativo = GraphQL menor)
+    - cohens_dz: diferença média pareada / desvio padrão das diferenças
+    - hedges_g: diferença de médias / desvio padrão combinado, com correção de viés
+    - cliffs_delta: P(GraphQL > REST) - P(GraphQL < REST), via estatística U
+    """
+    rest = np.asarray(rest_values, dtype=np.float64)
+    graphql = np.asarray(graphql_values, dtype=np.float64)
+    n1, n2 = len(graphql), len(rest)
+    results = {}
+
+    if n1 == n2 and n1 > 1:
+        differences = graphql - rest
+        sd = differences.std(ddof=1)
+        results['cohens_dz'] = float(differences.mean() / sd) if sd else math.nan
+
+    pooled = math.sqrt(((n1 - 1) * graphql.var(ddof=1) + (n2 - 1) * rest.var(ddof=1)) /
+                       (n1 + n2 - 2)) if n1 + n2 > 2 else 0.0
+    correction = 1 - 3 / (4 * (n1 + n2) - 9) if n1 + n2 > 2 else 1.0
+    results['hedges_g'] = (float((graphql.mean() - rest.mean()) / pooled * correction)
+                           if pooled else math.nan)
+
+    u_statistic = stats.mannwhitneyu(graphql, rest).statistic
+    results['cliffs_delta'] = float(2 * u_statistic / (n1 * n2) - 1)
+    return results
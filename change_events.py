@@ -0,0 +1,46 @@
+"""
+Notificação de escritas na camada de dados
+
+Os backends (data.DataStore e compact_store.CompactDataStore) herdam de
+ChangeNotifier e avisam os ouvintes após cada inserção, remoção ou limpeza.
+Caches de respostas e de resolvers usam esses eventos para invalidar apenas
+as entradas afetadas.
+"""
+from typing import Callable, Dict, List, Optional
+
+# Ouvinte: listener(action, table, record) com action em 'insert', 'delete' ou 'clear';
+# table é 'users', 'posts' ou 'comments' (None em 'clear')
+ChangeListener = Callable[[str, Optional[str], Optional[Dict]], None]
+
+
+class ChangeNotifier:
+    """Mixin que mantém a lista de ouvintes de um backend"""
+
+    _listeners = ()
+
+    def add_listener(self, listener: ChangeListener):
+        if not self._listeners:
+            self._listeners = []
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: ChangeListener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, action: str, table: Optional[str] = None, record: Optional[Dict] = None):
+        for listener in self._listeners:
+            listener(action, table, record)
+
+
+def tags_for_change(table: Optional[str], record: Optional[Dict]) -> List[str]:
+    """
+    Tags de cache afetadas por uma escrita: 'user:<id>' e 'users' para usuários,
+    'user:<user_id>:posts' para posts e 'post:<post_id>:comments' para comentários
+    """
+    if table == 'users':
+        return [f"user:{record['id']}", 'users']
+    if table == 'posts':
+        return [f"user:{record['user_id']}:posts"]
+    if table == 'comments':
+        return [f"post:{record['post_id']}:comments"]
+    return []
@@ -0,0 +1,89 @@
+"""
+Verificação do encadeamento benchmark de carga -> análise estatística
+
+Sobe os servidores Flask REST e GraphQL em threads (portas livres), executa
+cada cenário no modo de carga closed-loop com e sem amostras (--no-samples),
+grava o results.json e o results.jsonl em um diretório temporário e roda o
+statistical_analysis sobre eles, como no pipeline documentado. Confere que
+todos os cenários são analisados e que as contagens conferem com as medições.
+Sai com código 1 se alguma verificação falhar.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+
+from werkzeug.serving import make_server
+
+import graphql_server
+import rest_server
+from benchmark_client import SCENARIOS, BenchmarkClient
+from results_writer import ResultsWriter
+from statistical_analysis import StatisticalAnalysis
+
+
+def start_server(app):
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_benchmark(rest_url: str, graphql_url: str, directory: str, keep_samples: bool,
+                  duration: float, concurrency: int) -> str:
+    """Executa os cenários sob carga e retorna o caminho do results.json"""
+    label = 'samples' if keep_samples else 'no_samples'
+    output = os.path.join(directory, f"{label}.json")
+    with ResultsWriter(os.path.join(directory, f"{label}.jsonl")) as writer:
+        client = BenchmarkClient(rest_url, graphql_url, results_writer=writer)
+        results = [client.run_load_scenario(scenario, 'closed', concurrency, duration,
+                                            keep_samples=keep_samples)
+                   for scenario in SCENARIOS]
+    client.save_results(results, output)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica a análise estatística do modo de carga")
+    parser.add_argument('--duration', type=float, default=0.5)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    rest = start_server(rest_server.app)
+    graphql = start_server(graphql_server.app)
+    rest_url = f"http://127.0.0.1:{rest.server_port}"
+    graphql_url = f"http://127.0.0.1:{graphql.server_port}/graphql"
+
+    failures = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for keep_samples in (True, False):
+                output = run_benchmark(rest_url, graphql_url, directory, keep_samples,
+                                       args.duration, args.concurrency)
+                analysis = StatisticalAnalysis(output, resamples=200)
+                analyzed = {result['scenario']: result for result in analysis.generate_report()}
+                for entry in analysis.data:
+                    name = entry['scenario']
+                    if name not in analyzed:
+                        failures.append(f"{name} (amostras={keep_samples}): não analisado")
+                        continue
+                    for api, label in (('rest', 'REST'), ('graphql', 'GraphQL')):
+                        summary = entry[api]
+                        expected = summary['requests'] - summary['errors']
+                        if keep_samples and len(summary['times']) != expected:
+                            failures.append(f"{name}/{api}: {len(summary['times'])} tempos, "
+                                            f"{expected} requisições bem-sucedidas")
+                        if not expected:
+                            failures.append(f"{name}/{api}: nenhuma requisição bem-sucedida")
+    finally:
+        rest.shutdown()
+        graphql.shutdown()
+
+    if failures:
+        print("\nFalhas:\n- " + "\n- ".join(failures))
+        sys.exit(1)
+    print("\nOs resultados do modo de carga passam pela análise estatística")
+
+
+if __name__ == "__main__":
+    main()
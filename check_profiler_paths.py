@@ -0,0 +1,64 @@
+"""
+Verificação dos caminhos gravados pelo profiler
+
+Registra as rotas de controle do profiler em uma aplicação Flask de teste,
+com PROFILE_DIR em um diretório temporário, e envia POST /admin/profile/stop
+com nomes maliciosos ('..', '../x', caminhos absolutos, ...). Confere que
+todos os arquivos .folded ficam dentro de PROFILE_DIR e que nada é gravado
+fora dele. Sai com código 1 se alguma verificação falhar.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from flask import Flask
+
+import profiler
+
+NAMES = ['..', '.', '...', '../escaped', '../../escaped', '/tmp/escaped', './..', '..\\escaped',
+         'scenario']
+
+
+def main():
+    os.environ['PROFILE_ADMIN'] = '1'
+    failures = []
+    with tempfile.TemporaryDirectory() as workspace:
+        directory = os.path.join(workspace, 'profiles')
+        app = Flask(__name__)
+        profile = profiler.SamplingProfiler('check', directory)
+        profiler.enable_profiling(app, profile)
+        # Requisição lenta o bastante para ser amostrada
+        app.add_url_rule('/ping', 'ping', lambda: time.sleep(0.05) or 'ok')
+        client = app.test_client()
+
+        root = os.path.realpath(directory)
+        for name in NAMES:
+            client.post('/admin/profile/start', json={'interval_ms': 1})
+            client.get('/ping')
+            response = client.post('/admin/profile/stop', json={'name': name})
+            files = response.get_json().get('files', []) if response.is_json else []
+            outside = [path for path in files
+                       if os.path.commonpath([root, os.path.realpath(path)]) != root]
+            if response.status_code != 200:
+                failures.append(f"{name!r}: HTTP {response.status_code}")
+            elif not files:
+                failures.append(f"{name!r}: nenhum arquivo gravado")
+            elif outside:
+                failures.append(f"{name!r}: gravado fora de PROFILE_DIR: {outside}")
+            print(f"{name!r:<20} -> {files}")
+
+        escaped = [os.path.join(dirpath, file)
+                   for dirpath, _, filenames in os.walk(workspace) for file in filenames
+                   if not os.path.realpath(os.path.join(dirpath, file)).startswith(root + os.sep)]
+        if escaped:
+            failures.append(f"arquivos fora de PROFILE_DIR: {escaped}")
+
+    if failures:
+        print("\nFalhas:\n- " + "\n- ".join(failures))
+        sys.exit(1)
+    print("\nTodos os profiles ficaram dentro de PROFILE_DIR")
+
+
+if __name__ == "__main__":
+    main()
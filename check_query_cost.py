@@ -0,0 +1,84 @@
+"""
+Verificação do custo estimado das queries GraphQL contra o custo real
+
+Carrega um dataset sintético com fan-out assimétrico e executa queries com
+`limit`/`first` pelo endpoint /graphql (cliente de teste do Flask, sem
+orçamentos). Todas as listas dessas queries têm `limit`/`first` (ou são
+`users`, cuja média é o próprio total), então a estimativa é um teto e o
+custo real nunca pode passar dela.
+Também confere que QUERY_MAX_COST rejeita a query de fan-out extremo.
+Sai com código 1 se alguma verificação falhar.
+"""
+import argparse
+import sys
+
+import graphql_server
+from benchmark_client import SCENARIOS
+from data import load_generated
+from data_generator import DatasetGenerator
+
+# Pais do topo da distribuição Zipf pedindo muito mais que a média de filhos
+SKEWED_QUERIES = {
+    'skewed_limits': "{ user(id: 1) { posts(limit: 100000) { comments(limit: 100000) { id } } } }",
+    'skewed_small_limits': "{ user(id: 1) { posts(limit: 50) { comments(limit: 50) { id } } } }",
+    'skewed_connection': """{ user(id: 1) { postsConnection(first: 100) { edges { node {
+        commentsConnection(first: 100) { edges { node { id } } } } } } } }""",
+    'users_limits': "{ users { posts(limit: 1000) { id } } }",
+}
+
+
+def measure(client, query: str):
+    response = client.post('/graphql', json={'query': query})
+    headers = response.headers
+    if 'X-Query-Cost-Estimated' not in headers:
+        return None, None, response.get_json().get('errors')
+    return (int(headers['X-Query-Cost-Estimated']), int(headers['X-Query-Cost-Actual']),
+            response.get_json().get('errors'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica o custo estimado vs real das queries")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=50000)
+    parser.add_argument('--comments', type=int, default=200000)
+    args = parser.parse_args()
+
+    generator = DatasetGenerator(args.users, args.posts, args.comments)
+    load_generated(generator)
+    graphql_server.configure_cost_analyzer(generator)
+    analyzer = graphql_server.cost_analyzer
+    max_cost, max_depth = analyzer.max_cost, analyzer.max_depth
+    client = graphql_server.app.test_client()
+
+    queries = {**{name: query for name, (_, query) in SCENARIOS.items()}, **SKEWED_QUERIES}
+    failures = []
+    print(f"{'Query':<22}{'Estimado':>14}{'Real':>10}  Resultado")
+    analyzer.max_cost = analyzer.max_depth = 0
+    try:
+        for name, query in queries.items():
+            estimated, actual, errors = measure(client, query)
+            if estimated is None:
+                failures.append(f"{name}: sem custo ({errors})")
+                continue
+            ok = actual <= estimated
+            if not ok:
+                failures.append(f"{name}: real {actual} > estimado {estimated}")
+            print(f"{name:<22}{estimated:>14}{actual:>10}  {'ok' if ok else 'SUBESTIMADO'}")
+    finally:
+        analyzer.max_cost, analyzer.max_depth = max_cost, max_depth
+
+    if max_cost:
+        _, _, errors = measure(client, SKEWED_QUERIES['skewed_limits'])
+        rejected = bool(errors) and 'custo estimado' in str(errors)
+        print(f"\nQUERY_MAX_COST={max_cost} rejeita skewed_limits: {'sim' if rejected else 'NÃO'}")
+        if not rejected:
+            failures.append("skewed_limits não foi rejeitada por QUERY_MAX_COST")
+
+    if failures:
+        print("\nFalhas:\n- " + "\n- ".join(failures))
+        sys.exit(1)
+    print("\nAs estimativas cobrem o custo real")
+
+
+if __name__ == "__main__":
+    main()
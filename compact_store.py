@@ -0,0 +1,262 @@
+"""
+Armazenamento compacto (colunar) para o experimento GraphQL vs REST
+
+Cada tabela guarda seus campos em colunas `array` e as strings em uma tabela
+de strings internadas (valores repetidos, como autores e cidades) ou em um
+blob UTF-8 contíguo (valores únicos, como o texto dos comentários). Os
+dicionários só são criados quando um registro é lido, ou seja, na fronteira
+de serialização.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
+
+from change_events import ChangeNotifier
+
+
+class StringTable:
+    """Tabela de strings internadas: cada valor distinto é guardado uma única vez"""
+
+    def __init__(self):
+        self._index = {}
+        self._values = []
+
+    def intern(self, value: str) -> int:
+        key = self._index.get(value)
+        if key is None:
+            key = len(self._values)
+            self._index[value] = key
+            self._values.append(value)
+        return key
+
+    def __getitem__(self, key: int) -> str:
+        return self._values[key]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class StringBlob:
+    """Strings de alta cardinalidade codificadas em UTF-8 em um único buffer"""
+
+    def __init__(self):
+        self._data = bytearray()
+        self._offsets = array('q', [0])
+
+    def append(self, value: str) -> int:
+        self._data += value.encode('utf-8')
+        self._offsets.append(len(self._data))
+        return len(self._offsets) - 2
+
+    def __getitem__(self, key: int) -> str:
+        return self._data[self._offsets[key]:self._offsets[key + 1]].decode('utf-8')
+
+
+class CompactTable:
+    """
+    Tabela colunar com chave primária ordenada
+
+    Os ids precisam ser inseridos em ordem crescente (como nos dados fixos e
+    no gerador sintético); assim a busca por chave primária é uma busca
+    binária na coluna de ids, sem um dicionário por registro. Remoções apenas
+    marcam a linha como inativa.
+    """
+
+    def __init__(self, name: str, schema: Dict[str, str], strings: StringTable):
+        # schema: campo -> 'int' | 'intern' | 'text'
+        self.name = name
+        self.schema = schema
+        self._strings = strings
+        self._columns = {}
+        for field, kind in schema.items():
+            self._columns[field] = StringBlob() if kind == 'text' else array('q')
+        self._ids = self._columns['id']
+        self._alive = bytearray()
+        self._size = 0
+
+    def append(self, record: Dict) -> int:
+        """Adiciona um registro e retorna a posição da linha"""
+        record_id = record['id']
+        if self._size and record_id <= self._ids[-1]:
+            raise ValueError(f"{self.name}: ids devem ser inseridos em ordem crescente "
+                             f"({record_id} <= {self._ids[-1]})")
+        for field, kind in self.schema.items():
+            value = record[field]
+            if kind == 'intern':
+                value = self._strings.intern(value)
+            self._columns[field].append(value)
+        self._alive.append(1)
+        self._size += 1
+        return self._size - 1
+
+    def row_of(self, record_id: int) -> Optional[int]:
+        """Posição da linha ativa com o id informado, ou None"""
+        row = bisect_left(self._ids, record_id)
+        if row < self._size and self._ids[row] == record_id and self._alive[row]:
+            return row
+        return None
+
+    def kill(self, row: int):
+        self._alive[row] = 0
+
+    def value(self, row: int, field: str):
+        value = self._columns[field][row]
+        if self.schema[field] == 'intern':
+            return self._strings[value]
+        return value
+
+    def materialize(self, row: int, fields: Optional[Iterable[str]] = None) -> Dict:
+        """Cria o dicionário do registro (apenas com `fields`, se informado)"""
+        return {field: self.value(row, field)
+                for field in (self.schema if fields is None else fields)}
+
+    def first_row_after(self, record_id: int) -> int:
+        """Posição da primeira linha com id maior que `record_id` (ativa ou não)"""
+        return bisect_right(self._ids, record_id)
+
+    def rows(self, start: int = 0) -> Iterable[int]:
+        return (row for row in range(start, self._size) if self._alive[row])
+
+
+USER_SCHEMA = {'id': 'int', 'name': 'text', 'email': 'text', 'age': 'int',
+               'city': 'intern', 'country': 'intern'}
+POST_SCHEMA = {'id': 'int', 'user_id': 'int', 'title': 'intern', 'content': 'intern',
+               'likes': 'int'}
+COMMENT_SCHEMA = {'id': 'int', 'post_id': 'int', 'author': 'intern', 'text': 'text'}
+
+
+class CompactDataStore(ChangeNotifier):
+    """
+    Backend compacto com a mesma interface de data.DataStore
+
+    Os índices de chave estrangeira guardam posições de linha em `array`, já
+    ordenadas por id porque as linhas são inseridas em ordem crescente.
+    """
+
+    def __init__(self, users=(), posts=(), comments=()):
+        self.clear()
+        self.load(users, posts, comments)
+
+    def load(self, users=(), posts=(), comments=()):
+        """Insere registros em lote (usuários, posts e comentários)"""
+        for user in users:
+            self.insert_user(user)
+        for post in posts:
+            self.insert_post(post)
+        for comment in comments:
+            self.insert_comment(comment)
+
+    def clear(self):
+        """Remove todos os registros e índices"""
+        self._strings = StringTable()
+        self._users = CompactTable('users', USER_SCHEMA, self._strings)
+        self._posts = CompactTable('posts', POST_SCHEMA, self._strings)
+        self._comments = CompactTable('comments', COMMENT_SCHEMA, self._strings)
+        self._posts_by_user = {}
+        self._comments_by_post = {}
+        self._notify('clear')
+
+    # Inserção
+    def insert_user(self, user):
+        if self._users.row_of(user["id"]) is not None:
+            raise ValueError(f"Usuário {user['id']} já existe")
+        self._users.append(user)
+        self._notify('insert', 'users', user)
+
+    def insert_post(self, post):
+        if self._posts.row_of(post["id"]) is not None:
+            raise ValueError(f"Post {post['id']} já existe")
+        row = self._posts.append(post)
+        self._posts_by_user.setdefault(post["user_id"], array('q')).append(row)
+        self._notify('insert', 'posts', post)
+
+    def insert_comment(self, comment):
+        if self._comments.row_of(comment["id"]) is not None:
+            raise ValueError(f"Comentário {comment['id']} já existe")
+        row = self._comments.append(comment)
+        self._comments_by_post.setdefault(comment["post_id"], array('q')).append(row)
+        self._notify('insert', 'comments', comment)
+
+    # Remoção (em cascata para manter os índices consistentes)
+    def delete_user(self, user_id):
+        row = self._users.row_of(user_id)
+        if row is None:
+            return None
+        user = self._users.materialize(row)
+        for post_row in list(self._posts_by_user.get(user_id, ())):
+            self.delete_post(self._posts.value(post_row, 'id'))
+        self._users.kill(row)
+        self._notify('delete', 'users', user)
+        return user
+
+    def delete_post(self, post_id):
+        row = self._posts.row_of(post_id)
+        if row is None:
+            return None
+        post = self._posts.materialize(row)
+        for comment_row in list(self._comments_by_post.get(post_id, ())):
+            self.delete_comment(self._comments.value(comment_row, 'id'))
+        self._posts.kill(row)
+        _remove_row(self._posts_by_user, post["user_id"], row)
+        self._notify('delete', 'posts', post)
+        return post
+
+    def delete_comment(self, comment_id):
+        row = self._comments.row_of(comment_id)
+        if row is None:
+            return None
+        comment = self._comments.materialize(row)
+        self._comments.kill(row)
+        _remove_row(self._comments_by_post, comment["post_id"], row)
+        self._notify('delete', 'comments', comment)
+        return comment
+
+    # Consultas
+    # `fields` limita as colunas lidas: só os campos pedidos viram chaves do dicionário;
+    # `after` retorna apenas registros com id maior (paginação por cursor)
+    def get_user(self, user_id, fields=None):
+        row = self._users.row_of(user_id)
+        return None if row is None else self._users.materialize(row, fields)
+
+    def get_posts_by_user(self, user_id, limit=None, fields=None, after=None):
+        rows = _keyset(self._posts_by_user.get(user_id, ()), self._posts, limit, after)
+        return [self._posts.materialize(row, fields) for row in rows]
+
+    def get_comments_by_post(self, post_id, limit=None, fields=None, after=None):
+        rows = _keyset(self._comments_by_post.get(post_id, ()), self._comments, limit, after)
+        return [self._comments.materialize(row, fields) for row in rows]
+
+    def all_users(self, fields=None, limit=None, after=None) -> List[Dict]:
+        rows = self._users.rows(0 if after is None else self._users.first_row_after(after))
+        if limit:
+            rows = islice(rows, limit)
+        return [self._users.materialize(row, fields) for row in rows]
+
+    def max_fan_out(self):
+        """Maior número de posts de um usuário e de comentários de um post"""
+        return (max(map(len, self._posts_by_user.values()), default=0),
+                max(map(len, self._comments_by_post.values()), default=0))
+
+
+def _keyset(rows, table: CompactTable, limit=None, after=None):
+    """
+    Fatia de um índice de posições de linha: as `limit` primeiras com id maior
+    que `after` (as posições seguem a ordem dos ids, então a busca é binária)
+    """
+    start = 0 if after is None else bisect_left(rows, table.first_row_after(after))
+    if limit:
+        return rows[start:start + limit]
+    return rows[start:] if start else rows
+
+
+def _remove_row(index, key, row):
+    """Remove uma posição de linha de um índice de chave estrangeira ordenado"""
+    rows = index.get(key)
+    if not rows:
+        return
+    pos = bisect_left(rows, row)
+    if pos < len(rows) and rows[pos] == row:
+        del rows[pos]
+    if not rows:
+        del index[key]
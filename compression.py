@@ -0,0 +1,187 @@
+"""
+Compressão das respostas HTTP com negociação por Accept-Encoding
+
+Codificações suportadas, na ordem de preferência do servidor:
+- zstd: opcional (pip install zstandard)
+- br: opcional (pip install brotli)
+- gzip: biblioteca padrão
+
+Configuração por variáveis de ambiente:
+- COMPRESSION: codificações habilitadas, ex.: 'zstd,br,gzip' (padrão '', desativada,
+  para que a latência e o tamanho medidos no experimento não incluam a compressão);
+  as opcionais não instaladas são ignoradas
+- COMPRESSION_MIN_SIZE: respostas menores (bytes) não são comprimidas (padrão 1024)
+- COMPRESSION_LEVEL: nível para todas (ex.: '6') ou por codificação ('gzip=6,br=5,zstd=3')
+
+O tempo de compressão vai no cabeçalho Server-Timing (`compress;dur=<ms>`), e o
+ETag da representação comprimida recebe o sufixo da codificação ("<hash>-gzip").
+"""
+import gzip
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Níveis padrão: compromisso entre taxa e CPU para respostas dinâmicas
+DEFAULT_LEVELS = {'zstd': 3, 'br': 4, 'gzip': 6}
+# Ordem de preferência do servidor (e codificações de COMPRESSION=on)
+DEFAULT_ENCODINGS = ('zstd', 'br', 'gzip')
+
+_zstd_local = threading.local()
+
+
+def _gzip(body: bytes, level: int) -> bytes:
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def _brotli(body: bytes, level: int) -> bytes:
+    return brotli.compress(body, quality=level)
+
+
+def _zstd(body: bytes, level: int) -> bytes:
+    # ZstdCompressor não pode ser usado por duas threads ao mesmo tempo
+    compressors = getattr(_zstd_local, 'compressors', None)
+    if compressors is None:
+        compressors = _zstd_local.compressors = {}
+    compressor = compressors.get(level)
+    if compressor is None:
+        compressor = compressors[level] = zstandard.ZstdCompressor(level=level)
+    return compressor.compress(body)
+
+
+# Codificação -> (função de compressão, disponível neste ambiente)
+CODECS = {
+    'zstd': (_zstd, zstandard is not None),
+    'br': (_brotli, brotli is not None),
+    'gzip': (_gzip, True),
+}
+
+
+def available_encodings() -> Tuple[str, ...]:
+    return tuple(name for name, (_, available) in CODECS.items() if available)
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Accept-Encoding -> {codificação: q}; ex.: 'gzip, br;q=0.5' -> {'gzip': 1.0, 'br': 0.5}"""
+    preferences = {}
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        preferences[name] = q
+    return preferences
+
+
+class Compressor:
+    """Escolhe a codificação de cada resposta e comprime acima do tamanho mínimo"""
+
+    def __init__(self, encodings=DEFAULT_ENCODINGS, min_size: int = 1024,
+                 levels: Optional[Dict[str, int]] = None):
+        unknown = [name for name in encodings if name not in CODECS]
+        if unknown:
+            raise ValueError(f"Codificação desconhecida: {', '.join(unknown)} "
+                             f"(opções: {', '.join(CODECS)})")
+        self.encodings = tuple(name for name in encodings if CODECS[name][1])
+        self.min_size = min_size
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.encodings)
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """Codificação aceita com maior q (empates pela ordem do servidor), ou None"""
+        preferences = parse_accept_encoding(accept_encoding)
+        wildcard = preferences.get('*', 0.0)
+        best, best_q = None, 0.0
+        for name in self.encodings:
+            q = preferences.get(name, wildcard)
+            if q > best_q:
+                best, best_q = name, q
+        return best
+
+    def compress(self, body: bytes, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str], float]:
+        """Retorna (corpo, codificação ou None, tempo de compressão em ms)"""
+        if len(body) < self.min_size:
+            return body, None, 0.0
+        encoding = self.negotiate(accept_encoding)
+        if encoding is None:
+            return body, None, 0.0
+        start = time.perf_counter()
+        compressed = CODECS[encoding][0](body, self.levels[encoding])
+        return compressed, encoding, (time.perf_counter() - start) * 1000
+
+
+def _parse_levels(value: str) -> Dict[str, int]:
+    if not value:
+        return {}
+    if '=' not in value:
+        return {name: int(value) for name in CODECS}
+    levels = {}
+    for item in value.split(','):
+        name, _, level = item.partition('=')
+        levels[name.strip()] = int(level)
+    return levels
+
+
+def compressor_from_env() -> Compressor:
+    encodings = os.environ.get('COMPRESSION', '')
+    if encodings.strip().lower() in ('', 'off', 'none', '0'):
+        encodings = ''
+    elif encodings.strip().lower() in ('on', '1'):
+        encodings = ','.join(DEFAULT_ENCODINGS)
+    return Compressor([name.strip() for name in encodings.split(',') if name.strip()],
+                      int(os.environ.get('COMPRESSION_MIN_SIZE', 1024)),
+                      _parse_levels(os.environ.get('COMPRESSION_LEVEL', '')))
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag da representação comprimida: '"abc"' -> '"abc-gzip"' (W/ preservado)"""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+def server_timing(encoding: str, elapsed_ms: float) -> str:
+    return f'compress;dur={elapsed_ms:.3f};desc="{encoding}"'
+
+
+def enable_compression(app, compressor: Compressor):
+    """Comprime as respostas de uma aplicação Flask (after_request)"""
+    @app.after_request
+    def compress_response(response):
+        if (not compressor.enabled or response.direct_passthrough
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        body, encoding, elapsed_ms = compressor.compress(response.get_data(),
+                                                          request.headers.get('Accept-Encoding'))
+        if encoding:
+            response.set_data(body)
+            response.headers['Content-Encoding'] = encoding
+            if 'ETag' in response.headers:
+                response.headers['ETag'] = encoded_etag(response.headers['ETag'], encoding)
+            response.headers.add('Server-Timing', server_timing(encoding, elapsed_ms))
+        return response
+    return compress_response
@@ -1,6 +1,10 @@
 """
 Módulo de dados simulados para o experimento GraphQL vs REST
 """
+from bisect import bisect_left, bisect_right, insort
+
+from change_events import ChangeNotifier
+from compact_store import CompactDataStore
 
 # Base de dados simulada
 USERS = [
@@ -80,27 +84,251 @@ COMMENTS = [
 ]
 
 
-def get_user_by_id(user_id):
+class DataStore(ChangeNotifier):
+    """
+    Armazenamento em memória com índices hash.
+
+    Mantém um índice de chave primária por tabela (id -> registro) e índices
+    de chave estrangeira (user_id -> posts, post_id -> comentários). Os ids
+    em cada índice estrangeiro ficam ordenados, de modo que as buscas custam
+    O(1) para chave primária e O(k) para os k filhos retornados. Os ids de
+    usuários também são mantidos ordenados para a paginação por cursor.
+    """
+
+    def __init__(self, users=(), posts=(), comments=()):
+        self._users = {}
+        self._user_ids = []
+        self._posts = {}
+        self._comments = {}
+        self._posts_by_user = {}
+        self._comments_by_post = {}
+        self.load(users, posts, comments)
+
+    def load(self, users=(), posts=(), comments=()):
+        """Insere registros em lote (usuários, posts e comentários)"""
+        for user in users:
+            self.insert_user(user)
+        for post in posts:
+            self.insert_post(post)
+        for comment in comments:
+            self.insert_comment(comment)
+
+    def clear(self):
+        """Remove todos os registros e índices"""
+        self._users.clear()
+        self._user_ids.clear()
+        self._posts.clear()
+        self._comments.clear()
+        self._posts_by_user.clear()
+        self._comments_by_post.clear()
+        self._notify('clear')
+
+    # Inserção
+    def insert_user(self, user):
+        if user["id"] in self._users:
+            raise ValueError(f"Usuário {user['id']} já existe")
+        self._users[user["id"]] = user
+        insort(self._user_ids, user["id"])
+        self._notify('insert', 'users', user)
+
+    def insert_post(self, post):
+        if post["id"] in self._posts:
+            raise ValueError(f"Post {post['id']} já existe")
+        self._posts[post["id"]] = post
+        insort(self._posts_by_user.setdefault(post["user_id"], []), post["id"])
+        self._notify('insert', 'posts', post)
+
+    def insert_comment(self, comment):
+        if comment["id"] in self._comments:
+            raise ValueError(f"Comentário {comment['id']} já existe")
+        self._comments[comment["id"]] = comment
+        insort(self._comments_by_post.setdefault(comment["post_id"], []), comment["id"])
+        self._notify('insert', 'comments', comment)
+
+    # Remoção (em cascata para manter os índices consistentes)
+    def delete_user(self, user_id):
+        user = self._users.pop(user_id, None)
+        if user is None:
+            return None
+        for post_id in list(self._posts_by_user.get(user_id, ())):
+            self.delete_post(post_id)
+        del self._user_ids[bisect_left(self._user_ids, user_id)]
+        self._notify('delete', 'users', user)
+        return user
+
+    def delete_post(self, post_id):
+        post = self._posts.pop(post_id, None)
+        if post is None:
+            return None
+        for comment_id in list(self._comments_by_post.get(post_id, ())):
+            self.delete_comment(comment_id)
+        _remove_from_index(self._posts_by_user, post["user_id"], post_id)
+        self._notify('delete', 'posts', post)
+        return post
+
+    def delete_comment(self, comment_id):
+        comment = self._comments.pop(comment_id, None)
+        if comment is None:
+            return None
+        _remove_from_index(self._comments_by_post, comment["post_id"], comment_id)
+        self._notify('delete', 'comments', comment)
+        return comment
+
+    # Consultas
+    # Sem `fields` os próprios registros armazenados são retornados (não devem
+    # ser alterados); com `fields`, um dicionário novo só com os campos pedidos.
+    # `after` retorna apenas registros com id maior (paginação por cursor)
+    def get_user(self, user_id, fields=None):
+        return _project(self._users.get(user_id), fields)
+
+    def get_posts_by_user(self, user_id, limit=None, fields=None, after=None):
+        post_ids = _keyset(self._posts_by_user.get(user_id, ()), limit, after)
+        return [_project(self._posts[post_id], fields) for post_id in post_ids]
+
+    def get_comments_by_post(self, post_id, limit=None, fields=None, after=None):
+        comment_ids = _keyset(self._comments_by_post.get(post_id, ()), limit, after)
+        return [_project(self._comments[comment_id], fields) for comment_id in comment_ids]
+
+    def all_users(self, fields=None, limit=None, after=None):
+        if limit or after is not None:
+            users = [self._users[user_id] for user_id in _keyset(self._user_ids, limit, after)]
+        else:
+            users = self._users.values()
+        if fields is None:
+            return list(users)
+        return [_project(user, fields) for user in users]
+
+    def max_fan_out(self):
+        """Maior número de posts de um usuário e de comentários de um post"""
+        return (max(map(len, self._posts_by_user.values()), default=0),
+                max(map(len, self._comments_by_post.values()), default=0))
+
+
+def _project(record, fields):
+    """Projeção de um registro nos campos informados (None = registro inteiro)"""
+    if record is None or fields is None:
+        return record
+    return {field: record[field] for field in fields}
+
+
+def _keyset(ids, limit=None, after=None):
+    """Fatia de um índice ordenado de ids: os `limit` primeiros maiores que `after`"""
+    start = 0 if after is None else bisect_right(ids, after)
+    if limit:
+        return ids[start:start + limit]
+    return ids[start:] if start else ids
+
+
+def _remove_from_index(index, key, record_id):
+    """Remove um id de um índice de chave estrangeira ordenado"""
+    ids = index.get(key)
+    if not ids:
+        return
+    pos = bisect_left(ids, record_id)
+    if pos < len(ids) and ids[pos] == record_id:
+        del ids[pos]
+    if not ids:
+        del index[key]
+
+
+# Backends de armazenamento disponíveis
+BACKENDS = {
+    'dict': DataStore,
+    'compact': CompactDataStore,
+}
+
+# Ouvintes de escritas na instância global (sobrevivem à troca de backend)
+_change_listeners = []
+
+
+def add_change_listener(listener):
+    """
+    Registra listener(action, table, record), chamado após cada escrita na
+    instância global (ver change_events)
+    """
+    _change_listeners.append(listener)
+
+
+def remove_change_listener(listener):
+    if listener in _change_listeners:
+        _change_listeners.remove(listener)
+
+
+def _dispatch_change(action, table, record):
+    for listener in _change_listeners:
+        listener(action, table, record)
+
+
+# Instância global usada pelos servidores
+store = DataStore(USERS, POSTS, COMMENTS)
+store.add_listener(_dispatch_change)
+
+
+def set_backend(name):
+    """Troca o backend da instância global ('dict' ou 'compact') e recarrega os dados fixos"""
+    global store
+    if name not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {name} (opções: {', '.join(BACKENDS)})")
+    store = BACKENDS[name](USERS, POSTS, COMMENTS)
+    store.add_listener(_dispatch_change)
+    _dispatch_change('clear', None, None)
+
+
+def load_generated(generator):
+    """
+    Substitui os dados da instância global por um dataset gerado
+
+    Os registros são inseridos bloco a bloco, sem materializar as listas
+    completas do gerador. Com generator=None os dados fixos são restaurados.
+    """
+    store.clear()
+    if generator is None:
+        store.load(USERS, POSTS, COMMENTS)
+        return
+    for table, insert in (('users', store.insert_user),
+                          ('posts', store.insert_post),
+                          ('comments', store.insert_comment)):
+        for chunk in generator.iter_chunks(table):
+            for record in chunk:
+                insert(record)
+
+
+# Nas consultas abaixo, `fields` (sequência de nomes de campos) restringe os
+# campos de cada registro retornado; None retorna os registros completos.
+# `after` (id) retorna apenas registros com id maior, para paginação por cursor
+
+def get_user_by_id(user_id, fields=None):
     """Retorna um usuário por ID"""
-    return next((user for user in USERS if user["id"] == user_id), None)
+    return store.get_user(user_id, fields)
 
 
-def get_posts_by_user_id(user_id, limit=None):
+def get_posts_by_user_id(user_id, limit=None, fields=None, after=None):
     """Retorna posts de um usuário"""
-    posts = [post for post in POSTS if post["user_id"] == user_id]
-    if limit:
-        posts = posts[:limit]
-    return posts
+    return store.get_posts_by_user(user_id, limit, fields, after)
 
 
-def get_comments_by_post_id(post_id, limit=None):
+def get_comments_by_post_id(post_id, limit=None, fields=None, after=None):
     """Retorna comentários de um post"""
-    comments = [comment for comment in COMMENTS if comment["post_id"] == post_id]
-    if limit:
-        comments = comments[:limit]
-    return comments
+    return store.get_comments_by_post(post_id, limit, fields, after)
+
+
+def get_posts_by_user_ids(user_ids, limit=None, fields=None, after=None):
+    """Retorna os posts de vários usuários de uma vez: {user_id: [posts]}"""
+    return {user_id: store.get_posts_by_user(user_id, limit, fields, after)
+            for user_id in user_ids}
+
+
+def get_comments_by_post_ids(post_ids, limit=None, fields=None, after=None):
+    """Retorna os comentários de vários posts de uma vez: {post_id: [comentários]}"""
+    return {post_id: store.get_comments_by_post(post_id, limit, fields, after)
+            for post_id in post_ids}
+
+
+def get_all_users(fields=None, limit=None, after=None):
+    """Retorna todos os usuários (ou os `limit` primeiros com id maior que `after`)"""
+    return store.all_users(fields, limit, after)
 
 
-def get_all_users():
-    """Retorna todos os usuários"""
-    return USERS
+def get_max_fan_out():
+    """(máximo de posts por usuário, máximo de comentários por post) nos dados atuais"""
+    return store.max_fan_out()
@@ -0,0 +1,186 @@
+"""
+Gerador determinístico de dados sintéticos para o experimento GraphQL vs REST
+
+Gera usuários, posts e comentários em blocos (chunks) a partir de uma semente,
+com distribuição de fan-out assimétrica (Zipf) entre usuários -> posts e
+posts -> comentários. Nenhuma tabela é materializada inteira pelo gerador:
+apenas um bloco por vez e as tabelas de pesos acumulados da distribuição.
+"""
+import argparse
+import os
+import random
+from array import array
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+
+# Faixas de escala pré-definidas (usuários, posts, comentários)
+SCALES = {
+    'small': {'users': 100, 'posts': 1_000, 'comments': 10_000},
+    'medium': {'users': 1_000, 'posts': 50_000, 'comments': 500_000},
+    'large': {'users': 10_000, 'posts': 1_000_000, 'comments': 10_000_000},
+}
+
+# Backend padrão por escala (as demais usam 'dict'): com dicts (~420 bytes por registro),
+# os 11M de registros de 'large' exigem vários GB; o backend compacto usa ~83 bytes
+SCALE_BACKENDS = {'large': 'compact'}
+
+FIRST_NAMES = ["Alice", "Bob", "Carol", "David", "Eve", "Frank", "Grace", "Heidi",
+               "Ivan", "Judy", "Mallory", "Niaj", "Olivia", "Peggy", "Rupert", "Sybil",
+               "Trent", "Victor", "Walter", "Yara"]
+LAST_NAMES = ["Johnson", "Smith", "White", "Brown", "Davis", "Miller", "Wilson", "Moore",
+              "Taylor", "Anderson", "Thomas", "Jackson", "Martin", "Lee", "Clark", "Lewis"]
+LOCATIONS = [("New York", "USA"), ("London", "UK"), ("Toronto", "Canada"),
+             ("Sydney", "Australia"), ("Berlin", "Germany"), ("São Paulo", "Brazil"),
+             ("Tokyo", "Japan"), ("Paris", "France"), ("Madrid", "Spain"), ("Lisbon", "Portugal")]
+TOPICS = ["GraphQL", "REST", "Python", "Docker", "Kubernetes", "React", "TypeScript",
+          "Databases", "Security", "Testing", "Machine Learning", "DevOps", "Caching",
+          "Microservices", "Performance"]
+TITLE_TEMPLATES = ["Getting Started with {}", "Advanced {}", "{} Best Practices",
+                   "{} Deep Dive", "{} in Production", "Why {} Matters"]
+COMMENT_AUTHORS = 1000
+
+
+def _zipf_cum_weights(n: int, skew: float) -> array:
+    """Pesos acumulados de uma distribuição Zipf com expoente `skew` sobre 1..n"""
+    cum_weights = array('d')
+    total = 0.0
+    for rank in range(1, n + 1):
+        total += 1.0 / (rank ** skew)
+        cum_weights.append(total)
+    return cum_weights
+
+
+def _chunked(iterable, size: int) -> Iterator[List[Dict]]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class DatasetGenerator:
+    """
+    Gera um dataset sintético determinístico
+
+    Cada tabela usa um gerador aleatório próprio derivado da semente, então
+    posts e comentários são os mesmos independentemente de quais tabelas
+    foram consumidas antes.
+    """
+
+    def __init__(self, users: int, posts: int, comments: int, seed: int = 42,
+                 skew: float = 1.1, chunk_size: int = 10_000):
+        if users < 1 or posts < 0 or comments < 0:
+            raise ValueError("Escala inválida: é preciso ao menos um usuário")
+        if comments and not posts:
+            raise ValueError("Escala inválida: comentários exigem ao menos um post")
+        self.users = users
+        self.posts = posts
+        self.comments = comments
+        self.seed = seed
+        self.skew = skew
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_scale(cls, scale: str, **kwargs) -> 'DatasetGenerator':
+        """Cria um gerador a partir de uma faixa pré-definida (small, medium, large)"""
+        if scale not in SCALES:
+            raise ValueError(f"Escala desconhecida: {scale} (opções: {', '.join(SCALES)})")
+        return cls(**SCALES[scale], **kwargs)
+
+    def _rng(self, table: str) -> random.Random:
+        return random.Random(f"{self.seed}:{table}")
+
+    def iter_users(self) -> Iterator[Dict]:
+        rng = self._rng('users')
+        for user_id in range(1, self.users + 1):
+            first = rng.choice(FIRST_NAMES)
+            last = rng.choice(LAST_NAMES)
+            city, country = rng.choice(LOCATIONS)
+            yield {
+                "id": user_id,
+                "name": f"{first} {last}",
+                "email": f"{first.lower()}.{last.lower()}{user_id}@example.com",
+                "age": rng.randint(18, 70),
+                "city": city,
+                "country": country
+            }
+
+    def iter_posts(self) -> Iterator[Dict]:
+        rng = self._rng('posts')
+        population = range(1, self.users + 1)
+        cum_weights = _zipf_cum_weights(self.users, self.skew)
+        post_id = 0
+        while post_id < self.posts:
+            size = min(self.chunk_size, self.posts - post_id)
+            for user_id in rng.choices(population, cum_weights=cum_weights, k=size):
+                post_id += 1
+                topic = rng.choice(TOPICS)
+                yield {
+                    "id": post_id,
+                    "user_id": user_id,
+                    "title": rng.choice(TITLE_TEMPLATES).format(topic),
+                    "content": f"All about {topic}...",
+                    "likes": rng.randint(0, 500)
+                }
+
+    def iter_comments(self) -> Iterator[Dict]:
+        rng = self._rng('comments')
+        population = range(1, self.posts + 1)
+        cum_weights = _zipf_cum_weights(self.posts, self.skew) if self.comments else None
+        comment_id = 0
+        while comment_id < self.comments:
+            size = min(self.chunk_size, self.comments - comment_id)
+            for post_id in rng.choices(population, cum_weights=cum_weights, k=size):
+                comment_id += 1
+                yield {
+                    "id": comment_id,
+                    "post_id": post_id,
+                    "author": f"User{rng.randrange(COMMENT_AUTHORS)}",
+                    "text": f"Great post! Comment {comment_id}"
+                }
+
+    def iter_chunks(self, table: str) -> Iterator[List[Dict]]:
+        """Itera uma tabela ('users', 'posts' ou 'comments') em blocos de `chunk_size`"""
+        iterators = {
+            'users': self.iter_users,
+            'posts': self.iter_posts,
+            'comments': self.iter_comments,
+        }
+        return _chunked(iterators[table](), self.chunk_size)
+
+
+def add_scale_arguments(parser: argparse.ArgumentParser):
+    """Adiciona as opções de escala do dataset a um parser de linha de comando"""
+    group = parser.add_argument_group('dataset')
+    group.add_argument('--scale', default=os.environ.get('DATA_SCALE', 'base'),
+                       help="Faixa de dados: base (dados fixos), " + ", ".join(SCALES) +
+                            " ou custom (usa --users/--posts/--comments)")
+    group.add_argument('--users', type=int, default=None)
+    group.add_argument('--posts', type=int, default=None)
+    group.add_argument('--comments', type=int, default=None)
+    group.add_argument('--seed', type=int, default=int(os.environ.get('DATA_SEED', 42)))
+    group.add_argument('--skew', type=float, default=1.1,
+                       help="Expoente Zipf do fan-out (0 = uniforme)")
+    group.add_argument('--backend', default=os.environ.get('DATA_BACKEND'),
+                       choices=['dict', 'compact'],
+                       help="Representação em memória: dicts por registro ou colunar compacta "
+                            "(padrão: compact na escala large, que com dicts exige vários GB; "
+                            "dict nas demais)")
+
+
+def backend_from_args(args: argparse.Namespace) -> str:
+    """Backend pedido em --backend / DATA_BACKEND ou, sem ele, o padrão da escala"""
+    return args.backend or SCALE_BACKENDS.get(args.scale, 'dict')
+
+
+def generator_from_args(args: argparse.Namespace) -> Optional[DatasetGenerator]:
+    """Cria o gerador correspondente às opções; None significa usar os dados fixos"""
+    if args.scale == 'base':
+        return None
+    if args.scale == 'custom':
+        if None in (args.users, args.posts, args.comments):
+            raise ValueError("A escala custom exige --users, --posts e --comments")
+        return DatasetGenerator(args.users, args.posts, args.comments,
+                                seed=args.seed, skew=args.skew)
+    return DatasetGenerator.from_scale(args.scale, seed=args.seed, skew=args.skew)
@@ -1,16 +1,66 @@
 """
 Servidor GraphQL usando Graphene e Flask
 """
+import argparse
+import os
+import time
+from inspect import isawaitable
+
 from flask import Flask
 from flask_cors import CORS
 import graphene
 from graphene import ObjectType, String, Int, List, Field, Schema
+from graphene.relay import Connection, PageInfo
+from graphql import ExecutionResult, execute
 from data import (
-    get_user_by_id,
-    get_posts_by_user_id,
-    get_comments_by_post_id,
-    get_all_users
+    COMMENTS,
+    POSTS,
+    USERS,
+    add_change_listener,
+    get_all_users,
+    get_max_fan_out,
+    load_generated,
+    set_backend
+)
+from change_events import tags_for_change
+from compression import compressor_from_env, enable_compression
+from metrics import RequestMetrics, enable_metrics
+from profiler import enable_profiling, profiler_from_env
+from loaders import RequestContext
+from pagination import decode_cursor, encode_cursor, make_page, page_size
+from query_cache import DocumentCache, query_hash
+from resolver_cache import ResolverCache
+from persisted_queries import PersistedQueryError, PersistedQueryStore
+from query_cost import (
+    CostAnalyzer,
+    QueryCostError,
+    QueryThrottle,
+    count_objects,
+    maxima_for_dataset,
+    multipliers_for_dataset
 )
+from serializers import SerializerJSONProvider
+from tracing import TRACE_HEADER, Tracer, tracing_middleware
+from data_generator import add_scale_arguments, backend_from_args, generator_from_args
+from serving import add_serving_arguments, serve
+
+
+def build_connection(connection_type, node_type, load_page, first, after):
+    """
+    Página de uma connection (estilo Relay) paginada por cursor
+    load_page(limit, after_id) lê até `limit` registros com id maior que o cursor;
+    um registro a mais que `first` indica que existe uma próxima página
+    """
+    limit = page_size(first)
+    page = make_page(load_page(limit + 1, decode_cursor(after)), limit)
+    edges = [connection_type.Edge(node=node_type(**record), cursor=encode_cursor(record['id']))
+             for record in page.records]
+    return connection_type(
+        edges=edges,
+        page_info=PageInfo(has_next_page=page.has_next, has_previous_page=after is not None,
+                           start_cursor=edges[0].cursor if edges else None,
+                           end_cursor=page.end_cursor)
+    )
 
 
 # Definição dos tipos GraphQL
@@ -21,6 +71,11 @@ class Comment(ObjectType):
     text = String()
 
 
+class CommentConnection(Connection):
+    class Meta:
+        node = Comment
+
+
 class Post(ObjectType):
     id = Int()
     user_id = Int()
@@ -28,9 +83,21 @@ class Post(ObjectType):
     content = String()
     likes = Int()
     comments = List(Comment, limit=Int())
+    comments_connection = Field(CommentConnection, first=Int(), after=String())
 
     def resolve_comments(self, info, limit=None):
-        return get_comments_by_post_id(self.id, limit)
+        return info.context.load_comments(self.id, limit)
+
+    def resolve_comments_connection(self, info, first=None, after=None):
+        return build_connection(
+            CommentConnection, Comment,
+            lambda limit, after_id: info.context.load_comments(self.id, limit, after_id),
+            first, after)
+
+
+class PostConnection(Connection):
+    class Meta:
+        node = Post
 
 
 class User(ObjectType):
@@ -41,15 +108,29 @@ class User(ObjectType):
     city = String()
     country = String()
     posts = List(Post, limit=Int())
+    posts_connection = Field(PostConnection, first=Int(), after=String())
 
     def resolve_posts(self, info, limit=None):
-        return [Post(**post) for post in get_posts_by_user_id(self.id, limit)]
+        return [Post(**post) for post in info.context.load_posts(self.id, limit)]
+
+    def resolve_posts_connection(self, info, first=None, after=None):
+        return build_connection(
+            PostConnection, Post,
+            lambda limit, after_id: info.context.load_posts(self.id, limit, after_id),
+            first, after)
+
+
+class UserConnection(Connection):
+    class Meta:
+        node = User
 
 
 # Queries disponíveis
 class Query(ObjectType):
     user = Field(User, id=Int(required=True))
     users = List(User)
+    # Versão paginada por cursor de `users` (first/after, estilo Relay)
+    users_connection = Field(UserConnection, first=Int(), after=String())
     
     # Query complexa: usuário com posts e comentários
     user_with_posts = Field(
@@ -60,16 +141,19 @@ class Query(ObjectType):
     )
 
     def resolve_user(self, info, id):
-        user_data = get_user_by_id(id)
+        user_data = info.context.get_user(id)
         if user_data:
             return User(**user_data)
         return None
 
     def resolve_users(self, info):
-        return [User(**user) for user in get_all_users()]
+        return [User(**user) for user in info.context.get_all_users()]
+
+    def resolve_users_connection(self, info, first=None, after=None):
+        return build_connection(UserConnection, User, info.context.get_users_page, first, after)
     
     def resolve_user_with_posts(self, info, id, posts_limit=5, comments_limit=3):
-        user_data = get_user_by_id(id)
+        user_data = info.context.get_user(id)
         if not user_data:
             return None
         return User(**user_data)
@@ -78,28 +162,279 @@ class Query(ObjectType):
 # Schema GraphQL
 schema = Schema(query=Query)
 
+# Cache LRU de documentos analisados/validados (QUERY_CACHE_SIZE=0 desativa)
+document_cache = DocumentCache(schema.graphql_schema, int(os.environ.get('QUERY_CACHE_SIZE', 256)))
+
+
+# Cache de resultados de resolvers entre requisições, opcional para que a latência padrão
+# meça o trabalho dos resolvers (RESOLVER_CACHE_SIZE=0, o padrão, desativa)
+resolver_cache = ResolverCache(int(os.environ.get('RESOLVER_CACHE_SIZE', 0)),
+                               float(os.environ.get('RESOLVER_CACHE_TTL', 60)))
+
+
+def invalidate_cached_fields(action, table, record):
+    """Descarta os resultados de campos afetados por uma escrita na camada de dados"""
+    if action == 'clear':
+        resolver_cache.clear()
+    else:
+        resolver_cache.invalidate(tags_for_change(table, record))
+
+
+add_change_listener(invalidate_cached_fields)
+
+
+# Persisted queries: registro prévio (PERSISTED_QUERIES_FILE) e/ou automático (APQ)
+persisted_queries = PersistedQueryStore(
+    allow_automatic=os.environ.get('PERSISTED_QUERIES_AUTOMATIC', '1') != '0',
+    max_automatic=int(os.environ.get('PERSISTED_QUERIES_CACHE_SIZE', 1024))
+)
+if os.environ.get('PERSISTED_QUERIES_FILE'):
+    persisted_queries.load_file(os.environ['PERSISTED_QUERIES_FILE'])
+
+
+# Orçamentos de custo/profundidade por query (0 = sem limite) e fila para as
+# queries caras (QUERY_THROTTLE_COST=0 desativa); ver query_cost.py
+cost_analyzer = CostAnalyzer(schema.graphql_schema,
+                             max_cost=int(os.environ.get('QUERY_MAX_COST', 50000)),
+                             max_depth=int(os.environ.get('QUERY_MAX_DEPTH', 15)))
+query_throttle = QueryThrottle(int(os.environ.get('QUERY_THROTTLE_COST', 0)),
+                               int(os.environ.get('QUERY_THROTTLE_SLOTS', 1)),
+                               float(os.environ.get('QUERY_THROTTLE_TIMEOUT', 5)))
+
+
+# Amostragem do tracing por fase/resolver (TRACING_SAMPLE_RATE, 0 a 1); ver tracing.py
+tracer = Tracer(float(os.environ.get('TRACING_SAMPLE_RATE', 0)))
+
+
+def configure_cost_analyzer(generator=None):
+    """
+    Cardinalidades do dataset carregado (gerado ou fixo): médias para as listas
+    sem limite e o maior fan-out observado como teto para `limit`/`first`
+    """
+    if generator is None:
+        users, posts, comments = len(USERS), len(POSTS), len(COMMENTS)
+    else:
+        users, posts, comments = generator.users, generator.posts, generator.comments
+    cost_analyzer.set_fan_out(multipliers_for_dataset(users, posts, comments),
+                              maxima_for_dataset(users, *get_max_fan_out()))
+
+
+configure_cost_analyzer()
+
+
+def load_document(query, variables=None, context=None, query_key=None):
+    """
+    Documento validado da query (do cache quando ativo) e seus erros; o custo
+    estimado é verificado aqui (QueryCostError) e guardado em context.query_cost
+    """
+    trace = getattr(context, 'trace', None)
+    if document_cache.enabled:
+        document, errors = document_cache.get(query, key=query_key, trace=trace)
+    else:
+        document, errors = document_cache.compile(query, trace)
+    if not errors:
+        estimate = cost_analyzer.estimate(document, variables)
+        cost_analyzer.check(estimate)
+        if context is not None:
+            context.query_cost = estimate
+    return document, errors
+
+
+def record_cost(result, context):
+    """Registra o custo real (objetos no resultado) contra o estimado"""
+    if context is not None and context.query_cost is not None:
+        context.actual_cost = count_objects(result.data)
+        cost_analyzer.record(context.query_cost, context.actual_cost)
+
+
+def execute_query(query, variables=None, context=None, query_key=None):
+    """
+    Executa uma query, reaproveitando o documento validado quando o cache está
+    ativo; queries acima dos orçamentos de custo levantam QueryCostError
+    """
+    if not isinstance(query, str):
+        return schema.execute(query, variables=variables, context_value=context)
+    
+    document, errors = load_document(query, variables, context, query_key)
+    if errors:
+        return ExecutionResult(data=None, errors=errors)
+    trace = getattr(context, 'trace', None)
+    with query_throttle.admit(getattr(context, 'query_cost', None)):
+        start = time.perf_counter_ns()
+        # O middleware de tracing só entra nas requisições amostradas
+        result = execute(schema.graphql_schema, document,
+                         variable_values=variables, context_value=context,
+                         middleware=tracing_middleware if trace is not None else None)
+        if trace is not None:
+            trace.record_phase('execution', start, time.perf_counter_ns())
+    record_cost(result, context)
+    return result
+
+
+async def execute_query_async(query, variables=None, context=None, query_key=None):
+    """Versão assíncrona de execute_query, usada pelo servidor ASGI"""
+    if not isinstance(query, str):
+        return await schema.execute_async(query, variables=variables, context_value=context)
+    
+    document, errors = load_document(query, variables, context, query_key)
+    if errors:
+        return ExecutionResult(data=None, errors=errors)
+    trace = getattr(context, 'trace', None)
+    async with query_throttle.admit_async(getattr(context, 'query_cost', None)):
+        start = time.perf_counter_ns()
+        result = execute(schema.graphql_schema, document,
+                         variable_values=variables, context_value=context,
+                         middleware=tracing_middleware if trace is not None else None)
+        if isawaitable(result):
+            result = await result
+        if trace is not None:
+            trace.record_phase('execution', start, time.perf_counter_ns())
+    record_cost(result, context)
+    return result
+
+
+def cost_headers(context):
+    """Custo estimado, custo real e profundidade da query (cabeçalhos X-Query-*)"""
+    if context.query_cost is None:
+        return {}
+    return {
+        'X-Query-Cost-Estimated': str(context.query_cost.cost),
+        'X-Query-Cost-Actual': str(context.actual_cost),
+        'X-Query-Depth': str(context.query_cost.depth),
+    }
+
+
+def format_result(result, trace=None):
+    """Converte o ExecutionResult no corpo JSON da resposta (com extensions.tracing, se houver trace)"""
+    response = {}
+    if result.data:
+        response['data'] = result.data
+    if result.errors:
+        response['errors'] = [str(error) for error in result.errors]
+    if trace is not None:
+        response['extensions'] = {'tracing': trace.extension()}
+    return response
+
+
+def operation_label(data, query, query_key=None):
+    """Operação nas métricas: operationName ou 'anonymous:<início do hash da query>'"""
+    if data.get('operationName'):
+        return data['operationName']
+    if not isinstance(query, str):
+        return ''
+    return f"anonymous:{(query_key or query_hash(query))[:12]}"
+
+
+def start_trace(context, headers):
+    """
+    Inicia o trace da requisição (amostrada ou pedida pelo cliente com
+    X-GraphQL-Trace: 1) e retorna se ele deve ir na resposta
+    """
+    requested = headers.get(TRACE_HEADER) == '1'
+    context.trace = tracer.start(force=requested)
+    return requested
+
+
+def finish_trace(context, serialization_start):
+    """Registra a serialização e agrega o trace nos histogramas de GET /graphql/tracing"""
+    if context.trace is not None:
+        context.trace.record_phase('serialization', serialization_start, time.perf_counter_ns())
+        context.trace.finish()
+        tracer.record(context.trace)
+
+
 # Aplicação Flask
 app = Flask(__name__)
 CORS(app)
+# jsonify usa o serializador de JSON_SERIALIZER (stdlib, orjson, auto)
+app.json = SerializerJSONProvider(app)
+
+# Métricas Prometheus em /metrics e Server-Timing (antes da compressão, para medi-la também)
+metrics = RequestMetrics()
+enable_metrics(app, metrics)
+
+# Profiler por amostragem, pilhas por rota/operação (PROFILE=1 ou PROFILE_ADMIN=1)
+profiler = profiler_from_env()
+enable_profiling(app, profiler)
+
+# Compressão negociada por Accept-Encoding (COMPRESSION, COMPRESSION_MIN_SIZE, COMPRESSION_LEVEL)
+compressor = compressor_from_env()
+enable_compression(app, compressor)
 
 
 @app.route('/graphql', methods=['POST'])
 def graphql_server():
-    from flask import request, jsonify
+    from flask import g, request, jsonify
     data = request.get_json()
     
-    query = data.get('query')
     variables = data.get('variables')
     
-    result = schema.execute(query, variables=variables)
+    # Com a extensão persistedQuery o cliente pode enviar apenas o hash
+    try:
+        query, query_key = persisted_queries.resolve(data.get('query'), data.get('extensions'))
+    except PersistedQueryError as error:
+        g.metrics_error = 'graphql'
+        return jsonify({'errors': [str(error)]})
+    g.metrics_operation = metrics.operation(operation_label(data, query, query_key))
+    profiler.annotate(g.metrics_operation)
     
-    response = {}
-    if result.data:
-        response['data'] = result.data
+    # Contexto por requisição com os carregadores em lote (evita N+1)
+    context = RequestContext(resolver_cache)
+    include_trace = start_trace(context, request.headers)
+    try:
+        result = execute_query(query, variables, context, query_key)
+    except QueryCostError as error:
+        g.metrics_error = 'rejected'
+        return jsonify({'errors': [str(error)]})
     if result.errors:
-        response['errors'] = [str(error) for error in result.errors]
+        g.metrics_error = 'graphql'
+    response = format_result(result, context.trace if include_trace else None)
     
-    return jsonify(response)
+    # Número de chamadas ao data.py e custo da query (fora do corpo,
+    # para não alterar o tamanho da resposta medido no experimento)
+    serialization_start = time.perf_counter_ns()
+    http_response = jsonify(response)
+    finish_trace(context, serialization_start)
+    http_response.headers['X-Backend-Calls'] = str(context.backend_calls)
+    http_response.headers.update(cost_headers(context))
+    return http_response
+
+
+@app.route('/graphql/cache', methods=['GET'])
+def graphql_cache_stats():
+    """Contadores do cache de documentos (hits, misses, evictions)"""
+    from flask import jsonify
+    return jsonify(document_cache.stats())
+
+
+@app.route('/graphql/persisted', methods=['GET'])
+def persisted_query_stats():
+    """Persisted queries pré-registradas e automáticas (tamanho, hits, evictions)"""
+    from flask import jsonify
+    return jsonify(persisted_queries.stats())
+
+
+@app.route('/graphql/resolver-cache', methods=['GET'])
+def resolver_cache_stats():
+    """Contadores do cache de resolvers, no total e por campo (ex.: User.posts)"""
+    from flask import jsonify
+    return jsonify(resolver_cache.stats())
+
+
+@app.route('/graphql/cost', methods=['GET'])
+def query_cost_stats():
+    """Orçamentos, rejeições, fila e custo médio estimado vs real das queries"""
+    from flask import jsonify
+    return jsonify({**cost_analyzer.stats(), 'throttle': query_throttle.stats()})
+
+
+@app.route('/graphql/tracing', methods=['GET', 'DELETE'])
+def tracing_stats():
+    """Histogramas (ms) das requisições amostradas por fase e por resolver; DELETE zera"""
+    from flask import request, jsonify
+    if request.method == 'DELETE':
+        tracer.reset()
+    return jsonify(tracer.stats())
 
 
 @app.route('/health', methods=['GET'])
@@ -109,6 +444,16 @@ def health():
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servidor GraphQL API")
+    add_scale_arguments(parser)
+    add_serving_arguments(parser)
+    args = parser.parse_args()
+    backend = backend_from_args(args)
+    set_backend(backend)
+    generator = generator_from_args(args)
+    load_generated(generator)
+    configure_cost_analyzer(generator)
+    print(f"Dataset: {args.scale}/{backend} ({len(get_all_users())} usuários)")
     print("Starting GraphQL API server on http://localhost:5001")
     print("GraphQL endpoint: http://localhost:5001/graphql")
-    app.run(host='0.0.0.0', port=5001, debug=False)
+    serve(app, host='0.0.0.0', port=5001, workers=args.workers)
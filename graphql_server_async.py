@@ -0,0 +1,135 @@
+"""
+Servidor GraphQL assíncrono (ASGI) usando Starlette
+Mesmo schema do graphql_server.py, executado com a API assíncrona do graphene
+"""
+import argparse
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.routing import Route
+
+from asgi_support import (
+    JSONResponse,
+    MIDDLEWARE,
+    PROFILER_ROUTES,
+    metrics_endpoint,
+    profiler,
+    request_metrics
+)
+from data import get_all_users, load_generated, set_backend
+from data_generator import add_scale_arguments, backend_from_args, generator_from_args
+from graphql_server import (
+    configure_cost_analyzer,
+    cost_analyzer,
+    cost_headers,
+    document_cache,
+    execute_query_async,
+    finish_trace,
+    format_result,
+    operation_label,
+    persisted_queries,
+    query_throttle,
+    resolver_cache,
+    start_trace,
+    tracer
+)
+from loaders import RequestContext
+from persisted_queries import PersistedQueryError
+from query_cost import QueryCostError
+
+
+async def graphql_server(request):
+    data = await request.json()
+    
+    variables = data.get('variables')
+    
+    # Com a extensão persistedQuery o cliente pode enviar apenas o hash
+    try:
+        query, query_key = persisted_queries.resolve(data.get('query'), data.get('extensions'))
+    except PersistedQueryError as error:
+        request.state.metrics_error = 'graphql'
+        return JSONResponse({'errors': [str(error)]})
+    request.state.metrics_operation = request_metrics.operation(operation_label(data, query, query_key))
+    profiler.annotate(request.state.metrics_operation)
+    
+    # Contexto por requisição com os carregadores em lote (evita N+1)
+    context = RequestContext(resolver_cache)
+    include_trace = start_trace(context, request.headers)
+    try:
+        result = await execute_query_async(query, variables, context, query_key)
+    except QueryCostError as error:
+        request.state.metrics_error = 'rejected'
+        return JSONResponse({'errors': [str(error)]})
+    if result.errors:
+        request.state.metrics_error = 'graphql'
+    
+    serialization_start = time.perf_counter_ns()
+    response = JSONResponse(format_result(result, context.trace if include_trace else None),
+                            headers={'X-Backend-Calls': str(context.backend_calls),
+                                     **cost_headers(context)})
+    finish_trace(context, serialization_start)
+    return response
+
+
+async def graphql_cache_stats(request):
+    """Contadores do cache de documentos (hits, misses, evictions)"""
+    return JSONResponse(document_cache.stats())
+
+
+async def persisted_query_stats(request):
+    """Persisted queries pré-registradas e automáticas (tamanho, hits, evictions)"""
+    return JSONResponse(persisted_queries.stats())
+
+
+async def resolver_cache_stats(request):
+    """Contadores do cache de resolvers, no total e por campo (ex.: User.posts)"""
+    return JSONResponse(resolver_cache.stats())
+
+
+async def query_cost_stats(request):
+    """Orçamentos, rejeições, fila e custo médio estimado vs real das queries"""
+    return JSONResponse({**cost_analyzer.stats(), 'throttle': query_throttle.stats()})
+
+
+async def tracing_stats(request):
+    """Histogramas (ms) das requisições amostradas por fase e por resolver; DELETE zera"""
+    if request.method == 'DELETE':
+        tracer.reset()
+    return JSONResponse(tracer.stats())
+
+
+async def health(request):
+    return JSONResponse({"status": "ok", "service": "GraphQL API (async)"})
+
+
+app = Starlette(
+    routes=[
+        Route('/graphql', graphql_server, methods=['POST']),
+        Route('/graphql/cache', graphql_cache_stats, methods=['GET']),
+        Route('/graphql/persisted', persisted_query_stats, methods=['GET']),
+        Route('/graphql/resolver-cache', resolver_cache_stats, methods=['GET']),
+        Route('/graphql/cost', query_cost_stats, methods=['GET']),
+        Route('/graphql/tracing', tracing_stats, methods=['GET', 'DELETE']),
+        Route('/metrics', metrics_endpoint, methods=['GET']),
+        Route('/health', health, methods=['GET']),
+        *PROFILER_ROUTES,
+    ],
+    middleware=MIDDLEWARE
+)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servidor GraphQL API assíncrono (ASGI)")
+    parser.add_argument('--port', type=int, default=5003)
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+    backend = backend_from_args(args)
+    set_backend(backend)
+    generator = generator_from_args(args)
+    load_generated(generator)
+    configure_cost_analyzer(generator)
+    print(f"Dataset: {args.scale}/{backend} ({len(get_all_users())} usuários)")
+    print(f"Starting async GraphQL API server on http://localhost:{args.port}")
+    print(f"GraphQL endpoint: http://localhost:{args.port}/graphql")
+    uvicorn.run(app, host='0.0.0.0', port=args.port)
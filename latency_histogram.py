@@ -0,0 +1,175 @@
+"""
+Histograma de latência no estilo HdrHistogram
+
+Os valores são registrados em microssegundos em buckets log-lineares com
+precisão relativa fixa (`significant_digits`), então a memória é constante,
+não importa quantas requisições sejam registradas. Histogramas com a mesma
+configuração podem ser somados (merge) e serializados em JSON.
+"""
+import math
+from array import array
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """Histograma log-linear de latências (valores de entrada em ms)"""
+
+    def __init__(self, lowest_us: int = 1, highest_us: int = 3_600_000_000,
+                 significant_digits: int = 3):
+        if lowest_us < 1 or highest_us < 2 * lowest_us:
+            raise ValueError("Faixa inválida para o histograma")
+        if not 1 <= significant_digits <= 5:
+            raise ValueError("significant_digits deve estar entre 1 e 5")
+        self.lowest_us = lowest_us
+        self.highest_us = highest_us
+        self.significant_digits = significant_digits
+
+        largest_single_unit = 2 * 10 ** significant_digits
+        self._unit_magnitude = int(math.floor(math.log2(lowest_us)))
+        self._sub_bucket_count_magnitude = int(math.ceil(math.log2(largest_single_unit)))
+        self._sub_bucket_half_count_magnitude = self._sub_bucket_count_magnitude - 1
+        self._sub_bucket_count = 1 << self._sub_bucket_count_magnitude
+        self._sub_bucket_half_count = self._sub_bucket_count // 2
+        self._sub_bucket_mask = (self._sub_bucket_count - 1) << self._unit_magnitude
+
+        smallest_untrackable = self._sub_bucket_count << self._unit_magnitude
+        bucket_count = 1
+        while smallest_untrackable <= highest_us:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+        self._counts = array('q', bytes(8 * (bucket_count + 1) * self._sub_bucket_half_count))
+
+        self.total_count = 0
+        self._total_us = 0
+        self._min_us = None
+        self._max_us = 0
+
+    # Indexação
+    def _index_of(self, value_us: int) -> int:
+        bucket_index = ((value_us | self._sub_bucket_mask).bit_length()
+                        - self._unit_magnitude - (self._sub_bucket_half_count_magnitude + 1))
+        sub_bucket_index = value_us >> (bucket_index + self._unit_magnitude)
+        return ((bucket_index + 1) << self._sub_bucket_half_count_magnitude) + \
+            (sub_bucket_index - self._sub_bucket_half_count)
+
+    def _range_of(self, index: int) -> Tuple[int, int]:
+        """Menor e maior valor (µs) equivalentes ao bucket de índice `index`"""
+        bucket_index = (index >> self._sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self._sub_bucket_half_count - 1)) + self._sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self._sub_bucket_half_count
+            bucket_index = 0
+        lowest = sub_bucket_index << (bucket_index + self._unit_magnitude)
+        return lowest, lowest + (1 << (bucket_index + self._unit_magnitude)) - 1
+
+    # Registro
+    def record(self, value_ms: float, count: int = 1):
+        """Registra uma latência em milissegundos"""
+        value_us = min(max(int(round(value_ms * 1000)), 0), self.highest_us)
+        self._counts[self._index_of(value_us)] += count
+        self.total_count += count
+        self._total_us += value_us * count
+        if self._min_us is None or value_us < self._min_us:
+            self._min_us = value_us
+        if value_us > self._max_us:
+            self._max_us = value_us
+
+    def record_array(self, values_ms):
+        """Registra um array de latências (ms) de uma vez, com NumPy"""
+        values_us = np.clip(np.rint(np.asarray(values_ms, dtype=np.float64) * 1000),
+                            0, self.highest_us).astype(np.int64)
+        if not values_us.size:
+            return
+        # frexp devolve o expoente exato, equivalente a int.bit_length()
+        bit_length = np.frexp((values_us | self._sub_bucket_mask).astype(np.float64))[1]
+        bucket_index = bit_length - self._unit_magnitude - (self._sub_bucket_half_count_magnitude + 1)
+        sub_bucket_index = values_us >> (bucket_index + self._unit_magnitude)
+        indexes = ((bucket_index + 1) << self._sub_bucket_half_count_magnitude) + \
+            (sub_bucket_index - self._sub_bucket_half_count)
+        counts = np.frombuffer(self._counts, dtype=np.int64)
+        counts += np.bincount(indexes, minlength=len(counts))
+        self.total_count += int(values_us.size)
+        self._total_us += int(values_us.sum())
+        low, high = int(values_us.min()), int(values_us.max())
+        if self._min_us is None or low < self._min_us:
+            self._min_us = low
+        self._max_us = max(self._max_us, high)
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Soma as contagens de outro histograma com a mesma configuração"""
+        if (other.lowest_us, other.highest_us, other.significant_digits) != \
+                (self.lowest_us, self.highest_us, self.significant_digits):
+            raise ValueError("Histogramas com configurações diferentes não podem ser combinados")
+        for index, count in other._nonzero():
+            self._counts[index] += count
+        self.total_count += other.total_count
+        self._total_us += other._total_us
+        if other._min_us is not None and (self._min_us is None or other._min_us < self._min_us):
+            self._min_us = other._min_us
+        self._max_us = max(self._max_us, other._max_us)
+        return self
+
+    # Consulta
+    def _nonzero(self) -> Iterator[Tuple[int, int]]:
+        return ((index, count) for index, count in enumerate(self._counts) if count)
+
+    def percentile(self, percent: float) -> float:
+        """Valor (ms) abaixo do qual estão `percent`% das amostras"""
+        if not self.total_count:
+            return 0.0
+        target = max(1, int(math.ceil(percent / 100 * self.total_count)))
+        cumulative = 0
+        for index, count in self._nonzero():
+            cumulative += count
+            if cumulative >= target:
+                return min(self._range_of(index)[1], self._max_us) / 1000
+        return self._max_us / 1000
+
+    @property
+    def mean(self) -> float:
+        return self._total_us / self.total_count / 1000 if self.total_count else 0.0
+
+    @property
+    def min(self) -> float:
+        return (self._min_us or 0) / 1000
+
+    @property
+    def max(self) -> float:
+        return self._max_us / 1000
+
+    def summary(self) -> Dict:
+        """Contagem, média, p50/p90/p99/p99.9 e máximo em ms"""
+        summary = {'count': self.total_count, 'mean': self.mean, 'min': self.min}
+        for percent in PERCENTILES:
+            summary[f"p{percent:g}"] = self.percentile(percent)
+        summary['max'] = self.max
+        return summary
+
+    # Serialização
+    def to_dict(self) -> Dict:
+        """Representação JSON compacta (apenas buckets não vazios)"""
+        return {
+            'lowest_us': self.lowest_us,
+            'highest_us': self.highest_us,
+            'significant_digits': self.significant_digits,
+            'total_count': self.total_count,
+            'total_us': self._total_us,
+            'min_us': self._min_us,
+            'max_us': self._max_us,
+            'counts': [[index, count] for index, count in self._nonzero()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LatencyHistogram':
+        histogram = cls(data['lowest_us'], data['highest_us'], data['significant_digits'])
+        for index, count in data['counts']:
+            histogram._counts[index] = count
+        histogram.total_count = data['total_count']
+        histogram._total_us = data['total_us']
+        histogram._min_us = data['min_us']
+        histogram._max_us = data['max_us']
+        return histogram
@@ -0,0 +1,169 @@
+"""
+Motor de geração de carga concorrente para o benchmark REST vs GraphQL
+
+Dois modos:
+- closed-loop: N usuários virtuais, cada um envia a próxima requisição assim
+  que recebe a resposta da anterior (a vazão depende da latência);
+- open-loop: requisições chegam a uma taxa fixa, independentemente das
+  respostas; se o servidor atrasa, as requisições esperam na fila e esse
+  tempo de espera é registrado (queue_ms).
+
+As latências vão para histogramas (LatencyHistogram) mantidos por thread e
+combinados no resumo, então a memória não cresce com o número de requisições
+quando as amostras individuais são desativadas (keep_samples=False). No modo
+open-loop, o histograma corrigido mede a partir do instante agendado da
+requisição (fila + atendimento), evitando coordinated omission.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from latency_histogram import LatencyHistogram
+
+# Função medida: retorna (tempo_ms, tamanho_bytes) ou lança exceção em caso de erro
+RequestFn = Callable[[], Tuple[float, int]]
+
+
+class _ThreadRecorder:
+    """Acumuladores de uma thread: histogramas e contadores"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.corrected = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+
+
+class LoadEngine:
+    """Executa uma função de requisição sob carga concorrente e agrega os resultados"""
+
+    def __init__(self, request_fn: RequestFn, concurrency: int = 10,
+                 keep_samples: bool = True):
+        self.request_fn = request_fn
+        self.concurrency = concurrency
+        self.keep_samples = keep_samples
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._samples = []
+        self._recorders = []
+        self._local = threading.local()
+
+    def _recorder(self) -> _ThreadRecorder:
+        recorder = getattr(self._local, 'recorder', None)
+        if recorder is None:
+            recorder = self._local.recorder = _ThreadRecorder()
+            with self._lock:
+                self._recorders.append(recorder)
+        return recorder
+
+    def _record(self, scheduled: float, start: float):
+        """Executa uma requisição e registra a amostra"""
+        sample = {'queue_ms': (start - scheduled) * 1000, 'error': None}
+        try:
+            sample['latency_ms'], sample['size_bytes'] = self.request_fn()
+        except Exception as e:
+            sample['latency_ms'] = (time.perf_counter() - start) * 1000
+            sample['size_bytes'] = 0
+            sample['error'] = str(e)
+
+        recorder = self._recorder()
+        recorder.requests += 1
+        recorder.bytes += sample['size_bytes']
+        if sample['error']:
+            recorder.errors += 1
+        else:
+            recorder.latency.record(sample['latency_ms'])
+            recorder.corrected.record(sample['queue_ms'] + sample['latency_ms'])
+        if self.keep_samples:
+            with self._lock:
+                self._samples.append(sample)
+
+    def run_closed_loop(self, duration: Optional[float] = 10.0,
+                        requests_per_user: Optional[int] = None) -> Dict:
+        """
+        N usuários virtuais (N = concurrency) em loop fechado
+        Para após `duration` segundos ou `requests_per_user` requisições por usuário
+        """
+        if duration is None and requests_per_user is None:
+            raise ValueError("Informe duration ou requests_per_user")
+        self._reset()
+        start_time = time.perf_counter()
+        deadline = start_time + duration if duration is not None else None
+
+        def virtual_user():
+            sent = 0
+            while requests_per_user is None or sent < requests_per_user:
+                now = time.perf_counter()
+                if deadline is not None and now >= deadline:
+                    break
+                self._record(now, now)
+                sent += 1
+
+        threads = [threading.Thread(target=virtual_user, daemon=True)
+                   for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return self._summary('closed', time.perf_counter() - start_time)
+
+    def run_open_loop(self, rate: float, duration: float = 10.0) -> Dict:
+        """
+        Chegadas a uma taxa fixa (`rate` req/s) durante `duration` segundos,
+        atendidas por até `concurrency` requisições simultâneas
+        """
+        if rate <= 0:
+            raise ValueError("A taxa de chegada deve ser positiva")
+        self._reset()
+        interval = 1.0 / rate
+        total = int(rate * duration)
+        start_time = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for i in range(total):
+                scheduled = start_time + i * interval
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(lambda s=scheduled: self._record(s, time.perf_counter()))
+
+        result = self._summary('open', time.perf_counter() - start_time)
+        result['target_rate_rps'] = rate
+        return result
+
+    def _summary(self, mode: str, elapsed: float) -> Dict:
+        latency = LatencyHistogram()
+        corrected = LatencyHistogram()
+        requests = errors = total_bytes = 0
+        for recorder in self._recorders:
+            latency.merge(recorder.latency)
+            corrected.merge(recorder.corrected)
+            requests += recorder.requests
+            errors += recorder.errors
+            total_bytes += recorder.bytes
+
+        summary = {
+            'mode': mode,
+            'concurrency': self.concurrency,
+            'duration_s': elapsed,
+            'requests': requests,
+            'errors': errors,
+            'error_rate': errors / requests if requests else 0.0,
+            'throughput_rps': (requests - errors) / elapsed if elapsed else 0.0,
+            'bytes': total_bytes,
+            'latency_ms': latency.summary(),
+            'histograms': {'latency': latency.to_dict()}
+        }
+        # No loop fechado o instante agendado é o próprio envio, então só o
+        # modo aberto tem uma latência corrigida diferente da de atendimento
+        if mode == 'open':
+            summary['corrected_latency_ms'] = corrected.summary()
+            summary['histograms']['corrected'] = corrected.to_dict()
+        if self.keep_samples:
+            summary['samples'] = self._samples
+        return summary
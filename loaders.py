@@ -0,0 +1,153 @@
+"""
+Carregadores em lote (estilo DataLoader) para os resolvers GraphQL
+
+Um RequestContext é criado por requisição. Quando um nível da árvore é
+resolvido (ex.: a lista de usuários), as chaves dos filhos são registradas
+como pendentes; no primeiro acesso a um filho, todas as chaves pendentes
+daquele nível são buscadas com uma única chamada em lote ao data.py.
+
+Com um ResolverCache, os resultados também são compartilhados entre
+requisições: só as chaves ausentes do cache vão para a chamada em lote.
+
+Os carregadores de posts e comentários são separados por (limit, after), o
+que atende tanto as listas com `limit` quanto as páginas das connections.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import data
+from resolver_cache import ResolverCache
+
+
+class BatchLoader:
+    """Carregador síncrono com cache por requisição e despacho em lote"""
+
+    def __init__(self, batch_fn: Callable[[List], Dict], pending: Dict):
+        # pending é compartilhado entre carregadores do mesmo nível da árvore
+        # (ex.: posts(limit: 2) e posts(limit: 5) no mesmo documento)
+        self._batch_fn = batch_fn
+        self._pending = pending
+        self._cache = {}
+
+    def load(self, key):
+        if key not in self._cache:
+            self.dispatch(key)
+        return self._cache[key]
+
+    def dispatch(self, key):
+        keys = [pending for pending in self._pending if pending not in self._cache]
+        if key not in self._pending:
+            keys.append(key)
+        self._cache.update(self._batch_fn(keys))
+
+
+class RequestContext:
+    """
+    Contexto por requisição: carregadores em lote e contador de chamadas ao backend
+    """
+
+    def __init__(self, resolver_cache: Optional[ResolverCache] = None):
+        self.backend_calls = 0
+        # Custo estimado da query (QueryCost), preenchido antes da execução
+        self.query_cost = None
+        self.actual_cost = None
+        # Trace da requisição (tracing.Trace) quando amostrada
+        self.trace = None
+        self._cache = resolver_cache if resolver_cache is not None and resolver_cache.enabled else None
+        self._pending_users = {}
+        self._pending_posts = {}
+        self._post_loaders = {}
+        self._comment_loaders = {}
+
+    def _prime(self, pending: Dict, keys: Iterable):
+        for key in keys:
+            pending[key] = None
+
+    def _lookup(self, type_name: str, field: str, args: Tuple):
+        return self._cache.lookup(type_name, field, args) if self._cache else None
+
+    def _store(self, type_name: str, field: str, args: Tuple, value, tags: List[str]):
+        if self._cache:
+            self._cache.store(type_name, field, args, value, tags)
+
+    def _lookup_many(self, type_name: str, field: str, keys: List, limit,
+                     after=None) -> Tuple[Dict, List]:
+        """Separa as chaves em (resultados em cache, chaves ausentes)"""
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._lookup(type_name, field, (key, limit, after))
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        return found, missing
+
+    def get_user(self, user_id):
+        user = self._lookup('Query', 'user', (user_id,))
+        if user is None:
+            self.backend_calls += 1
+            user = data.get_user_by_id(user_id)
+            self._store('Query', 'user', (user_id,), user, [f"user:{user_id}"])
+        if user:
+            self._prime(self._pending_users, [user_id])
+        return user
+
+    def get_all_users(self):
+        users = self._lookup('Query', 'users', ())
+        if users is None:
+            self.backend_calls += 1
+            users = data.get_all_users()
+            self._store('Query', 'users', (), users, ['users'])
+        self._prime(self._pending_users, (user["id"] for user in users))
+        return users
+
+    def get_users_page(self, limit, after=None):
+        """Até `limit` usuários com id maior que `after` (páginas de usersConnection)"""
+        users = self._lookup('Query', 'users', (limit, after))
+        if users is None:
+            self.backend_calls += 1
+            users = data.get_all_users(limit=limit, after=after)
+            self._store('Query', 'users', (limit, after), users, ['users'])
+        self._prime(self._pending_users, (user["id"] for user in users))
+        return users
+
+    def load_posts(self, user_id, limit=None, after=None):
+        loader = self._post_loaders.get((limit, after))
+        if loader is None:
+            loader = BatchLoader(lambda keys: self._batch_posts(keys, limit, after),
+                                 self._pending_users)
+            self._post_loaders[limit, after] = loader
+        return loader.load(user_id)
+
+    def load_comments(self, post_id, limit=None, after=None):
+        loader = self._comment_loaders.get((limit, after))
+        if loader is None:
+            loader = BatchLoader(lambda keys: self._batch_comments(keys, limit, after),
+                                 self._pending_posts)
+            self._comment_loaders[limit, after] = loader
+        return loader.load(post_id)
+
+    def _batch_posts(self, user_ids, limit, after=None):
+        posts_by_user, missing = self._lookup_many('User', 'posts', user_ids, limit, after)
+        if missing:
+            self.backend_calls += 1
+            fetched = data.get_posts_by_user_ids(missing, limit, after=after)
+            for user_id, posts in fetched.items():
+                self._store('User', 'posts', (user_id, limit, after), posts,
+                            [f"user:{user_id}:posts"])
+            posts_by_user.update(fetched)
+        # Posts vindos do cache também registram os comentários pendentes do próximo nível
+        for posts in posts_by_user.values():
+            self._prime(self._pending_posts, (post["id"] for post in posts))
+        return posts_by_user
+
+    def _batch_comments(self, post_ids, limit, after=None):
+        comments_by_post, missing = self._lookup_many('Post', 'comments', post_ids, limit, after)
+        if missing:
+            self.backend_calls += 1
+            fetched = data.get_comments_by_post_ids(missing, limit, after=after)
+            for post_id, comments in fetched.items():
+                self._store('Post', 'comments', (post_id, limit, after), comments,
+                            [f"post:{post_id}:comments"])
+            comments_by_post.update(fetched)
+        return comments_by_post
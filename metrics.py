@@ -0,0 +1,311 @@
+"""
+Métricas dos servidores no formato de texto do Prometheus (GET /metrics)
+
+Por rota (e por operação GraphQL):
+- http_requests_total: requisições por rota, método e status
+- http_request_duration_seconds: histograma da latência no servidor
+- http_response_size_bytes: histograma do tamanho enviado (após compressão)
+- http_requests_in_flight: requisições em andamento
+- http_request_errors_total: erros por tipo (client = 4xx, server = 5xx,
+  graphql = resposta com `errors`, rejected = query acima do orçamento de custo)
+
+O tempo no servidor também vai no cabeçalho Server-Timing (`app;dur=<ms>`),
+que o benchmark_client usa para separar o tempo de rede/cliente.
+
+Com vários workers (serving.serve com --workers > 1), cada processo grava um
+retrato das suas métricas em um diretório compartilhado a cada
+SYNC_INTERVAL segundos, e GET /metrics soma os retratos de todos: o
+worker que atende a leitura usa os próprios valores atuais e os dos demais
+com até SYNC_INTERVAL de atraso. Contadores de workers encerrados continuam
+somados (não podem diminuir); http_requests_in_flight só conta os vivos.
+"""
+import copy
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Optional, Sequence, Tuple
+
+from flask import Response, g, request
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Limites superiores dos buckets (segundos e bytes)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536, 262144, 1048576)
+# Operações GraphQL distintas com série própria; as demais viram 'other'
+MAX_OPERATIONS = 100
+# Intervalo (s) entre gravações do retrato de cada worker no modo multi-processo
+SYNC_INTERVAL = 1.0
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Métrica com rótulos; as atualizações são protegidas pelo lock do registro"""
+
+    type = ''
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.values: Dict[Tuple, object] = {}
+
+    def samples(self):
+        """Linhas (sem o cabeçalho HELP/TYPE) no formato de texto"""
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+    def empty_copy(self) -> 'Metric':
+        """Mesma métrica (nome, rótulos, buckets) sem valores, para somar retratos"""
+        metric = copy.copy(self)
+        metric.values = {}
+        return metric
+
+    def merge_values(self, values: Dict[Tuple, object]):
+        for labels, value in values.items():
+            self.values[labels] = self.values.get(labels, 0) + value
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, labels: Tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    """Histograma com buckets fixos; os valores guardados são [contagens por bucket, soma]"""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels: Tuple, value: float):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def merge_values(self, values: Dict[Tuple, object]):
+        for labels, (counts, total) in values.items():
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0]
+            entry[0] = [mine + theirs for mine, theirs in zip(entry[0], counts)]
+            entry[1] += total
+
+    def samples(self):
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}"
+            label_text = _format_labels(self.label_names, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(total)}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class RequestMetrics:
+    """Métricas HTTP de um servidor: latência, tamanho, requisições em andamento e erros"""
+
+    def __init__(self, max_operations: int = MAX_OPERATIONS):
+        self._lock = threading.Lock()
+        self.max_operations = max_operations
+        self._operations = set()
+        self.requests = Counter('http_requests_total', "Requisições por rota, método e status",
+                                ('route', 'method', 'status'))
+        self.latency = Histogram('http_request_duration_seconds',
+                                 "Latência no servidor por rota e operação GraphQL",
+                                 ('route', 'operation'), LATENCY_BUCKETS)
+        self.sizes = Histogram('http_response_size_bytes',
+                               "Tamanho do corpo enviado por rota e operação GraphQL",
+                               ('route', 'operation'), SIZE_BUCKETS)
+        self.in_flight = Gauge('http_requests_in_flight', "Requisições em andamento por rota",
+                               ('route',))
+        self.errors = Counter('http_request_errors_total',
+                              "Erros por rota, operação GraphQL e tipo",
+                              ('route', 'operation', 'kind'))
+        self.metrics = (self.requests, self.latency, self.sizes, self.in_flight, self.errors)
+        # Modo multi-processo (share): diretório dos retratos e thread de gravação do worker
+        self.directory = None
+        self.sync_interval = SYNC_INTERVAL
+        self._writer_pid = None
+
+    def operation(self, name: Optional[str]) -> str:
+        """Rótulo da operação, limitado a max_operations valores distintos"""
+        if not name:
+            return ''
+        with self._lock:
+            if name in self._operations:
+                return name
+            if len(self._operations) >= self.max_operations:
+                return 'other'
+            self._operations.add(name)
+        return name
+
+    def start(self, route: str) -> float:
+        """Marca o início de uma requisição; retorna o instante para finish"""
+        with self._lock:
+            self.in_flight.inc((route,))
+        return time.perf_counter()
+
+    def finish(self, route: str, method: str, status: int, size: int, start: float,
+               operation: str = '', error: Optional[str] = None) -> float:
+        """Registra uma requisição concluída; retorna a duração em ms"""
+        elapsed = time.perf_counter() - start
+        if status >= 500:
+            error = 'server'
+        elif status >= 400:
+            error = 'client'
+        with self._lock:
+            self.in_flight.dec((route,))
+            self.requests.inc((route, method, str(status)))
+            self.latency.observe((route, operation), elapsed)
+            self.sizes.observe((route, operation), size)
+            if error:
+                self.errors.inc((route, operation, error))
+        if self.directory and self._writer_pid != os.getpid():
+            self._start_writer()
+        return elapsed * 1000
+
+    # Modo multi-processo
+    def share(self, directory: str, sync_interval: float = SYNC_INTERVAL):
+        """
+        Soma as métricas dos processos que gravam retratos em `directory`;
+        chamada no processo pai antes do fork dos workers
+        """
+        self.directory = directory
+        self.sync_interval = sync_interval
+
+    def _start_writer(self):
+        # Threads não sobrevivem ao fork: cada worker inicia a sua na primeira requisição
+        with self._lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+        threading.Thread(target=self._write_periodically, name='metrics-writer',
+                         daemon=True).start()
+
+    def _write_periodically(self):
+        while True:
+            time.sleep(self.sync_interval)
+            self.write_snapshot()
+
+    def write_snapshot(self):
+        """Grava (de forma atômica) os valores deste processo em <directory>/<pid>.json"""
+        with self._lock:
+            snapshot = {metric.name: [[list(labels), value] for labels, value in metric.values.items()]
+                        for metric in self.metrics}
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(snapshot, file)
+        os.replace(path + '.tmp', path)
+
+    def _merged(self):
+        """Métricas somadas dos retratos de todos os processos"""
+        self.write_snapshot()
+        merged = {metric.name: metric.empty_copy() for metric in self.metrics}
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            pid = int(os.path.basename(path)[:-len('.json')])
+            try:
+                with open(path, encoding='utf-8') as file:
+                    snapshot = json.load(file)
+            except (OSError, ValueError):
+                continue
+            alive = _process_alive(pid)
+            for name, values in snapshot.items():
+                metric = merged.get(name)
+                if metric is None or (isinstance(metric, Gauge) and not alive):
+                    continue
+                metric.merge_values({tuple(labels): value for labels, value in values})
+        return [merged[metric.name] for metric in self.metrics]
+
+    def render(self) -> str:
+        if self.directory:
+            return '\n'.join(metric.render() for metric in self._merged()) + '\n'
+        with self._lock:
+            return '\n'.join(metric.render() for metric in self.metrics) + '\n'
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def server_timing(elapsed_ms: float) -> str:
+    return f'app;dur={elapsed_ms:.3f}'
+
+
+def enable_metrics(app, metrics: RequestMetrics, path: str = '/metrics'):
+    """
+    Mede as requisições de uma aplicação Flask e expõe `path`
+
+    Deve ser chamada antes de enable_compression: os hooks after_request rodam
+    na ordem inversa, então a medição inclui a compressão e o tamanho enviado.
+    As rotas podem definir g.metrics_operation e g.metrics_error.
+    """
+    @app.before_request
+    def start_request_timer():
+        if request.path == path:
+            return
+        g.metrics_route = request.url_rule.rule if request.url_rule else 'unmatched'
+        g.metrics_start = metrics.start(g.metrics_route)
+
+    @app.after_request
+    def record_request(response):
+        if 'metrics_start' not in g:
+            return response
+        elapsed_ms = metrics.finish(g.metrics_route, request.method, response.status_code,
+                                    response.content_length or 0, g.pop('metrics_start'),
+                                    g.get('metrics_operation', ''), g.get('metrics_error'))
+        response.headers.add('Server-Timing', server_timing(elapsed_ms))
+        return response
+
+    def metrics_endpoint():
+        return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule(path, 'metrics', metrics_endpoint, methods=['GET'])
+    # serving.serve usa a instância para somar as métricas dos workers
+    app.extensions['request_metrics'] = metrics
+    return record_request
@@ -0,0 +1,68 @@
+"""
+Paginação por cursor (keyset) das listas REST e das connections GraphQL
+
+O cursor é o id do último registro da página, codificado em base64 para ser
+opaco ao cliente. A página seguinte começa no primeiro id maior que o do
+cursor, localizado por busca binária nos índices ordenados de data.py: o
+custo de uma página é O(log n + tamanho da página), independente de quantas
+páginas vieram antes (ao contrário de offset/limit).
+"""
+import base64
+import binascii
+from typing import Dict, List, NamedTuple, Optional
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+_CURSOR_PREFIX = 'cursor:'
+
+
+class PaginationError(ValueError):
+    """Cursor inválido ou tamanho de página fora dos limites"""
+
+
+class Page(NamedTuple):
+    records: List[Dict]
+    has_next: bool
+    end_cursor: Optional[str]
+
+
+def encode_cursor(record_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{_CURSOR_PREFIX}{record_id}".encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Id codificado no cursor (None = primeira página)"""
+    if cursor is None:
+        return None
+    try:
+        decoded = base64.urlsafe_b64decode(cursor.encode()).decode()
+        if not decoded.startswith(_CURSOR_PREFIX):
+            raise ValueError(decoded)
+        return int(decoded[len(_CURSOR_PREFIX):])
+    except (ValueError, binascii.Error, UnicodeError):
+        raise PaginationError(f"Cursor inválido: {cursor}")
+
+
+def page_size(limit=None) -> int:
+    """Tamanho de página pedido (padrão DEFAULT_PAGE_SIZE, máximo MAX_PAGE_SIZE)"""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(limit)
+    except (TypeError, ValueError):
+        raise PaginationError(f"Tamanho de página inválido: {limit}")
+    if not 1 <= size <= MAX_PAGE_SIZE:
+        raise PaginationError(f"Tamanho de página deve estar entre 1 e {MAX_PAGE_SIZE}: {size}")
+    return size
+
+
+def make_page(records: List[Dict], limit: int) -> Page:
+    """
+    Monta a página a partir de até `limit + 1` registros lidos após o cursor
+    (o registro extra só indica que existe uma próxima página)
+    """
+    has_next = len(records) > limit
+    records = records[:limit]
+    end_cursor = encode_cursor(records[-1]['id']) if records else None
+    return Page(records, has_next, end_cursor)
@@ -0,0 +1,106 @@
+"""
+Registro de persisted queries para o servidor GraphQL
+
+O cliente envia apenas o hash SHA-256 da query (extensão `persistedQuery`,
+no formato do Automatic Persisted Queries do Apollo). Queries podem ser
+registradas previamente a partir de um arquivo JSON ou, se o modo automático
+estiver habilitado, na primeira vez em que o cliente envia hash + texto.
+
+As queries pré-registradas ficam fixas; as automáticas vêm de qualquer
+cliente, então ficam em um LRU de tamanho limitado (as menos usadas são
+descartadas e o cliente as reenvia pelo próprio protocolo APQ).
+"""
+import json
+import math
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from query_cache import query_hash
+from tagged_cache import TaggedCache
+
+# Mensagem usada pelo protocolo APQ para pedir o texto completo da query
+PERSISTED_QUERY_NOT_FOUND = 'PersistedQueryNotFound'
+PERSISTED_QUERY_NOT_SUPPORTED = 'PersistedQueryNotSupported'
+PERSISTED_QUERY_HASH_MISMATCH = 'provided sha does not match query'
+
+
+class PersistedQueryError(Exception):
+    """Erro de negociação de persisted query (devolvido ao cliente como erro GraphQL)"""
+
+
+class PersistedQueryStore:
+    """Mapa hash -> texto da query, com registro manual ou automático (LRU de `max_automatic`)"""
+
+    def __init__(self, allow_automatic: bool = True, max_automatic: int = 1024):
+        self.allow_automatic = allow_automatic
+        self._queries = {}
+        # Sem TTL: uma query automática só sai do LRU por falta de espaço
+        self._automatic = TaggedCache(max_automatic, ttl=math.inf)
+        self._lock = Lock()
+
+    def register(self, query: str) -> str:
+        """Registra (de forma permanente) uma query e retorna seu hash"""
+        key = query_hash(query)
+        with self._lock:
+            self._queries[key] = query
+        return key
+
+    def get(self, key: str) -> Optional[str]:
+        query = self._queries.get(key)
+        if query is None:
+            query = self._automatic.get(key)
+        return query
+
+    def load_file(self, path: str) -> int:
+        """
+        Carrega queries de um arquivo JSON: lista de queries ou objeto {hash: query}
+        Retorna a quantidade de queries registradas
+        """
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+        queries = manifest.values() if isinstance(manifest, dict) else manifest
+        for query in queries:
+            self.register(query)
+        return len(self._queries)
+
+    def resolve(self, query: Optional[str], extensions: Optional[Dict]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Resolve o texto da query de uma requisição
+        Retorna (query, hash); o hash é None quando a extensão não foi usada
+        """
+        persisted = (extensions or {}).get('persistedQuery')
+        if not persisted:
+            return query, None
+
+        key = persisted.get('sha256Hash')
+        if persisted.get('version') != 1 or not key:
+            raise PersistedQueryError(PERSISTED_QUERY_NOT_SUPPORTED)
+
+        if query:
+            # Segunda etapa do APQ: cliente enviou hash + texto
+            if query_hash(query) != key:
+                raise PersistedQueryError(PERSISTED_QUERY_HASH_MISMATCH)
+            if self.allow_automatic and key not in self._queries:
+                self._automatic.put(key, query)
+            return query, key
+
+        stored = self.get(key)
+        if stored is None:
+            raise PersistedQueryError(PERSISTED_QUERY_NOT_FOUND)
+        return stored, key
+
+    def __len__(self) -> int:
+        return len(self._queries) + self._automatic.stats()['size']
+
+    def stats(self) -> Dict:
+        """Queries pré-registradas e contadores do LRU das automáticas (hits, evictions)"""
+        automatic = self._automatic.stats()
+        return {
+            'allow_automatic': self.allow_automatic,
+            'registered': len(self._queries),
+            'automatic': automatic['size'],
+            'max_automatic': automatic['max_size'],
+            'hits': automatic['hits'],
+            'misses': automatic['misses'],
+            'evictions': automatic['evictions'],
+        }
@@ -0,0 +1,276 @@
+"""
+Profiler por amostragem dos servidores (pilhas colapsadas por rota/operação)
+
+Uma thread de fundo lê as pilhas das threads que estão atendendo requisições
+(sys._current_frames) a cada PROFILE_INTERVAL_MS e conta cada pilha sob o
+rótulo da requisição: a rota e, no GraphQL, a operação. Nos servidores ASGI
+a requisição é identificada pela task que o event loop está executando.
+
+O resultado é gravado no formato de pilhas colapsadas ('f1;f2;f3 N' por
+linha), aceito por flamegraph.pl, speedscope e inferno:
+<PROFILE_DIR>/<nome>/<serviço>.<rótulo>.folded
+
+Ativação:
+- PROFILE=1: amostra desde a primeira requisição e regrava os arquivos em
+  <PROFILE_DIR>/session-<pid>/ a cada PROFILE_WRITE_INTERVAL segundos
+- PROFILE_ADMIN=1: habilita POST /admin/profile/start e /admin/profile/stop
+  ({"name": ...}, grava os arquivos e retorna os caminhos) e GET /admin/profile
+"""
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import Dict, List, Optional
+
+from flask import jsonify, request
+
+DEFAULT_INTERVAL_MS = 5.0
+MAX_STACK_DEPTH = 128
+# Rótulo das amostras de requisições ainda sem rota (ex.: 404)
+UNMATCHED = 'unmatched'
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)})"
+
+
+def collapse(frame) -> str:
+    """Pilha do frame no formato colapsado (raiz primeiro, separada por ';')"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def _file_label(label: str) -> str:
+    """Nome de arquivo seguro para um rótulo (sem separadores nem '.'/'..' nas pontas)"""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_.') or 'root'
+
+
+class _Request:
+    """
+    Amostras de uma requisição em andamento; só entram em `stacks` no fim, com
+    o rótulo final (a operação GraphQL só é conhecida depois de ler o corpo)
+    """
+
+    __slots__ = ('label', 'stacks')
+
+    def __init__(self, label: str):
+        self.label = label
+        self.stacks = Counter()
+
+
+def _current_task():
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+class SamplingProfiler:
+    """Amostra as pilhas das requisições em andamento, agrupadas por rótulo"""
+
+    def __init__(self, service: str, directory: str = 'profiles',
+                 interval_ms: float = DEFAULT_INTERVAL_MS, autostart: bool = False,
+                 write_interval: float = 30.0):
+        self.service = service
+        self.directory = directory
+        self.interval_ms = interval_ms
+        self.autostart = autostart
+        self.write_interval = write_interval
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._threads: Dict[int, _Request] = {}
+        self._tasks = weakref.WeakKeyDictionary()
+        self._loops: Dict[int, asyncio.AbstractEventLoop] = {}
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._pid = None
+        self.stacks: Dict[str, Counter] = {}
+        self.samples = 0
+        self.started_at = None
+
+    @property
+    def running(self) -> bool:
+        # Após um fork (workers) a thread de amostragem não existe no processo filho
+        return (self._sampler is not None and self._sampler.is_alive()
+                and self._pid == os.getpid())
+
+    def start(self, interval_ms: Optional[float] = None):
+        """Zera as amostras e inicia a thread de amostragem"""
+        with self._start_lock:
+            self._start(interval_ms)
+
+    def _start(self, interval_ms: Optional[float] = None):
+        self.stop()
+        with self._lock:
+            if interval_ms:
+                self.interval_ms = interval_ms
+            self.stacks = {}
+            self.samples = 0
+            self.started_at = time.time()
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._sampler = threading.Thread(target=self._run, name='sampling-profiler',
+                                             daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        if self.running:
+            self._stop.set()
+            self._sampler.join()
+
+    # Rótulos das requisições em andamento
+    def enter(self, label: str):
+        """Marca a thread (ou a task ASGI) atual como atendendo uma requisição"""
+        if not self.running:
+            if not self.autostart:
+                return
+            with self._start_lock:
+                # Outra requisição pode ter iniciado a amostragem enquanto esta esperava
+                if not self.running:
+                    self._start()
+        task = _current_task()
+        if task is not None:
+            self._loops[threading.get_ident()] = task.get_loop()
+            self._tasks[task] = _Request(label)
+        else:
+            self._threads[threading.get_ident()] = _Request(label)
+
+    def _current(self) -> Optional[_Request]:
+        task = _current_task()
+        if task is not None:
+            return self._tasks.get(task)
+        return self._threads.get(threading.get_ident())
+
+    def annotate(self, suffix: str):
+        """Acrescenta um detalhe ao rótulo atual (ex.: a operação GraphQL)"""
+        if not suffix or (not self._threads and not self._tasks):
+            return
+        current = self._current()
+        if current is not None:
+            current.label = f"{current.label} {suffix}"
+
+    def leave(self):
+        if not self._threads and not self._tasks:
+            return
+        task = _current_task()
+        if task is not None:
+            current = self._tasks.pop(task, None)
+        else:
+            current = self._threads.pop(threading.get_ident(), None)
+        if current is not None and current.stacks:
+            with self._lock:
+                self.stacks.setdefault(current.label, Counter()).update(current.stacks)
+
+    # Amostragem
+    def _run(self):
+        last_write = time.monotonic()
+        while not self._stop.wait(self.interval_ms / 1000):
+            self._sample()
+            if self.autostart and time.monotonic() - last_write >= self.write_interval:
+                self.write(f"session-{os.getpid()}")
+                last_write = time.monotonic()
+
+    def _sample(self):
+        frames = sys._current_frames()
+        samples = [(current, frames.get(ident)) for ident, current in list(self._threads.items())]
+        for ident, loop in list(self._loops.items()):
+            task = asyncio.current_task(loop)
+            current = self._tasks.get(task) if task is not None else None
+            if current is not None:
+                samples.append((current, frames.get(ident)))
+        with self._lock:
+            for current, frame in samples:
+                if frame is None:
+                    continue
+                current.stacks[collapse(frame)] += 1
+                self.samples += 1
+
+    # Resultados
+    def write(self, name: str) -> List[str]:
+        """Grava um arquivo de pilhas colapsadas por rótulo em <directory>/<name>/"""
+        with self._lock:
+            stacks = {label: dict(counter) for label, counter in self.stacks.items()}
+        target = os.path.join(self.directory, _file_label(name))
+        # O nome vem da requisição de /admin/profile/stop: nunca grava fora de `directory`
+        root = os.path.realpath(self.directory)
+        if os.path.commonpath([root, os.path.realpath(target)]) != root:
+            raise ValueError(f"Nome de profile inválido: {name!r}")
+        os.makedirs(target, exist_ok=True)
+        paths = []
+        for label, counter in sorted(stacks.items()):
+            path = os.path.join(target, f"{self.service}.{_file_label(label)}.folded")
+            with open(path, 'w', encoding='utf-8') as file:
+                for stack, count in sorted(counter.items(), key=lambda item: -item[1]):
+                    file.write(f"{stack} {count}\n")
+            paths.append(path)
+        return paths
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'service': self.service,
+                'running': self.running,
+                'interval_ms': self.interval_ms,
+                'samples': self.samples,
+                # Amostras por rótulo das requisições já concluídas
+                'labels': {label: sum(counter.values()) for label, counter in self.stacks.items()},
+                'started_at': self.started_at,
+            }
+
+
+def profiler_from_env(service: Optional[str] = None) -> SamplingProfiler:
+    """Profiler configurado por PROFILE, PROFILE_DIR, PROFILE_INTERVAL_MS e PROFILE_WRITE_INTERVAL"""
+    service = service or os.path.splitext(os.path.basename(sys.argv[0]))[0] or 'server'
+    return SamplingProfiler(service, os.environ.get('PROFILE_DIR', 'profiles'),
+                            float(os.environ.get('PROFILE_INTERVAL_MS', DEFAULT_INTERVAL_MS)),
+                            autostart=os.environ.get('PROFILE', '0') == '1',
+                            write_interval=float(os.environ.get('PROFILE_WRITE_INTERVAL', 30)))
+
+
+def admin_enabled() -> bool:
+    return os.environ.get('PROFILE_ADMIN', '0') == '1' or os.environ.get('PROFILE', '0') == '1'
+
+
+def enable_profiling(app, profiler: SamplingProfiler, prefix: str = '/admin/profile'):
+    """
+    Rotula as requisições de uma aplicação Flask para o profiler e, com
+    PROFILE_ADMIN=1 (ou PROFILE=1), registra as rotas de controle em `prefix`
+    """
+    @app.before_request
+    def enter_profile():
+        if request.path.startswith(prefix):
+            return
+        profiler.enter(request.url_rule.rule if request.url_rule else UNMATCHED)
+
+    @app.teardown_request
+    def leave_profile(exception=None):
+        profiler.leave()
+
+    if not admin_enabled():
+        return
+
+    def profile_status():
+        return jsonify(profiler.status())
+
+    def profile_start():
+        data = request.get_json(silent=True) or {}
+        profiler.start(data.get('interval_ms'))
+        return jsonify(profiler.status())
+
+    def profile_stop():
+        data = request.get_json(silent=True) or {}
+        profiler.stop()
+        files = profiler.write(data.get('name') or time.strftime('%Y%m%d-%H%M%S'))
+        return jsonify({**profiler.status(), 'files': files})
+
+    app.add_url_rule(prefix, 'profile_status', profile_status, methods=['GET'])
+    app.add_url_rule(f"{prefix}/start", 'profile_start', profile_start, methods=['POST'])
+    app.add_url_rule(f"{prefix}/stop", 'profile_stop', profile_stop, methods=['POST'])
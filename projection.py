@@ -0,0 +1,103 @@
+"""
+Sparse fieldsets para os endpoints REST (?fields= e ?include=)
+
+- fields: lista separada por vírgulas; nomes simples valem para o recurso
+  principal e nomes com ponto para os relacionamentos, ex.:
+  `fields=name,email,posts.title,posts.comments.text`
+- include: relacionamentos embutidos na resposta, ex.: `include=posts.comments`
+
+Um nível com `fields` retorna só esses campos, e os relacionamentos entram
+se forem citados em `fields` ou em `include`. Um nível sem `fields` retorna
+todos os campos, mais os relacionamentos de `include` ou os padrões da rota.
+A projeção é repassada à camada de dados, que só lê os campos pedidos.
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from compact_store import COMMENT_SCHEMA, POST_SCHEMA, USER_SCHEMA
+
+# Campos de cada recurso e relacionamentos (nome -> recurso filho)
+RESOURCE_FIELDS = {
+    'users': tuple(USER_SCHEMA),
+    'posts': tuple(POST_SCHEMA),
+    'comments': tuple(COMMENT_SCHEMA),
+}
+RELATIONS = {
+    'users': {'posts': 'posts'},
+    'posts': {'comments': 'comments'},
+    'comments': {},
+}
+
+
+class ProjectionError(ValueError):
+    """Campo ou relacionamento inexistente em ?fields= / ?include="""
+
+
+class Projection(NamedTuple):
+    resource: str
+    # Campos pedidos (None = todos)
+    fields: Optional[Tuple[str, ...]]
+    # Relacionamentos embutidos: nome -> projeção do filho
+    relations: Dict[str, 'Projection']
+    # O id precisa ser lido mesmo se não foi pedido (ex.: cursor da paginação)
+    needs_id: bool = False
+
+    @property
+    def fetch_fields(self) -> Optional[Tuple[str, ...]]:
+        """Campos a ler na camada de dados (o id é necessário para buscar os filhos)"""
+        if not self.hides_id:
+            return self.fields
+        return ('id',) + self.fields
+
+    @property
+    def hides_id(self) -> bool:
+        """O id foi lido apenas para uso interno e não deve ir na resposta"""
+        return (self.fields is not None and 'id' not in self.fields
+                and (bool(self.relations) or self.needs_id))
+
+
+def _split(param: Optional[str]) -> Iterable[Tuple[str, ...]]:
+    if not param:
+        return []
+    return [tuple(part.strip().split('.')) for part in param.split(',') if part.strip()]
+
+
+def _build(resource: str, fields, includes, defaults, path: str) -> Projection:
+    own_fields = [field[0] for field in fields if len(field) == 1]
+    for field in own_fields:
+        if field not in RESOURCE_FIELDS[resource] and field not in RELATIONS[resource]:
+            raise ProjectionError(f"Campo desconhecido: {path}{field}")
+
+    explicit = bool(fields)
+    wanted = {field[0] for field in fields if len(field) > 1 or field[0] in RELATIONS[resource]}
+    wanted.update(include[0] for include in includes)
+    if not explicit:
+        wanted.update(default[0] for default in defaults)
+
+    relations = {}
+    for name in wanted:
+        if name not in RELATIONS[resource]:
+            raise ProjectionError(f"Relacionamento desconhecido: {path}{name}")
+        relations[name] = _build(
+            RELATIONS[resource][name],
+            [field[1:] for field in fields if field[0] == name and len(field) > 1],
+            [include[1:] for include in includes if include[0] == name and len(include) > 1],
+            [default[1:] for default in defaults if default[0] == name and len(default) > 1],
+            f"{path}{name}."
+        )
+
+    if not explicit:
+        return Projection(resource, None, relations)
+    scalar = tuple(dict.fromkeys(field for field in own_fields if field not in RELATIONS[resource]))
+    return Projection(resource, scalar, relations)
+
+
+@lru_cache(maxsize=256)
+def parse_projection(resource: str, fields: Optional[str] = None, include: Optional[str] = None,
+                     default_include: Tuple[str, ...] = ()) -> Projection:
+    """
+    Interpreta ?fields= e ?include= para um recurso ('users', 'posts' ou 'comments')
+    O resultado é memorizado e compartilhado: use _replace em vez de alterá-lo
+    """
+    defaults = [tuple(default.split('.')) for default in default_include]
+    return _build(resource, _split(fields), _split(include), defaults, '')
@@ -0,0 +1,92 @@
+"""
+Cache LRU de documentos GraphQL já analisados (parse) e validados
+
+A chave é o hash SHA-256 do texto da query; o valor é o documento (AST)
+junto com os erros de sintaxe/validação, de modo que queries inválidas
+repetidas também não são reprocessadas.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from graphql import DocumentNode, GraphQLError, GraphQLSchema, parse, validate
+
+
+def query_hash(query: str) -> str:
+    """Hash SHA-256 (hex) do texto da query"""
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+class DocumentCache:
+    """Cache LRU de documentos analisados e validados, com contadores"""
+
+    def __init__(self, schema: GraphQLSchema, max_size: int = 256):
+        self.schema = schema
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, query: str, key: Optional[str] = None,
+            trace=None) -> Tuple[Optional[DocumentNode], List[GraphQLError]]:
+        """
+        Retorna (documento, erros) para a query, analisando e validando
+        apenas na primeira vez que o texto é visto
+        """
+        key = key or query_hash(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = self.compile(query, trace)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def compile(self, query: str, trace=None) -> Tuple[Optional[DocumentNode], List[GraphQLError]]:
+        """Analisa e valida a query sem passar pelo cache (fases registradas em `trace`)"""
+        start = time.perf_counter_ns()
+        try:
+            document = parse(query)
+        except GraphQLError as error:
+            return None, [error]
+        parsed = time.perf_counter_ns()
+        errors = validate(self.schema, document)
+        if trace is not None:
+            trace.record_phase('parsing', start, parsed)
+            trace.record_phase('validation', parsed, time.perf_counter_ns())
+        return document, errors
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,306 @@
+"""
+Análise estática de custo e profundidade das queries GraphQL
+
+Antes da execução, o documento validado é percorrido e cada campo de objeto
+conta como 1 objeto retornado, multiplicado pela cardinalidade estimada das
+listas: o argumento `limit`/`first` quando informado (limitado ao maior
+número de filhos observado no dataset, já que um pai do topo da distribuição
+pode ter muito mais filhos que a média) ou, sem limite, o multiplicador médio
+do campo (ex.: posts por usuário). O custo estimado é, portanto, o número de
+objetos que a resposta deve ter (um teto quando há limites);
+o custo real é contado no resultado, e os dois ficam nos cabeçalhos
+X-Query-Cost-Estimated / X-Query-Cost-Actual e em GET /graphql/cost.
+
+Orçamentos (variáveis de ambiente do servidor):
+- QUERY_MAX_DEPTH / QUERY_MAX_COST: acima deles a query é rejeitada (0 = sem limite)
+- QUERY_THROTTLE_COST: queries mais caras que isso disputam QUERY_THROTTLE_SLOTS
+  vagas de execução, esperando até QUERY_THROTTLE_TIMEOUT segundos (0 = desativado)
+"""
+import asyncio
+import math
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, NamedTuple, Optional
+
+from graphql import (
+    DocumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLObjectType,
+    GraphQLSchema,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+    get_named_type,
+    value_from_ast_untyped,
+)
+
+from pagination import DEFAULT_PAGE_SIZE
+
+# Cardinalidade média das listas sem `limit` ('Tipo.campo' -> itens); valores
+# dos dados fixos de data.py, atualizados por multipliers_for_dataset
+DEFAULT_MULTIPLIERS = {'Query.users': 5, 'User.posts': 5, 'Post.comments': 4}
+# Sem o máximo observado de um campo, a lista com `limit` custa o próprio limit
+DEFAULT_LIST_MULTIPLIER = 10
+PAGINATION_ARGS = ('limit', 'first')
+
+
+class QueryCostError(Exception):
+    """Query acima do orçamento de custo/profundidade ou sem vaga para execução"""
+
+
+class QueryCost(NamedTuple):
+    cost: int
+    depth: int
+
+
+def multipliers_for_dataset(users: int, posts: int, comments: int) -> Dict[str, int]:
+    """Multiplicadores a partir do tamanho do dataset (médias de filhos por pai)"""
+    return {
+        'Query.users': users,
+        'User.posts': max(1, math.ceil(posts / max(users, 1))),
+        'Post.comments': max(1, math.ceil(comments / max(posts, 1))),
+    }
+
+
+def maxima_for_dataset(users: int, max_posts: int, max_comments: int) -> Dict[str, int]:
+    """Maior número de filhos de um pai no dataset (teto para `limit`/`first`)"""
+    return {'Query.users': users, 'User.posts': max_posts, 'Post.comments': max_comments}
+
+
+def count_objects(data) -> int:
+    """Custo real: número de objetos no resultado (o objeto raiz não conta)"""
+    if isinstance(data, dict):
+        return sum(_count(value) for value in data.values())
+    return 0
+
+
+def _count(value) -> int:
+    if isinstance(value, dict):
+        return 1 + sum(_count(item) for item in value.values())
+    if isinstance(value, list):
+        return sum(_count(item) for item in value)
+    return 0
+
+
+class CostAnalyzer:
+    """Estima o custo das queries, aplica os orçamentos e acumula estimado vs real"""
+
+    def __init__(self, schema: GraphQLSchema, multipliers: Optional[Dict[str, int]] = None,
+                 max_cost: int = 0, max_depth: int = 0, maxima: Optional[Dict[str, int]] = None):
+        self.schema = schema
+        self.multipliers = dict(DEFAULT_MULTIPLIERS if multipliers is None else multipliers)
+        self.maxima = dict(maxima or {})
+        self.max_cost = max_cost
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        # Estimativas de documentos sem variáveis; os documentos do cache de
+        # documentos são reaproveitados, então a análise roda uma vez por query
+        self._estimates = weakref.WeakKeyDictionary()
+        self.requests = 0
+        self.rejected = 0
+        self.estimated_total = 0
+        self.actual_total = 0
+        self.max_estimated = 0
+        self.max_actual = 0
+
+    def set_fan_out(self, multipliers: Dict[str, int], maxima: Dict[str, int]):
+        """Troca as cardinalidades (ex.: após carregar outro dataset) e descarta as estimativas"""
+        with self._lock:
+            self.multipliers = dict(multipliers)
+            self.maxima = dict(maxima)
+            self._estimates = weakref.WeakKeyDictionary()
+
+    def estimate(self, document: DocumentNode, variables: Optional[Dict] = None,
+                 operation_name: Optional[str] = None) -> QueryCost:
+        """Custo e profundidade estimados da operação (a primeira, se não houver nome)"""
+        memoize = not variables and operation_name is None
+        if memoize:
+            with self._lock:
+                estimate = self._estimates.get(document)
+            if estimate is not None:
+                return estimate
+        estimate = self._estimate(document, variables, operation_name)
+        if memoize:
+            with self._lock:
+                self._estimates[document] = estimate
+        return estimate
+
+    def _estimate(self, document, variables, operation_name) -> QueryCost:
+        fragments = {}
+        operation = None
+        for definition in document.definitions:
+            if isinstance(definition, FragmentDefinitionNode):
+                fragments[definition.name.value] = definition
+            elif isinstance(definition, OperationDefinitionNode) and operation is None:
+                if operation_name is None or (definition.name and
+                                              definition.name.value == operation_name):
+                    operation = definition
+        if operation is None:
+            return QueryCost(0, 0)
+        root = self.schema.get_root_type(operation.operation)
+        if root is None:
+            return QueryCost(0, 0)
+        return QueryCost(*self._selection_cost(root, operation.selection_set, fragments,
+                                               variables or {}, None))
+
+    def _selection_cost(self, parent_type, selection_set, fragments, variables, page):
+        cost = 0
+        depth = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                child_cost, child_depth = self._field_cost(parent_type, selection, fragments,
+                                                           variables, page)
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition
+                fragment_type = (self.schema.get_type(condition.name.value) if condition
+                                 else parent_type)
+                child_cost, child_depth = self._selection_cost(
+                    fragment_type, selection.selection_set, fragments, variables, page)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = fragments.get(selection.name.value)
+                if fragment is None:
+                    continue
+                child_cost, child_depth = self._selection_cost(
+                    self.schema.get_type(fragment.type_condition.name.value),
+                    fragment.selection_set, fragments, variables, page)
+            else:
+                continue
+            cost += child_cost
+            depth = max(depth, child_depth)
+        return cost, depth
+
+    def _field_cost(self, parent_type, node: FieldNode, fragments, variables, page):
+        name = node.name.value
+        field = parent_type.fields.get(name) if isinstance(parent_type, GraphQLObjectType) else None
+        if field is None:
+            return 0, 0
+        field_type = field.type.of_type if isinstance(field.type, GraphQLNonNull) else field.type
+        named_type = get_named_type(field_type)
+        if not isinstance(named_type, GraphQLObjectType) or node.selection_set is None:
+            return 0, 0
+
+        args = {arg.name.value: value_from_ast_untyped(arg.value, variables)
+                for arg in node.arguments}
+        multiplier = 1
+        if isinstance(field_type, GraphQLList):
+            multiplier = self._list_multiplier(f"{parent_type.name}.{name}", name, args, page)
+        # Connections: a cardinalidade de `edges` vem do `first` da connection
+        child_page = (args.get('first') or DEFAULT_PAGE_SIZE) if 'edges' in named_type.fields else None
+        child_cost, child_depth = self._selection_cost(named_type, node.selection_set, fragments,
+                                                       variables, child_page)
+        return multiplier * (1 + child_cost), 1 + child_depth
+
+    def _list_multiplier(self, field_key: str, name: str, args: Dict, page) -> int:
+        if name == 'edges' and page is not None:
+            return page
+        for arg in PAGINATION_ARGS:
+            if isinstance(args.get(arg), int) and args[arg] > 0:
+                maximum = self.maxima.get(field_key)
+                return args[arg] if maximum is None else min(args[arg], maximum)
+        return self.multipliers.get(field_key, DEFAULT_LIST_MULTIPLIER)
+
+    def check(self, estimate: QueryCost):
+        """Rejeita (QueryCostError) queries acima dos orçamentos de profundidade e custo"""
+        error = None
+        if self.max_depth and estimate.depth > self.max_depth:
+            error = f"Query muito profunda: {estimate.depth} níveis (máximo {self.max_depth})"
+        elif self.max_cost and estimate.cost > self.max_cost:
+            error = f"Query muito cara: custo estimado {estimate.cost} (máximo {self.max_cost})"
+        if error:
+            with self._lock:
+                self.requests += 1
+                self.rejected += 1
+            raise QueryCostError(error)
+
+    def record(self, estimate: QueryCost, actual: int):
+        with self._lock:
+            self.requests += 1
+            self.estimated_total += estimate.cost
+            self.actual_total += actual
+            self.max_estimated = max(self.max_estimated, estimate.cost)
+            self.max_actual = max(self.max_actual, actual)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            executed = self.requests - self.rejected
+            return {
+                'max_cost': self.max_cost,
+                'max_depth': self.max_depth,
+                'requests': self.requests,
+                'rejected': self.rejected,
+                'mean_estimated': self.estimated_total / executed if executed else 0.0,
+                'mean_actual': self.actual_total / executed if executed else 0.0,
+                # Real / estimado: < 1 quando a estimativa é conservadora
+                'actual_to_estimated': (self.actual_total / self.estimated_total
+                                        if self.estimated_total else 0.0),
+                'max_estimated': self.max_estimated,
+                'max_actual': self.max_actual,
+                'multipliers': dict(self.multipliers),
+                'maxima': dict(self.maxima),
+            }
+
+
+class QueryThrottle:
+    """
+    Limita quantas queries caras (custo > threshold) executam ao mesmo tempo;
+    as demais esperam uma vaga por até `timeout` segundos
+    """
+
+    def __init__(self, threshold: int = 0, slots: int = 1, timeout: float = 5.0):
+        self.threshold = threshold
+        self.slots = slots
+        self.timeout = timeout
+        self._semaphore = threading.BoundedSemaphore(max(slots, 1))
+        self._lock = threading.Lock()
+        self.throttled = 0
+        self.timeouts = 0
+
+    def applies(self, estimate: Optional[QueryCost]) -> bool:
+        return bool(self.threshold) and estimate is not None and estimate.cost > self.threshold
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            self.throttled += 1
+        if self._semaphore.acquire(timeout=self.timeout):
+            return True
+        with self._lock:
+            self.timeouts += 1
+        return False
+
+    def _busy(self) -> QueryCostError:
+        return QueryCostError(f"Servidor ocupado com queries caras; tente novamente "
+                              f"(limite de {self.slots} simultâneas acima do custo {self.threshold})")
+
+    @contextmanager
+    def admit(self, estimate: Optional[QueryCost]):
+        if not self.applies(estimate):
+            yield
+            return
+        if not self._acquire():
+            raise self._busy()
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def admit_async(self, estimate: Optional[QueryCost]):
+        """Versão para o servidor ASGI: a espera pela vaga não bloqueia o event loop"""
+        if not self.applies(estimate):
+            yield
+            return
+        if not await asyncio.get_running_loop().run_in_executor(None, self._acquire):
+            raise self._busy()
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'threshold': self.threshold, 'slots': self.slots, 'timeout': self.timeout,
+                    'throttled': self.throttled, 'timeouts': self.timeouts}
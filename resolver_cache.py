@@ -0,0 +1,43 @@
+"""
+Cache de resultados de resolvers GraphQL entre requisições
+
+A chave é (tipo, campo, argumentos), ex.: ('User', 'posts', 1, 5) para os 5
+primeiros posts do usuário 1. Os valores são os registros retornados pela
+camada de dados, e as tags seguem change_events.tags_for_change, então
+escritas nos dados invalidam apenas os campos afetados. Os contadores são
+mantidos por campo (ex.: 'User.posts') para expor a taxa de acerto de cada um.
+"""
+from typing import Dict, Iterable, Tuple
+
+from tagged_cache import TaggedCache
+
+
+class ResolverCache(TaggedCache):
+    """Cache LRU + TTL de resultados de campos, com contadores por campo"""
+
+    def __init__(self, max_size: int = 4096, ttl: float = 60.0):
+        super().__init__(max_size, ttl)
+        # 'Tipo.campo' -> [hits, misses]
+        self._field_counters = {}
+
+    def lookup(self, type_name: str, field: str, args: Tuple):
+        """Resultado em cache para o campo e argumentos, ou None (valores None não são guardados)"""
+        value = self.get((type_name, field) + args)
+        with self._lock:
+            counters = self._field_counters.setdefault(f"{type_name}.{field}", [0, 0])
+            counters[0 if value is not None else 1] += 1
+        return value
+
+    def store(self, type_name: str, field: str, args: Tuple, value, tags: Iterable[str]):
+        if value is not None:
+            self.put((type_name, field) + args, value, tags)
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        with self._lock:
+            stats['fields'] = {
+                field: {'hits': hits, 'misses': misses,
+                        'hit_rate': hits / (hits + misses) if hits + misses else 0.0}
+                for field, (hits, misses) in sorted(self._field_counters.items())
+            }
+        return stats
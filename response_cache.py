@@ -0,0 +1,53 @@
+"""
+Cache de respostas HTTP do servidor REST (LRU + TTL, invalidação por tags)
+
+Cada entrada guarda o corpo JSON já serializado e seu ETag forte (hash do
+conteúdo). As entradas recebem tags (ex.: 'user:1', 'user:1:posts'); escritas
+na camada de dados invalidam as tags correspondentes, de modo que apenas as
+respostas afetadas são descartadas.
+"""
+import hashlib
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+from tagged_cache import TaggedCache
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    status: int
+    tags: Tuple[str, ...]
+
+
+def strong_etag(body: bytes) -> str:
+    """ETag forte: muda sempre que qualquer byte do corpo muda"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Verifica o cabeçalho If-None-Match (lista de ETags ou '*')
+    ETags de representações comprimidas ("<hash>-gzip") conferem com o ETag original
+    """
+    if not if_none_match:
+        return False
+    encoded_prefix = etag[:-1] + '-'
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate in ('*', etag) or (candidate.startswith(encoded_prefix)
+                                        and candidate.endswith('"')):
+            return True
+    return False
+
+
+class ResponseCache(TaggedCache):
+    """Cache de corpos de resposta serializados com ETag"""
+
+    def get(self, key) -> Optional[CachedResponse]:
+        return super().get(key)
+
+    def set(self, key, body: bytes, status: int = 200, tags: Iterable[str] = ()) -> CachedResponse:
+        """Guarda o corpo (se o cache estiver ativo) e retorna a entrada com o ETag"""
+        entry = CachedResponse(body, strong_etag(body), status, tuple(tags))
+        self.put(key, entry, entry.tags)
+        return entry
@@ -1,72 +1,83 @@
 """
 Servidor REST API usando Flask
 """
-from flask import Flask, jsonify
+import argparse
+
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-from data import (
-    get_user_by_id,
-    get_posts_by_user_id,
-    get_comments_by_post_id,
-    get_all_users,
-    USERS,
-    POSTS
+from data import get_all_users, load_generated, set_backend
+from data_generator import add_scale_arguments, backend_from_args, generator_from_args
+from compression import compressor_from_env, enable_compression
+from metrics import RequestMetrics, enable_metrics
+from profiler import enable_profiling, profiler_from_env
+from rest_views import (
+    cached_response,
+    get_post_comments,
+    get_user,
+    get_user_posts,
+    get_user_with_posts_and_comments,
+    get_users,
+    response_cache,
+    serializer
 )
+from serializers import SerializerJSONProvider
+from serving import add_serving_arguments, serve
 
 app = Flask(__name__)
 CORS(app)
+# jsonify e app.json.response usam o serializador de JSON_SERIALIZER (stdlib, orjson, auto)
+app.json = SerializerJSONProvider(app, serializer)
 
+# Métricas Prometheus em /metrics e Server-Timing (antes da compressão, para medi-la também)
+metrics = RequestMetrics()
+enable_metrics(app, metrics)
 
-@app.route('/api/users/<int:user_id>', methods=['GET'])
-def get_user(user_id):
-    """Retorna um usuário completo por ID"""
-    user = get_user_by_id(user_id)
-    if user:
-        return jsonify(user)
-    return jsonify({"error": "User not found"}), 404
-
+# Profiler por amostragem, pilhas por rota/operação (PROFILE=1 ou PROFILE_ADMIN=1)
+profiler = profiler_from_env()
+enable_profiling(app, profiler)
 
-@app.route('/api/users/<int:user_id>/posts', methods=['GET'])
-def get_user_posts(user_id):
-    """Retorna todos os posts de um usuário"""
-    posts = get_posts_by_user_id(user_id)
-    return jsonify(posts)
+# Compressão negociada por Accept-Encoding (COMPRESSION, COMPRESSION_MIN_SIZE, COMPRESSION_LEVEL)
+compressor = compressor_from_env()
+enable_compression(app, compressor)
 
 
-@app.route('/api/posts/<int:post_id>/comments', methods=['GET'])
-def get_post_comments(post_id):
-    """Retorna todos os comentários de um post"""
-    comments = get_comments_by_post_id(post_id)
-    return jsonify(comments)
+def cached_json(view):
+    """
+    Endpoint Flask de uma view de rest_views: resposta JSON do cache de
+    respostas, com ETag forte e 304 Not Modified (ver rest_views.cached_response)
+    """
+    def endpoint(**kwargs):
+        result = cached_response(view, request.path, request.args,
+                                 request.args.items(multi=True),
+                                 request.headers.get('If-None-Match'), kwargs)
+        if result.status == 304:
+            response = Response(status=304)
+        else:
+            response = Response(result.body, status=result.status, mimetype='application/json')
+        if result.etag:
+            response.headers['ETag'] = result.etag
+            response.headers['X-Cache'] = result.cache_status
+        return response
+    endpoint.__name__ = view.__name__
+    endpoint.__doc__ = view.__doc__
+    return endpoint
 
 
-@app.route('/api/users', methods=['GET'])
-def get_users():
-    """Retorna todos os usuários"""
-    return jsonify(get_all_users())
+# Mesmas rotas (e views) do rest_server_async.py
+app.add_url_rule('/api/users/<int:user_id>', view_func=cached_json(get_user), methods=['GET'])
+app.add_url_rule('/api/users/<int:user_id>/posts', view_func=cached_json(get_user_posts),
+                 methods=['GET'])
+app.add_url_rule('/api/posts/<int:post_id>/comments', view_func=cached_json(get_post_comments),
+                 methods=['GET'])
+app.add_url_rule('/api/users', view_func=cached_json(get_users), methods=['GET'])
+app.add_url_rule('/api/users/<int:user_id>/full',
+                 view_func=cached_json(get_user_with_posts_and_comments), methods=['GET'])
 
 
-@app.route('/api/users/<int:user_id>/full', methods=['GET'])
-def get_user_with_posts_and_comments(user_id):
-    """
-    Endpoint completo que retorna usuário com posts e comentários
-    Simula o cenário de dados aninhados do REST
-    """
-    user = get_user_by_id(user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-    
-    # Buscar posts do usuário
-    posts = get_posts_by_user_id(user_id, limit=5)
-    
-    # Para cada post, buscar comentários
-    for post in posts:
-        post['comments'] = get_comments_by_post_id(post['id'], limit=3)
-    
-    # Incluir posts no usuário
-    user_with_data = user.copy()
-    user_with_data['posts'] = posts
-    
-    return jsonify(user_with_data)
+@app.route('/api/cache', methods=['GET'])
+def response_cache_stats():
+    """Contadores do cache de respostas (hits, misses, evictions, invalidações)"""
+    return jsonify(response_cache.stats())
 
 
 @app.route('/health', methods=['GET'])
@@ -76,5 +87,13 @@ def health():
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servidor REST API")
+    add_scale_arguments(parser)
+    add_serving_arguments(parser)
+    args = parser.parse_args()
+    backend = backend_from_args(args)
+    set_backend(backend)
+    load_generated(generator_from_args(args))
+    print(f"Dataset: {args.scale}/{backend} ({len(get_all_users())} usuários)")
     print("Starting REST API server on http://localhost:5000")
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    serve(app, host='0.0.0.0', port=5000, workers=args.workers)
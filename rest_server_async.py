@@ -0,0 +1,77 @@
+"""
+Servidor REST API assíncrono (ASGI) usando Starlette
+Mesmas rotas do rest_server.py, para comparar execução síncrona vs assíncrona
+"""
+import argparse
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+import rest_views
+from asgi_support import JSONResponse, MIDDLEWARE, PROFILER_ROUTES, metrics_endpoint
+from data import get_all_users, load_generated, set_backend
+from data_generator import add_scale_arguments, backend_from_args, generator_from_args
+
+
+def cached_json(view):
+    """
+    Endpoint Starlette de uma view de rest_views: mesmo cache de respostas,
+    ETag e 304 do servidor Flask (ver rest_views.cached_response)
+    """
+    async def endpoint(request):
+        result = rest_views.cached_response(view, request.url.path, request.query_params,
+                                            request.query_params.multi_items(),
+                                            request.headers.get('if-none-match'),
+                                            request.path_params)
+        headers = {'ETag': result.etag, 'X-Cache': result.cache_status} if result.etag else None
+        if result.status == 304:
+            return Response(status_code=304, headers=headers)
+        return Response(result.body, status_code=result.status, headers=headers,
+                        media_type='application/json')
+    endpoint.__name__ = view.__name__
+    endpoint.__doc__ = view.__doc__
+    return endpoint
+
+
+async def response_cache_stats(request):
+    """Contadores do cache de respostas (hits, misses, evictions, invalidações)"""
+    return JSONResponse(rest_views.response_cache.stats())
+
+
+async def health(request):
+    """Health check endpoint"""
+    return JSONResponse({"status": "ok", "service": "REST API (async)"})
+
+
+app = Starlette(
+    routes=[
+        Route('/api/users/{user_id:int}', cached_json(rest_views.get_user), methods=['GET']),
+        Route('/api/users/{user_id:int}/posts', cached_json(rest_views.get_user_posts),
+              methods=['GET']),
+        Route('/api/posts/{post_id:int}/comments', cached_json(rest_views.get_post_comments),
+              methods=['GET']),
+        Route('/api/users', cached_json(rest_views.get_users), methods=['GET']),
+        Route('/api/users/{user_id:int}/full',
+              cached_json(rest_views.get_user_with_posts_and_comments), methods=['GET']),
+        Route('/api/cache', response_cache_stats, methods=['GET']),
+        Route('/metrics', metrics_endpoint, methods=['GET']),
+        Route('/health', health, methods=['GET']),
+        *PROFILER_ROUTES,
+    ],
+    middleware=MIDDLEWARE
+)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servidor REST API assíncrono (ASGI)")
+    parser.add_argument('--port', type=int, default=5002)
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+    backend = backend_from_args(args)
+    set_backend(backend)
+    load_generated(generator_from_args(args))
+    print(f"Dataset: {args.scale}/{backend} ({len(get_all_users())} usuários)")
+    print(f"Starting async REST API server on http://localhost:{args.port}")
+    uvicorn.run(app, host='0.0.0.0', port=args.port)
@@ -0,0 +1,234 @@
+"""
+Endpoints REST compartilhados pelos servidores síncrono (Flask) e assíncrono (ASGI)
+
+Cada view recebe os parâmetros de consulta (`args`, um mapeamento com .get,
+como request.args do Flask ou request.query_params do Starlette) e os
+parâmetros da rota, e retorna (dados, status, tags). cached_response serve o
+resultado a partir do cache de respostas, com ETag e 304, e cada servidor só
+converte o RestResponse na sua classe de resposta. Assim ?fields=/?include=,
+?limit=/?after=, ETags e o cache valem igualmente nas duas variantes.
+"""
+import os
+from itertools import islice
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from change_events import tags_for_change
+from data import (
+    add_change_listener,
+    get_all_users,
+    get_comments_by_post_id,
+    get_comments_by_post_ids,
+    get_posts_by_user_id,
+    get_posts_by_user_ids,
+    get_user_by_id
+)
+from pagination import PaginationError, decode_cursor, make_page, page_size
+from projection import ProjectionError, parse_projection
+from response_cache import ResponseCache, etag_matches
+from serializers import EncodedRecordCache, serializer_from_env
+
+# Serializador das respostas (JSON_SERIALIZER); o Flask usa o mesmo em app.json
+serializer = serializer_from_env()
+
+# Cache de respostas serializadas, opcional para não alterar a linha de base do experimento
+# (RESPONSE_CACHE_SIZE=0, o padrão, desativa; o ETag continua sendo enviado)
+response_cache = ResponseCache(int(os.environ.get('RESPONSE_CACHE_SIZE', 0)),
+                               float(os.environ.get('RESPONSE_CACHE_TTL', 60)))
+
+# Registros pré-serializados, reaproveitados entre respostas (RECORD_ENCODING_CACHE_SIZE=0 desativa)
+record_encodings = EncodedRecordCache(serializer,
+                                      int(os.environ.get('RECORD_ENCODING_CACHE_SIZE', 0)))
+
+# Busca em lote de cada relacionamento e tag de cache dos filhos de um pai
+RELATION_FETCHERS = {
+    'posts': (get_posts_by_user_ids, "user:{}:posts"),
+    'comments': (get_comments_by_post_ids, "post:{}:comments"),
+}
+
+# /full: até 5 posts por usuário e 3 comentários por post, com comentários embutidos
+FULL_LIMITS = {'posts': 5, 'comments': 3}
+FULL_INCLUDE = ('posts.comments',)
+
+
+def invalidate_cached_responses(action, table, record):
+    """Descarta as respostas afetadas por uma escrita na camada de dados"""
+    if action == 'clear':
+        response_cache.clear()
+    else:
+        response_cache.invalidate(tags_for_change(table, record))
+
+
+add_change_listener(invalidate_cached_responses)
+add_change_listener(record_encodings.invalidate_record)
+
+
+class RestResponse(NamedTuple):
+    body: bytes
+    status: int
+    # ETag e X-Cache (HIT/MISS); None nas respostas de erro, que não são guardadas
+    etag: Optional[str] = None
+    cache_status: Optional[str] = None
+
+
+def cached_response(view, path: str, args, query_items: Iterable[Tuple[str, str]],
+                    if_none_match: Optional[str], params: Dict) -> RestResponse:
+    """
+    Resposta da view a partir do cache de respostas, com ETag forte e 304 Not
+    Modified quando o If-None-Match do cliente confere. A chave é o caminho e
+    os parâmetros de consulta (`query_items`, pares na ordem recebida); apenas
+    respostas 200 são guardadas. Com o cache desativado, o ETag (hash do corpo)
+    só é calculado para requisições com If-None-Match, para não somar o hash
+    ao tempo de resposta da linha de base
+    """
+    key = (path, tuple(sorted(query_items)))
+    entry = response_cache.get(key) if response_cache.enabled else None
+    cache_status = 'HIT' if entry else 'MISS'
+    if entry is None:
+        try:
+            payload, status, tags = view(args, **params)
+        except (ProjectionError, PaginationError) as error:
+            return RestResponse(serializer.encode({"error": str(error)}), 400)
+        if status != 200 or not (response_cache.enabled or if_none_match):
+            return RestResponse(serializer.encode(payload), status)
+        entry = response_cache.set(key, serializer.encode(payload), status, tags)
+
+    if etag_matches(if_none_match, entry.etag):
+        return RestResponse(b'', 304, entry.etag, cache_status)
+    return RestResponse(entry.body, entry.status, entry.etag, cache_status)
+
+
+# Views: (args, parâmetros da rota) -> (dados, status, tags)
+def get_user(args, user_id):
+    """Retorna um usuário por ID (completo, ou conforme ?fields= / ?include=)"""
+    projection = request_projection(args, 'users')
+    user = get_user_by_id(user_id, projection.fetch_fields)
+    if user is None:
+        return {"error": "User not found"}, 404, ()
+    tags = [f"user:{user_id}"]
+    return embed_relations(projection, [user], tags)[0], 200, tags
+
+
+def get_user_posts(args, user_id):
+    """Retorna os posts de um usuário (todos, ou uma página com ?limit= / ?after=)"""
+    tags = [f"user:{user_id}:posts"]
+    posts = list_response(
+        args, request_projection(args, 'posts'), tags,
+        lambda limit, fields, after: get_posts_by_user_id(user_id, limit, fields, after))
+    return posts, 200, tags
+
+
+def get_post_comments(args, post_id):
+    """Retorna os comentários de um post (todos, ou uma página com ?limit= / ?after=)"""
+    tags = [f"post:{post_id}:comments"]
+    comments = list_response(
+        args, request_projection(args, 'comments'), tags,
+        lambda limit, fields, after: get_comments_by_post_id(post_id, limit, fields, after))
+    return comments, 200, tags
+
+
+def get_users(args):
+    """Retorna os usuários (todos, ou uma página com ?limit= / ?after=)"""
+    tags = ['users']
+    users = list_response(args, request_projection(args, 'users'), tags,
+                          lambda limit, fields, after: get_all_users(fields, limit, after))
+    return users, 200, tags
+
+
+def get_user_with_posts_and_comments(args, user_id):
+    """
+    Endpoint completo que retorna usuário com posts e comentários
+    Simula o cenário de dados aninhados do REST
+    """
+    tags = [f"user:{user_id}"]
+    user_with_data = build_user_with_posts_and_comments(
+        user_id, request_projection(args, 'users', FULL_INCLUDE), tags)
+    if user_with_data is None:
+        return {"error": "User not found"}, 404, ()
+    return user_with_data, 200, tags
+
+
+def request_projection(args, resource, default_include=()):
+    """Projeção pedida em ?fields= e ?include= (ProjectionError se houver campo desconhecido)"""
+    return parse_projection(resource, args.get('fields'), args.get('include'), default_include)
+
+
+def list_response(args, projection, tags, fetch):
+    """
+    Lista completa ou, se ?limit= ou ?after= foram informados, uma página com
+    envelope {"data": [...], "page": {"limit", "has_next", "next_cursor"}}
+    fetch(limit, fields, after) lê os registros na camada de dados
+    """
+    if 'limit' not in args and 'after' not in args:
+        return embed_relations(projection, fetch(None, projection.fetch_fields, None), tags)
+
+    limit = page_size(args.get('limit'))
+    after = decode_cursor(args.get('after'))
+    # O id do último registro vira o cursor, mesmo que não tenha sido pedido em ?fields=
+    projection = projection._replace(needs_id=True)
+    page = make_page(fetch(limit + 1, projection.fetch_fields, after), limit)
+    return {
+        'data': embed_relations(projection, page.records, tags),
+        'page': {'limit': limit, 'has_next': page.has_next, 'next_cursor': page.end_cursor}
+    }
+
+
+def embed_relations(projection, records, tags, limits=None):
+    """
+    Completa registros lidos com projection.fetch_fields: busca em lote os
+    relacionamentos pedidos (uma chamada por nível) e acrescenta suas tags
+
+    Registros lidos sem `fields` são os compartilhados da camada de dados e
+    são copiados; com `fields` a camada de dados já retornou dicionários novos,
+    que são completados no lugar (sem montar o registro completo antes).
+    Com o cache de pré-serialização ativo, os registros sem relacionamentos
+    são retornados já serializados (serializers.Encoded).
+    """
+    if not projection.relations:
+        if record_encodings.enabled:
+            return [record_encodings.encode(projection.resource, record, projection.fields)
+                    for record in records]
+        if not projection.hides_id:
+            return records
+    limits = limits or {}
+
+    parent_ids = [record['id'] for record in records]
+    embedded = {}
+    for name, child in projection.relations.items():
+        fetch, tag = RELATION_FETCHERS[name]
+        tags.extend(tag.format(parent_id) for parent_id in parent_ids)
+        children_by_parent = fetch(parent_ids, limits.get(name), fields=child.fetch_fields)
+        # Netos de todos os filhos em uma única chamada, depois reagrupados por pai
+        children = iter(embed_relations(
+            child, [record for group in children_by_parent.values() for record in group],
+            tags, limits))
+        embedded[name] = {parent_id: list(islice(children, len(group)))
+                          for parent_id, group in children_by_parent.items()}
+
+    result = []
+    for record in records:
+        if projection.fields is None:
+            record = dict(record)
+        for name, children in embedded.items():
+            record[name] = children[record['id']]
+        if projection.hides_id:
+            del record['id']
+        result.append(record)
+    return result
+
+
+def build_user_with_posts_and_comments(user_id, projection=None, tags=None):
+    """
+    Monta o usuário com até 5 posts e 3 comentários por post
+
+    Os registros da camada de dados são compartilhados entre requisições (e,
+    no backend de dicts, são os próprios dicts de data.POSTS), então a resposta
+    é uma projeção nova: nenhum registro de origem é alterado. `projection`
+    (ver projection.py) restringe campos e relacionamentos; `tags` recebe as
+    tags de cache dos posts e comentários lidos.
+    """
+    if projection is None:
+        projection = parse_projection('users', default_include=FULL_INCLUDE)
+    user = get_user_by_id(user_id, projection.fetch_fields)
+    if user is None:
+        return None
+    return embed_relations(projection, [user], [] if tags is None else tags, FULL_LIMITS)[0]
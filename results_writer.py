@@ -0,0 +1,129 @@
+"""
+Gravação incremental dos resultados do benchmark em JSONL
+
+Cada medição vira uma linha JSON com o mesmo esquema de dados_experimento.csv
+(run_id, api_type, query_scenario, response_time_ms, response_size_bytes),
+acrescentada ao arquivo assim que é produzida. O buffer é descarregado a cada
+`flush_every` registros ou `flush_interval` segundos, então uma queda do
+processo perde no máximo o último lote, e o arquivo pode ser analisado
+enquanto o benchmark ainda está rodando.
+"""
+import csv
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+FIELDS = ['run_id', 'api_type', 'query_scenario', 'response_time_ms', 'response_size_bytes']
+
+# Nomes usados em api_type, como em dados_experimento.csv
+API_TYPES = {'rest': 'REST', 'graphql': 'GraphQL'}
+
+
+def _recover(path: str) -> int:
+    """
+    Prepara um arquivo existente para continuar a gravação: descarta uma última
+    linha incompleta e retorna o run_id do último registro (0 se não houver)
+    """
+    last = 0
+    valid_bytes = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            last = json.loads(line)['run_id']
+            valid_bytes += len(line)
+    if valid_bytes < os.path.getsize(path):
+        os.truncate(path, valid_bytes)
+    return last
+
+
+class ResultsWriter:
+    """Escreve registros de medição em um arquivo JSONL (append-only, thread-safe)"""
+
+    def __init__(self, path: str, append: bool = False, flush_every: int = 100,
+                 flush_interval: float = 1.0, fsync: bool = False):
+        """
+        append=True continua um arquivo existente a partir do último run_id;
+        caso contrário o arquivo é recriado
+        fsync=True força a gravação em disco a cada flush (mais lento, mais seguro)
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._run_id = _recover(path) if append and os.path.exists(path) else 0
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def write(self, api_type: str, query_scenario: str, response_time_ms: float,
+              response_size_bytes: int, **extra) -> Dict:
+        """Acrescenta uma medição; campos extras são gravados após os do esquema"""
+        with self._lock:
+            self._run_id += 1
+            record = {
+                'run_id': self._run_id,
+                'api_type': API_TYPES.get(api_type, api_type),
+                'query_scenario': query_scenario,
+                'response_time_ms': response_time_ms,
+                'response_size_bytes': response_size_bytes,
+                **extra
+            }
+            self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+            self._pending += 1
+            if (self._pending >= self.flush_every or
+                    time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush()
+        return record
+
+    def _flush(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._flush()
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_results(path: str, scenario: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Lê os registros de um arquivo JSONL, um por vez
+    Uma última linha incompleta (processo interrompido durante a escrita) é ignorada
+    """
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            record = json.loads(line)
+            if scenario is None or record['query_scenario'] == scenario:
+                yield record
+
+
+def export_csv(jsonl_path: str, csv_path: str) -> int:
+    """Converte um arquivo JSONL para o formato CSV de dados_experimento.csv"""
+    count = 0
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for record in read_results(jsonl_path):
+            writer.writerow(record)
+            count += 1
+    return count
@@ -1,47 +1,106 @@
 """
 Script principal para executar o experimento completo
 """
+import argparse
 import subprocess
 import sys
 import time
 import os
+from typing import Dict, Optional
 
+import requests
 
-def run_servers():
-    """Inicia os servidores REST e GraphQL"""
-    print("Iniciando servidores...")
+from compression import DEFAULT_ENCODINGS
+from data_generator import SCALES
+
+# Tamanhos dos caches com --response-cache / --resolver-cache (os servidores os deixam desativados)
+RESPONSE_CACHE_SIZE = 1024
+RESOLVER_CACHE_SIZE = 4096
+# Saída dos servidores (um log por requisição): um arquivo por servidor, recriado a cada execução
+SERVER_LOG_DIR = 'logs'
+
+
+# Servidores por modo de execução: (script REST, porta REST, script GraphQL, porta GraphQL)
+SERVER_MODES = {
+    'sync': ("rest_server.py", 5000, "graphql_server.py", 5001),
+    'async': ("rest_server_async.py", 5002, "graphql_server_async.py", 5003),
+}
+
+
+def run_servers(scale: str = 'base', mode: str = 'sync', workers: int = None,
+                profile: bool = False, server_env: Optional[Dict[str, str]] = None):
+    """Inicia os servidores REST e GraphQL (server_env: variáveis extras, ex.: caches)"""
+    print(f"Iniciando servidores {mode} (dataset: {scale})...")
+    rest_script, rest_port, graphql_script, graphql_port = SERVER_MODES[mode]
+    server_args = ["--scale", scale]
+    env = {**os.environ, **(server_env or {})}
+    for name, value in (server_env or {}).items():
+        print(f"  {name}={value}")
+    if profile:
+        # O profiler é controlado por HTTP e cada worker tem o seu: um processo só
+        env['PROFILE_ADMIN'] = '1'
+        workers = 1
+    if workers and mode == 'sync':
+        server_args += ["--workers", str(workers)]
     
     # Obter o executável Python correto
     python_exe = sys.executable
     
-    # Iniciar servidor REST
-    rest_process = subprocess.Popen(
-        [python_exe, "rest_server.py"],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
-    
-    # Iniciar servidor GraphQL
-    graphql_process = subprocess.Popen(
-        [python_exe, "graphql_server.py"],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
+    # Iniciar servidores REST e GraphQL; a saída vai para arquivos, e não para
+    # pipes que ninguém lê (com o buffer cheio os servidores travariam)
+    os.makedirs(SERVER_LOG_DIR, exist_ok=True)
+    processes = []
+    for script in (rest_script, graphql_script):
+        log_path = os.path.join(SERVER_LOG_DIR, script.replace('.py', '.log'))
+        print(f"  Log de {script}: {log_path}")
+        with open(log_path, 'wb') as log:
+            processes.append(subprocess.Popen(
+                [python_exe, script] + server_args,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                env=env
+            ))
+    rest_process, graphql_process = processes
     
     # Aguardar servidores iniciarem
     print("Aguardando servidores iniciarem...")
-    time.sleep(3)
+    wait_for_servers([f"http://localhost:{rest_port}/health",
+                      f"http://localhost:{graphql_port}/health"])
     
     return rest_process, graphql_process
 
 
-def run_benchmark():
-    """Executa o benchmark"""
+def wait_for_servers(health_urls, timeout: float = 600.0):
+    """
+    Aguarda os endpoints de health check responderem
+    Datasets grandes podem levar vários minutos para serem gerados
+    """
+    deadline = time.time() + timeout
+    pending = list(health_urls)
+    while pending:
+        url = pending[0]
+        try:
+            if requests.get(url, timeout=1).ok:
+                pending.pop(0)
+                continue
+        except requests.RequestException:
+            pass
+        if time.time() > deadline:
+            raise TimeoutError(f"Servidor não respondeu a tempo: {url}")
+        time.sleep(0.5)
+
+
+def run_benchmark(mode: str = 'sync', profile: bool = False):
+    """Executa o benchmark (com profile: um profile de CPU por cenário)"""
     print("\nExecutando benchmark...")
+    _, rest_port, _, graphql_port = SERVER_MODES[mode]
     
     python_exe = sys.executable
     result = subprocess.run(
-        [python_exe, "benchmark_client.py"],
+        [python_exe, "benchmark_client.py",
+         "--rest-url", f"http://localhost:{rest_port}",
+         "--graphql-url", f"http://localhost:{graphql_port}/graphql"]
+        + (["--profile"] if profile else []),
         capture_output=True,
         text=True
     )
@@ -73,6 +132,38 @@ def run_analysis():
 
 def main():
     """Função principal"""
+    parser = argparse.ArgumentParser(description="Executa o experimento GraphQL vs REST")
+    parser.add_argument('--scale', default='base', choices=['base'] + list(SCALES),
+                        help="Faixa de dados carregada pelos servidores")
+    parser.add_argument('--server-mode', default='sync', choices=list(SERVER_MODES),
+                        help="Servidores Flask síncronos ou variantes ASGI assíncronas")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processos worker dos servidores síncronos (padrão: núcleos da CPU)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Coleta um profile de CPU por cenário em profiles/<cenário>/ "
+                             "(servidores com um único worker)")
+    parser.add_argument('--response-cache', action='store_true',
+                        help=f"Ativa o cache de respostas REST ({RESPONSE_CACHE_SIZE} entradas); "
+                             "por padrão toda requisição é recalculada")
+    parser.add_argument('--resolver-cache', action='store_true',
+                        help=f"Ativa o cache de resolvers GraphQL entre requisições "
+                             f"({RESOLVER_CACHE_SIZE} entradas)")
+    parser.add_argument('--compression', nargs='?', const=','.join(DEFAULT_ENCODINGS),
+                        default=None, metavar='ENCODINGS',
+                        help="Ativa a compressão das respostas (padrão da flag: "
+                             f"{','.join(DEFAULT_ENCODINGS)}); sem ela, latência e tamanhos "
+                             "são medidos sem compressão")
+    args = parser.parse_args()
+    
+    # Otimizações que mudam o que é medido ficam desativadas sem a flag correspondente
+    server_env = {}
+    if args.response_cache:
+        server_env['RESPONSE_CACHE_SIZE'] = str(RESPONSE_CACHE_SIZE)
+    if args.resolver_cache:
+        server_env['RESOLVER_CACHE_SIZE'] = str(RESOLVER_CACHE_SIZE)
+    if args.compression:
+        server_env['COMPRESSION'] = args.compression
+    
     print("="*70)
     print("EXPERIMENTO: GraphQL vs REST")
     print("="*70)
@@ -82,10 +173,11 @@ def main():
     
     try:
         # Passo 1: Iniciar servidores
-        rest_proc, graphql_proc = run_servers()
+        rest_proc, graphql_proc = run_servers(args.scale, args.server_mode, args.workers,
+                                              args.profile, server_env)
         
         # Passo 2: Executar benchmark
-        benchmark_success = run_benchmark()
+        benchmark_success = run_benchmark(args.server_mode, args.profile)
         
         if not benchmark_success:
             print("\n❌ Erro ao executar benchmark!")
@@ -103,8 +195,11 @@ def main():
         print("="*70)
         print("\nArquivos gerados:")
         print("  - results.json (dados brutos)")
+        print("  - results.jsonl (medições individuais, gravadas durante a execução)")
         print("  - analysis_results.png (gráficos)")
         print("  - summary_results.csv (tabela resumo)")
+        if args.profile:
+            print("  - profiles/<cenário>/*.folded (pilhas colapsadas por rota/operação)")
         
     except KeyboardInterrupt:
         print("\n\n⚠ Experimento interrompido pelo usuário")
@@ -115,12 +210,16 @@ def main():
     finally:
         # Encerrar servidores
         print("\nEncerrando servidores...")
-        if rest_proc:
-            rest_proc.terminate()
-        if graphql_proc:
-            graphql_proc.terminate()
-        
-        time.sleep(1)
+        # SIGTERM: os servidores terminam as requisições em andamento e encerram os workers
+        for proc in (rest_proc, graphql_proc):
+            if proc:
+                proc.terminate()
+        for proc in (rest_proc, graphql_proc):
+            if proc:
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
         print("✓ Servidores encerrados")
 
 
@@ -0,0 +1,179 @@
+"""
+Serialização JSON das respostas dos servidores
+
+Todos os serializadores produzem o mesmo formato do jsonify do Flask (chaves
+ordenadas, separadores compactos, quebra de linha final), então o tamanho das
+respostas não depende do serializador escolhido; a exceção são caracteres
+não ASCII, que o orjson grava em UTF-8 em vez de escapes \\uXXXX.
+
+- stdlib: módulo json da biblioteca padrão (padrão)
+- orjson: implementação nativa, opcional (pip install orjson)
+
+O serializador é escolhido por JSON_SERIALIZER ('stdlib', 'orjson' ou 'auto',
+que usa o orjson quando instalado). Registros imutáveis podem ser
+pré-serializados (EncodedRecordCache): a resposta é montada inserindo os
+bytes já prontos de cada registro, sem reprocessá-los.
+"""
+import json
+import os
+import re
+import secrets
+from typing import Dict, Iterable, Optional
+
+from flask.json.provider import DefaultJSONProvider
+
+from tagged_cache import TaggedCache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Encoded(bytes):
+    """JSON já serializado de um valor, inserido como está na resposta"""
+
+
+# Marcador que ocupa o lugar de cada valor Encoded durante a serialização; o
+# prefixo aleatório (por processo) evita colisão com strings reais dos dados
+_MARKER = f"\x00{secrets.token_hex(8)}:"
+_MARKER_PATTERN = re.compile(rb'"\\u0000' + _MARKER[1:].encode() + rb'(\d+)"')
+
+
+class Serializer:
+    """Serializador base: subclasses implementam dumps (bytes, sem quebra de linha)"""
+
+    name = ''
+
+    def dumps(self, obj) -> bytes:
+        raise NotImplementedError
+
+    def encode(self, obj) -> bytes:
+        """Corpo da resposta; valores Encoded são inseridos sem reserialização"""
+        try:
+            return self.dumps(obj) + b'\n'
+        except TypeError:
+            # Encoded (bytes) não é serializável: monta a resposta por partes
+            return self.encode_spliced(obj)
+
+    def encode_spliced(self, obj) -> bytes:
+        """
+        Serializa o esqueleto com marcadores no lugar dos valores Encoded (uma
+        única chamada ao codificador) e depois troca cada marcador pelos bytes
+        """
+        fragments = []
+        body = self.dumps(_substitute(obj, fragments))
+        return _MARKER_PATTERN.sub(lambda match: fragments[int(match.group(1))], body) + b'\n'
+
+
+class StdlibSerializer(Serializer):
+    name = 'stdlib'
+
+    def dumps(self, obj) -> bytes:
+        return json.dumps(obj, sort_keys=True, separators=(',', ':')).encode('ascii')
+
+
+class OrjsonSerializer(Serializer):
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ValueError("Serializador 'orjson' indisponível (pip install orjson)")
+        self._options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj) -> bytes:
+        return orjson.dumps(obj, option=self._options)
+
+    def encode(self, obj) -> bytes:
+        try:
+            return orjson.dumps(obj, option=self._options | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            return self.encode_spliced(obj)
+
+
+def _substitute(obj, fragments):
+    """Cópia do esqueleto de obj com marcadores no lugar dos valores Encoded"""
+    if type(obj) is Encoded:
+        fragments.append(obj)
+        return f"{_MARKER}{len(fragments) - 1}"
+    if isinstance(obj, dict):
+        return {key: _substitute(value, fragments) if isinstance(value, (dict, list, bytes)) else value
+                for key, value in obj.items()}
+    if isinstance(obj, list):
+        # Lista só de registros pré-serializados (o caso comum) vira um único fragmento
+        if obj and all(type(value) is Encoded for value in obj):
+            fragments.append(b'[' + b','.join(obj) + b']')
+            return f"{_MARKER}{len(fragments) - 1}"
+        return [_substitute(value, fragments) if isinstance(value, (dict, list, bytes)) else value
+                for value in obj]
+    return obj
+
+
+SERIALIZERS = {
+    'stdlib': StdlibSerializer,
+    'orjson': OrjsonSerializer,
+}
+
+
+def get_serializer(name: str = 'stdlib') -> Serializer:
+    """Instancia o serializador pelo nome ('auto' = orjson se instalado, senão stdlib)"""
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'stdlib'
+    if name not in SERIALIZERS:
+        raise ValueError(f"Serializador desconhecido: {name} (opções: auto, {', '.join(SERIALIZERS)})")
+    return SERIALIZERS[name]()
+
+
+def serializer_from_env() -> Serializer:
+    return get_serializer(os.environ.get('JSON_SERIALIZER', 'stdlib'))
+
+
+class SerializerJSONProvider(DefaultJSONProvider):
+    """Provider JSON do Flask (app.json) que usa um Serializer em jsonify e app.json.response"""
+
+    def __init__(self, app, serializer: Optional[Serializer] = None):
+        super().__init__(app)
+        self.serializer = serializer or serializer_from_env()
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self.serializer.dumps(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.serializer.encode(obj), mimetype=self.mimetype)
+
+
+class EncodedRecordCache(TaggedCache):
+    """
+    Registros já serializados, por (tabela, id, campos)
+
+    Cada entrada recebe a tag '<tabela>:<id>'; como os registros só mudam por
+    remoção e reinserção, invalidate_record (ouvinte de change_events) descarta
+    exatamente as versões afetadas. max_size=0 desativa a pré-serialização.
+    """
+
+    def __init__(self, serializer: Serializer, max_size: int = 0, ttl: float = 3600.0):
+        super().__init__(max_size, ttl)
+        self.serializer = serializer
+
+    def encode(self, table: str, record: Dict, fields: Optional[Iterable[str]] = None):
+        """
+        Versão Encoded do registro (campos `fields`, ou todos), ou o próprio
+        registro se o cache estiver desativado ou o id não tiver sido lido
+        """
+        if not self.enabled or 'id' not in record:
+            return record
+        fields = None if fields is None else tuple(fields)
+        key = (table, record['id'], fields)
+        encoded = self.get(key)
+        if encoded is None:
+            value = record if fields is None else {field: record[field] for field in fields}
+            encoded = Encoded(self.serializer.dumps(value))
+            self.put(key, encoded, [f"{table}:{record['id']}"])
+        return encoded
+
+    def invalidate_record(self, action, table, record):
+        if action == 'clear':
+            self.clear()
+        else:
+            self.invalidate([f"{table}:{record['id']}"])
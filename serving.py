@@ -0,0 +1,115 @@
+"""
+Modo de produção multi-processo para os servidores Flask
+
+O processo pai carrega o dataset, abre o socket e então cria N workers com
+fork. Os workers herdam os dados já carregados (copy-on-write) e aceitam
+conexões no mesmo socket. SIGTERM/SIGINT no pai encerram os workers de
+forma ordenada: cada worker termina a requisição em andamento e sai.
+As métricas de /metrics (metrics.enable_metrics) são somadas entre os
+workers por um diretório temporário de retratos, removido ao final.
+"""
+import argparse
+import gc
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+
+def add_serving_arguments(parser: argparse.ArgumentParser):
+    """Adiciona as opções de serviço (número de workers) a um parser"""
+    group = parser.add_argument_group('serving')
+    group.add_argument('--workers', type=int,
+                       default=int(os.environ.get('SERVER_WORKERS', os.cpu_count() or 1)),
+                       help="Processos worker (padrão: número de núcleos; 1 = processo único)")
+
+
+def serve(app, host: str, port: int, workers: int = 1):
+    """Serve a aplicação WSGI com `workers` processos (fork) compartilhando o socket"""
+    if workers <= 1 or not hasattr(os, 'fork'):
+        if workers > 1:
+            print("fork() indisponível nesta plataforma; usando processo único")
+        app.run(host=host, port=port, debug=False)
+        return
+
+    server = make_server(host, port, app, threaded=True)
+
+    request_metrics = app.extensions.get('request_metrics')
+    metrics_directory = None
+    if request_metrics is not None:
+        metrics_directory = tempfile.mkdtemp(prefix='metrics-')
+        request_metrics.share(metrics_directory)
+
+    # Objetos criados até aqui (dataset incluído) saem do alcance do GC,
+    # evitando que coletas nos workers toquem as páginas compartilhadas
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def spawn(worker_id):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(server, worker_id)
+        children[pid] = worker_id
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for worker_id in range(workers):
+        spawn(worker_id)
+    print(f"Serving on http://{host}:{port} with {workers} workers (pid {os.getpid()})")
+
+    # Reinicia workers que morrerem inesperadamente até receber o sinal de parada
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        worker_id = children.pop(pid, None)
+        if worker_id is not None and not stopping:
+            print(f"Worker {worker_id} (pid {pid}) saiu com status {status}; reiniciando")
+            time.sleep(0.1)
+            spawn(worker_id)
+
+    server.server_close()
+    if metrics_directory:
+        shutil.rmtree(metrics_directory, ignore_errors=True)
+    print("Todos os workers encerrados")
+
+
+def _run_worker(server, worker_id: int):
+    """Loop do processo worker; nunca retorna"""
+    def shutdown(signum, frame):
+        # shutdown() bloqueia até o loop terminar, então roda em outra thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    exit_code = 0
+    try:
+        server.serve_forever()
+    except Exception as e:
+        print(f"Worker {worker_id} falhou: {e}", file=sys.stderr)
+        exit_code = 1
+    finally:
+        sys.stdout.flush()
+        os._exit(exit_code)
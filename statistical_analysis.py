@@ -1,21 +1,34 @@
 """
 Análise Estatística dos resultados do experimento GraphQL vs REST
 """
+import argparse
 import json
 import numpy as np
 from scipy import stats
 import pandas as pd
 import matplotlib.pyplot as plt
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from bootstrap import bootstrap_difference, effect_sizes, nonparametric_tests
+from streaming_analysis import accumulate
 
 
 class StatisticalAnalysis:
     """Classe para análise estatística dos resultados"""
     
-    def __init__(self, results_file: str = "results.json"):
-        """Carrega os resultados do arquivo JSON"""
+    def __init__(self, results_file: str = "results.json", resamples: int = 10_000,
+                 seed: Optional[int] = 42, workers: Optional[int] = None):
+        """
+        Carrega os resultados do arquivo JSON
+        resamples/seed/workers configuram os intervalos bootstrap (resamples=0 desativa)
+        """
         with open(results_file, 'r') as f:
             self.data = json.load(f)
+        self.resamples = resamples
+        self.seed = seed
+        self.workers = workers
+        # Resultados por cenário dos JSONL já lidos (cenários de carga sem amostras)
+        self._streamed = {}
     
     def calculate_statistics(self, values: List[float]) -> Dict:
         """Calcula estatísticas descritivas"""
@@ -26,7 +39,10 @@ class StatisticalAnalysis:
             'min': np.min(values),
             'max': np.max(values),
             'q25': np.percentile(values, 25),
-            'q75': np.percentile(values, 75)
+            'q75': np.percentile(values, 75),
+            'p90': np.percentile(values, 90),
+            'p99': np.percentile(values, 99),
+            'p99.9': np.percentile(values, 99.9)
         }
     
     def perform_t_test(self, rest_values: List[float], graphql_values: List[float]) -> Dict:
@@ -34,10 +50,16 @@ class StatisticalAnalysis:
         Realiza teste t pareado (paired t-test)
         H0: μ_GraphQL >= μ_REST
         H1: μ_GraphQL < μ_REST
+        Amostras de tamanhos diferentes (modo de carga, em que cada API faz
+        quantas requisições couberem na duração) usam o teste t de Welch
         """
         # Teste t pareado (one-tailed)
         # alternative='less' testa se GraphQL < REST
-        t_statistic, p_value_two_tailed = stats.ttest_rel(graphql_values, rest_values)
+        if len(rest_values) == len(graphql_values):
+            t_statistic, p_value_two_tailed = stats.ttest_rel(graphql_values, rest_values)
+        else:
+            t_statistic, p_value_two_tailed = stats.ttest_ind(graphql_values, rest_values,
+                                                              equal_var=False)
         
         # Para teste unilateral (one-tailed), dividimos p-value por 2
         # Mas precisamos verificar se a diferença está na direção esperada
@@ -53,42 +75,183 @@ class StatisticalAnalysis:
             'significant_at_0.01': p_value < 0.01
         }
     
+    def robust_analysis(self, rest_values: List[float], graphql_values: List[float]) -> Dict:
+        """
+        Complementos ao teste t para distribuições assimétricas: IC bootstrap
+        das diferenças de média, p95 e p99, testes não paramétricos e tamanhos de efeito
+        """
+        result = {
+            'tests': nonparametric_tests(rest_values, graphql_values),
+            'effect_sizes': effect_sizes(rest_values, graphql_values),
+            'bootstrap': {}
+        }
+        if self.resamples:
+            for statistic in ('mean', 'p95', 'p99'):
+                result['bootstrap'][statistic] = bootstrap_difference(
+                    rest_values, graphql_values, statistic, self.resamples,
+                    seed=self.seed, workers=self.workers)
+        return result
+    
     def analyze_scenario(self, scenario_data: Dict) -> Dict:
         """Analisa um cenário específico"""
         scenario_name = scenario_data['scenario']
+        if 'times' not in scenario_data['rest']:
+            return self.analyze_streamed_scenario(scenario_data)
         
         rest_times = scenario_data['rest']['times']
         rest_sizes = scenario_data['rest']['sizes']
         graphql_times = scenario_data['graphql']['times']
         graphql_sizes = scenario_data['graphql']['sizes']
         
+        result = self.build_result(
+            scenario_name,
+            self.calculate_statistics(rest_times), self.calculate_statistics(graphql_times),
+            self.perform_t_test(rest_times, graphql_times),
+            self.calculate_statistics(rest_sizes), self.calculate_statistics(graphql_sizes),
+            self.perform_t_test(rest_sizes, graphql_sizes)
+        )
+        result['time']['robust'] = self.robust_analysis(rest_times, graphql_times)
+        if scenario_data['rest'].get('wire_sizes') and scenario_data['graphql'].get('wire_sizes'):
+            result['wire_size'] = self.wire_size_analysis(scenario_data)
+        server_time = self.server_time_analysis(scenario_data)
+        if server_time:
+            result['server_time'] = server_time
+        self.print_scenario(result)
+        return result
+    
+    def analyze_streamed_scenario(self, scenario_data: Dict) -> Dict:
+        """
+        Cenário de carga executado sem amostras (--no-samples): as medições
+        individuais vêm do JSONL gravado pelo benchmark (`stream`)
+        """
+        scenario_name = scenario_data['scenario']
+        path = scenario_data.get('stream')
+        if not path:
+            raise ValueError(f"Cenário '{scenario_name}' sem medições individuais: execute o "
+                             f"benchmark com as amostras ou com --stream")
+        if path not in self._streamed:
+            self._streamed[path] = {scenario.scenario: scenario
+                                    for scenario in accumulate(path)}
+        scenario = self._streamed[path].get(scenario_name)
+        if scenario is None:
+            raise ValueError(f"Cenário '{scenario_name}' não encontrado em {path}")
+        result = self.scenario_result(scenario)
+        self.print_scenario(result)
+        return result
+    
+    def scenario_result(self, scenario) -> Dict:
+        """Resultado de um cenário a partir dos acumuladores (streaming_analysis.ScenarioAccumulator)"""
+        return self.build_result(
+            scenario.scenario,
+            scenario.times['REST'].statistics(), scenario.times['GraphQL'].statistics(),
+            scenario.time_differences.t_test(),
+            scenario.sizes['REST'].statistics(), scenario.sizes['GraphQL'].statistics(),
+            scenario.size_differences.t_test()
+        )
+    
+    def wire_size_analysis(self, scenario_data: Dict) -> Dict:
+        """
+        Compara os bytes que trafegaram na rede (após a compressão negociada),
+        com a taxa de compressão e o tempo de compressão no servidor de cada API
+        """
+        rest, graphql = scenario_data['rest'], scenario_data['graphql']
+        rest_stats = self.calculate_statistics(rest['wire_sizes'])
+        graphql_stats = self.calculate_statistics(graphql['wire_sizes'])
+        return {
+            'rest': rest_stats,
+            'graphql': graphql_stats,
+            'reduction_percent': (rest_stats['mean'] - graphql_stats['mean']) / rest_stats['mean'] * 100,
+            'test': self.perform_t_test(rest['wire_sizes'], graphql['wire_sizes']),
+            'compression_ratio': {
+                'rest': np.sum(rest['wire_sizes']) / np.sum(rest['sizes']),
+                'graphql': np.sum(graphql['wire_sizes']) / np.sum(graphql['sizes'])
+            },
+            'compress_ms': {
+                'rest': float(np.mean(rest.get('compress_times') or [0.0])),
+                'graphql': float(np.mean(graphql.get('compress_times') or [0.0]))
+            }
+        }
+    
+    def server_time_analysis(self, scenario_data: Dict) -> Dict:
+        """
+        Separa o tempo no servidor (Server-Timing) do tempo de rede + cliente,
+        por API; medições sem o cabeçalho são ignoradas
+        """
+        analysis = {}
+        for api in ('rest', 'graphql'):
+            data = scenario_data[api]
+            pairs = [(total, server) for total, server in
+                     zip(data['times'], data.get('server_times') or []) if server is not None]
+            if len(pairs) < 2:
+                return {}
+            totals, servers = np.array(pairs).T
+            analysis[api] = {
+                'server': self.calculate_statistics(servers),
+                'overhead': self.calculate_statistics(totals - servers),
+                'server_fraction': float(np.sum(servers) / np.sum(totals))
+            }
+        return analysis
+    
+    def build_result(self, scenario_name: str, rest_time_stats: Dict, graphql_time_stats: Dict,
+                     time_test: Dict, rest_size_stats: Dict, graphql_size_stats: Dict,
+                     size_test: Dict) -> Dict:
+        """Monta o resultado de um cenário a partir das estatísticas e testes"""
+        time_improvement = ((rest_time_stats['mean'] - graphql_time_stats['mean']) / 
+                           rest_time_stats['mean'] * 100)
+        size_reduction = ((rest_size_stats['mean'] - graphql_size_stats['mean']) / 
+                         rest_size_stats['mean'] * 100)
+        return {
+            'scenario': scenario_name,
+            'time': {
+                'rest': rest_time_stats,
+                'graphql': graphql_time_stats,
+                'improvement_percent': time_improvement,
+                'test': time_test
+            },
+            'size': {
+                'rest': rest_size_stats,
+                'graphql': graphql_size_stats,
+                'reduction_percent': size_reduction,
+                'test': size_test
+            }
+        }
+    
+    def print_scenario(self, result: Dict):
+        """Imprime a análise de um cenário"""
+        scenario_name = result['scenario']
+        rest_time_stats = result['time']['rest']
+        graphql_time_stats = result['time']['graphql']
+        time_improvement = result['time']['improvement_percent']
+        time_test = result['time']['test']
+        rest_size_stats = result['size']['rest']
+        graphql_size_stats = result['size']['graphql']
+        size_reduction = result['size']['reduction_percent']
+        size_test = result['size']['test']
+        
         print(f"\n{'='*70}")
         print(f"ANÁLISE: {scenario_name.upper().replace('_', ' ')}")
         print(f"{'='*70}")
         
         # Análise de Tempo de Resposta
         print("\n--- TEMPO DE RESPOSTA (ms) ---")
-        rest_time_stats = self.calculate_statistics(rest_times)
-        graphql_time_stats = self.calculate_statistics(graphql_times)
-        
         print(f"\nREST:")
         print(f"  Média: {rest_time_stats['mean']:.2f} ms")
         print(f"  Mediana: {rest_time_stats['median']:.2f} ms")
         print(f"  Desvio Padrão: {rest_time_stats['std']:.2f} ms")
         print(f"  Min/Max: {rest_time_stats['min']:.2f} / {rest_time_stats['max']:.2f} ms")
+        print(f"  P90/P99/P99.9: {rest_time_stats['p90']:.2f} / {rest_time_stats['p99']:.2f} / "
+              f"{rest_time_stats['p99.9']:.2f} ms")
         
         print(f"\nGraphQL:")
         print(f"  Média: {graphql_time_stats['mean']:.2f} ms")
         print(f"  Mediana: {graphql_time_stats['median']:.2f} ms")
         print(f"  Desvio Padrão: {graphql_time_stats['std']:.2f} ms")
         print(f"  Min/Max: {graphql_time_stats['min']:.2f} / {graphql_time_stats['max']:.2f} ms")
+        print(f"  P90/P99/P99.9: {graphql_time_stats['p90']:.2f} / {graphql_time_stats['p99']:.2f} / "
+              f"{graphql_time_stats['p99.9']:.2f} ms")
         
-        time_improvement = ((rest_time_stats['mean'] - graphql_time_stats['mean']) / 
-                           rest_time_stats['mean'] * 100)
         print(f"\nMelhoria GraphQL: {time_improvement:+.2f}%")
         
-        # Teste estatístico para tempo
-        time_test = self.perform_t_test(rest_times, graphql_times)
         print(f"\nTeste t pareado (Tempo):")
         print(f"  t-statistic: {time_test['t_statistic']:.4f}")
         print(f"  p-value: {time_test['p_value']:.6f}")
@@ -100,10 +263,11 @@ class StatisticalAnalysis:
         else:
             print("  ✗ Não rejeitamos H0: Diferença não é estatisticamente significativa")
         
+        if 'robust' in result['time']:
+            self.print_robust(result['time']['robust'])
+        
         # Análise de Tamanho da Resposta
         print("\n--- TAMANHO DA RESPOSTA (bytes) ---")
-        rest_size_stats = self.calculate_statistics(rest_sizes)
-        graphql_size_stats = self.calculate_statistics(graphql_sizes)
         
         print(f"\nREST:")
         print(f"  Média: {rest_size_stats['mean']:.0f} bytes")
@@ -115,12 +279,8 @@ class StatisticalAnalysis:
         print(f"  Mediana: {graphql_size_stats['median']:.0f} bytes")
         print(f"  Desvio Padrão: {graphql_size_stats['std']:.2f} bytes")
         
-        size_reduction = ((rest_size_stats['mean'] - graphql_size_stats['mean']) / 
-                         rest_size_stats['mean'] * 100)
         print(f"\nRedução GraphQL: {size_reduction:+.2f}%")
         
-        # Teste estatístico para tamanho
-        size_test = self.perform_t_test(rest_sizes, graphql_sizes)
         print(f"\nTeste t pareado (Tamanho):")
         print(f"  t-statistic: {size_test['t_statistic']:.4f}")
         print(f"  p-value: {size_test['p_value']:.6f}")
@@ -132,21 +292,56 @@ class StatisticalAnalysis:
         else:
             print("  ✗ Não rejeitamos H0: Diferença não é estatisticamente significativa")
         
-        return {
-            'scenario': scenario_name,
-            'time': {
-                'rest': rest_time_stats,
-                'graphql': graphql_time_stats,
-                'improvement_percent': time_improvement,
-                'test': time_test
-            },
-            'size': {
-                'rest': rest_size_stats,
-                'graphql': graphql_size_stats,
-                'reduction_percent': size_reduction,
-                'test': size_test
-            }
-        }
+        if 'wire_size' in result:
+            self.print_wire_size(result['wire_size'])
+        if 'server_time' in result:
+            self.print_server_time(result['server_time'])
+    
+    def print_wire_size(self, wire: Dict):
+        """Imprime a comparação dos bytes na rede (corpo comprimido)"""
+        print("\n--- TAMANHO NA REDE (bytes, após compressão) ---")
+        for api, label in (('rest', 'REST'), ('graphql', 'GraphQL')):
+            print(f"\n{label}:")
+            print(f"  Média: {wire[api]['mean']:.0f} bytes")
+            print(f"  Taxa de compressão: {wire['compression_ratio'][api]:.3f}")
+            print(f"  Compressão no servidor: {wire['compress_ms'][api]:.3f} ms")
+        print(f"\nRedução GraphQL na rede: {wire['reduction_percent']:+.2f}%")
+        print(f"  p-value (teste t pareado): {wire['test']['p_value']:.6f}")
+    
+    def print_server_time(self, server_time: Dict):
+        """Imprime o tempo no servidor e o restante (rede + cliente) de cada API"""
+        print("\n--- TEMPO NO SERVIDOR vs REDE/CLIENTE (ms, Server-Timing) ---")
+        for api, label in (('rest', 'REST'), ('graphql', 'GraphQL')):
+            print(f"\n{label}:")
+            print(f"  Servidor: média {server_time[api]['server']['mean']:.3f}, "
+                  f"mediana {server_time[api]['server']['median']:.3f}")
+            print(f"  Rede + cliente: média {server_time[api]['overhead']['mean']:.3f}, "
+                  f"mediana {server_time[api]['overhead']['median']:.3f}")
+            print(f"  Fração no servidor: {server_time[api]['server_fraction'] * 100:.1f}%")
+    
+    def print_robust(self, robust: Dict):
+        """Imprime os intervalos bootstrap, testes não paramétricos e tamanhos de efeito"""
+        if robust['bootstrap']:
+            first = next(iter(robust['bootstrap'].values()))
+            print(f"\nIC bootstrap {first['confidence']*100:.0f}% da diferença GraphQL - REST "
+                  f"({first['resamples']} reamostragens):")
+            for statistic, interval in robust['bootstrap'].items():
+                print(f"  {statistic:>5}: {interval['difference']:+.2f} ms "
+                      f"[{interval['ci_low']:+.2f}, {interval['ci_high']:+.2f}]")
+        
+        print("\nTestes não paramétricos (H1: GraphQL < REST):")
+        for name, label in (('wilcoxon', 'Wilcoxon pareado'), ('mann_whitney', 'Mann-Whitney U')):
+            if name in robust['tests']:
+                test = robust['tests'][name]
+                print(f"  {label}: p-value {test['p_value']:.6f} "
+                      f"({'significante' if test['significant_at_0.05'] else 'não significante'} a α=0.05)")
+        
+        sizes = robust['effect_sizes']
+        print("\nTamanhos de efeito:")
+        if 'cohens_dz' in sizes:
+            print(f"  Cohen d_z: {sizes['cohens_dz']:+.3f}")
+        print(f"  Hedges g: {sizes['hedges_g']:+.3f}")
+        print(f"  Delta de Cliff: {sizes['cliffs_delta']:+.3f}")
     
     def generate_report(self) -> List[Dict]:
         """Gera relatório completo de todos os cenários"""
@@ -254,11 +449,54 @@ class StatisticalAnalysis:
         return df
 
 
+class StreamingAnalysis(StatisticalAnalysis):
+    """
+    Análise de arquivos de medições individuais (.jsonl do results_writer ou
+    .csv no formato de dados_experimento.csv) lidos em blocos, com memória
+    limitada: as estatísticas vêm de acumuladores online e histogramas
+    """
+    
+    def __init__(self, results_file: str = "results.jsonl", chunksize: int = 1_000_000):
+        self.results_file = results_file
+        self.chunksize = chunksize
+    
+    def generate_report(self) -> List[Dict]:
+        """Gera relatório completo de todos os cenários em uma passada pelo arquivo"""
+        print("\n" + "="*70)
+        print("RELATÓRIO DE ANÁLISE ESTATÍSTICA: GraphQL vs REST")
+        print("="*70)
+        
+        analysis_results = []
+        
+        for scenario in accumulate(self.results_file, self.chunksize):
+            result = self.scenario_result(scenario)
+            self.print_scenario(result)
+            analysis_results.append(result)
+        
+        return analysis_results
+
+
 def main():
     """Função principal"""
+    parser = argparse.ArgumentParser(description="Análise estatística GraphQL vs REST")
+    parser.add_argument('results_file', nargs='?', default="results.json",
+                        help="results.json do benchmark, ou medições individuais em .jsonl/.csv")
+    parser.add_argument('--chunksize', type=int, default=1_000_000,
+                        help="Linhas lidas por bloco nos arquivos .jsonl/.csv")
+    parser.add_argument('--resamples', type=int, default=10_000,
+                        help="Reamostragens bootstrap (0 desativa)")
+    parser.add_argument('--seed', type=int, default=42,
+                        help="Semente do bootstrap")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processos do bootstrap (padrão: automático)")
+    args = parser.parse_args()
+    
     print("Iniciando análise estatística...")
     
-    analysis = StatisticalAnalysis("results.json")
+    if args.results_file.endswith(('.jsonl', '.csv')):
+        analysis = StreamingAnalysis(args.results_file, args.chunksize)
+    else:
+        analysis = StatisticalAnalysis(args.results_file, args.resamples, args.seed, args.workers)
     results = analysis.generate_report()
     
     print("\n" + "="*70)
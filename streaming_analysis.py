@@ -0,0 +1,299 @@
+"""
+Acumuladores para análise out-of-core dos resultados do benchmark
+
+Os arquivos de medições (JSONL do results_writer ou CSV no formato de
+dados_experimento.csv) são lidos em blocos com pandas. Para cada cenário e
+API ficam em memória apenas acumuladores de tamanho fixo:
+- média/variância online (Welford), atualizadas por bloco e combinadas pela
+  fórmula de Chan et al.;
+- histogramas LatencyHistogram para mediana, quartis e percentis;
+- diferenças pareadas GraphQL - REST para o teste t pareado; as medições que
+  ainda esperam o par ficam em uma fila que, acima de `max_memory` valores,
+  continua em um arquivo temporário (no modo de carga o arquivo tem todas as
+  medições REST de um cenário antes das GraphQL).
+"""
+import io
+import math
+import tempfile
+from itertools import islice
+from typing import Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from latency_histogram import LatencyHistogram
+
+COLUMNS = ['run_id', 'api_type', 'query_scenario', 'response_time_ms', 'response_size_bytes']
+DTYPES = {'run_id': 'int64', 'api_type': 'category', 'query_scenario': 'category',
+          'response_time_ms': 'float64', 'response_size_bytes': 'float64'}
+# Valores sem par mantidos em memória por fila (8 bytes cada); o excedente vai para disco
+PAIRING_MEMORY = 1_000_000
+
+
+class RunningStats:
+    """Contagem, média, variância, mínimo e máximo calculados em uma passada"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def merge_moments(self, count: int, mean: float, m2: float, minimum: float, maximum: float):
+        """Combina com os momentos de outro conjunto de valores (Chan et al.)"""
+        if not count:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    def update(self, values: np.ndarray):
+        if len(values):
+            mean = values.mean()
+            self.merge_moments(len(values), mean, float(((values - mean) ** 2).sum()),
+                               values.min(), values.max())
+
+    def merge(self, other: 'RunningStats'):
+        self.merge_moments(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Variância amostral (ddof=1)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class ColumnAccumulator:
+    """Momentos e histograma de uma coluna de medições"""
+
+    def __init__(self, unit: float = 1.0):
+        # O histograma registra ms com resolução de µs; `unit` converte a coluna
+        # para essa escala (tamanhos em bytes usam unit=0.001: 1 byte = 1 µs)
+        self.unit = unit
+        self.stats = RunningStats()
+        self.histogram = LatencyHistogram()
+
+    def update(self, values: np.ndarray):
+        self.stats.update(values)
+        self.histogram.record_array(values * self.unit)
+
+    def merge(self, other: 'ColumnAccumulator'):
+        self.stats.merge(other.stats)
+        self.histogram.merge(other.histogram)
+        return self
+
+    def statistics(self) -> Dict:
+        """Mesmas chaves de StatisticalAnalysis.calculate_statistics"""
+        def percentile(percent):
+            return self.histogram.percentile(percent) / self.unit
+        return {
+            'mean': self.stats.mean,
+            'median': percentile(50),
+            'std': self.stats.std,
+            'min': self.stats.min,
+            'max': self.stats.max,
+            'q25': percentile(25),
+            'q75': percentile(75),
+            'p90': percentile(90),
+            'p99': percentile(99),
+            'p99.9': percentile(99.9),
+            'count': self.stats.count
+        }
+
+
+class SpillQueue:
+    """
+    Fila FIFO de float64 com no máximo `max_memory` valores em memória
+
+    Enquanto houver valores em disco, os novos também vão para o arquivo, de
+    modo que a memória sempre guarda os mais antigos; take lê em ordem.
+    """
+
+    def __init__(self, max_memory: int = PAIRING_MEMORY):
+        self.max_memory = max_memory
+        self._memory = np.empty(0)
+        self._file = None
+        self._read = 0
+        self._written = 0
+
+    def __len__(self) -> int:
+        return len(self._memory) + (self._written - self._read) // 8
+
+    @property
+    def spilled(self) -> int:
+        """Valores atualmente em disco"""
+        return (self._written - self._read) // 8
+
+    def extend(self, values: np.ndarray):
+        if not len(values):
+            return
+        if not self.spilled and len(self._memory) + len(values) <= self.max_memory:
+            self._memory = np.concatenate([self._memory, values])
+            return
+        if self._file is None:
+            self._file = tempfile.TemporaryFile()
+        self._file.seek(self._written)
+        self._file.write(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+        self._written = self._file.tell()
+
+    def take(self, count: int) -> np.ndarray:
+        """Remove e retorna os `count` valores mais antigos (count <= len(self))"""
+        parts = [self._memory[:count]]
+        self._memory = self._memory[count:]
+        missing = count - len(parts[0])
+        if missing:
+            self._file.seek(self._read)
+            parts.append(np.frombuffer(self._file.read(missing * 8), dtype=np.float64))
+            self._read += missing * 8
+            if self._read == self._written:
+                self._file.seek(0)
+                self._file.truncate()
+                self._read = self._written = 0
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class PairedDifferences:
+    """
+    Diferenças GraphQL - REST pareadas pela ordem das medições do cenário
+    (a i-ésima medição REST com a i-ésima GraphQL, como no teste t pareado)
+
+    As medições sem par aguardam em uma SpillQueue; só um dos lados tem
+    medições pendentes por vez.
+    """
+
+    def __init__(self, max_memory: int = PAIRING_MEMORY):
+        self.stats = RunningStats()
+        self._rest = SpillQueue(max_memory)
+        self._graphql = SpillQueue(max_memory)
+
+    def update(self, rest: np.ndarray, graphql: np.ndarray):
+        # Primeiro as pendentes do outro lado, depois as novas entre si
+        if len(self._rest) and len(graphql):
+            pairs = min(len(self._rest), len(graphql))
+            self.stats.update(graphql[:pairs] - self._rest.take(pairs))
+            graphql = graphql[pairs:]
+        if len(self._graphql) and len(rest):
+            pairs = min(len(self._graphql), len(rest))
+            self.stats.update(self._graphql.take(pairs) - rest[:pairs])
+            rest = rest[pairs:]
+        pairs = min(len(rest), len(graphql))
+        self.stats.update(graphql[:pairs] - rest[:pairs])
+        # Medições ainda sem par ficam para os próximos blocos
+        self._rest.extend(rest[pairs:])
+        self._graphql.extend(graphql[pairs:])
+
+    @property
+    def unpaired(self) -> int:
+        return len(self._rest) + len(self._graphql)
+
+    def close(self):
+        self._rest.close()
+        self._graphql.close()
+
+    def t_test(self) -> Dict:
+        """
+        Teste t pareado unilateral, com as chaves de StatisticalAnalysis.perform_t_test
+        H1: μ_GraphQL < μ_REST
+        """
+        n = self.stats.count
+        if n < 2:
+            t_statistic = math.nan
+        elif self.stats.m2 == 0:
+            # Diferenças constantes: t infinito no sentido da média (como o scipy)
+            t_statistic = math.copysign(math.inf, self.stats.mean) if self.stats.mean else math.nan
+        else:
+            t_statistic = self.stats.mean / (self.stats.std / math.sqrt(n))
+        p_value = float(stats.t.cdf(t_statistic, n - 1)) if n >= 2 else math.nan
+        return {
+            't_statistic': t_statistic,
+            'p_value': p_value,
+            'significant_at_0.05': p_value < 0.05,
+            'significant_at_0.01': p_value < 0.01,
+            'pairs': n
+        }
+
+
+def read_chunks(path: str, chunksize: int = 1_000_000) -> Iterator[pd.DataFrame]:
+    """Lê um arquivo de medições (.jsonl ou .csv) em blocos de `chunksize` linhas"""
+    if path.endswith('.csv'):
+        yield from pd.read_csv(path, usecols=COLUMNS, dtype=DTYPES, chunksize=chunksize)
+        return
+
+    with open(path, encoding='utf-8') as f:
+        while True:
+            lines = list(islice(f, chunksize))
+            if not lines:
+                return
+            # Última linha incompleta: o processo foi interrompido durante a escrita
+            if not lines[-1].endswith('\n'):
+                lines.pop()
+            if lines:
+                chunk = pd.read_json(io.StringIO(''.join(lines)), lines=True, dtype=False)
+                yield chunk[COLUMNS].astype(DTYPES)
+
+
+class ScenarioAccumulator:
+    """Acumuladores de um cenário: tempos e tamanhos por API e diferenças pareadas"""
+
+    def __init__(self, scenario: str, pairing_memory: int = PAIRING_MEMORY):
+        self.scenario = scenario
+        self.times = {'REST': ColumnAccumulator(), 'GraphQL': ColumnAccumulator()}
+        self.sizes = {'REST': ColumnAccumulator(0.001), 'GraphQL': ColumnAccumulator(0.001)}
+        self.time_differences = PairedDifferences(pairing_memory)
+        self.size_differences = PairedDifferences(pairing_memory)
+
+    def update(self, columns: Dict[str, Dict[str, np.ndarray]]):
+        """`columns[api_type]` contém os arrays 'response_time_ms' e 'response_size_bytes'"""
+        empty = np.empty(0)
+        for api, values in columns.items():
+            if api in self.times:
+                self.times[api].update(values['response_time_ms'])
+                self.sizes[api].update(values['response_size_bytes'])
+        rest = columns.get('REST', {})
+        graphql = columns.get('GraphQL', {})
+        self.time_differences.update(rest.get('response_time_ms', empty),
+                                     graphql.get('response_time_ms', empty))
+        self.size_differences.update(rest.get('response_size_bytes', empty),
+                                     graphql.get('response_size_bytes', empty))
+
+    def close(self):
+        """Libera as medições que ficaram sem par (e seus arquivos temporários)"""
+        self.time_differences.close()
+        self.size_differences.close()
+
+
+def accumulate(path: str, chunksize: int = 1_000_000,
+               pairing_memory: int = PAIRING_MEMORY) -> List[ScenarioAccumulator]:
+    """Percorre o arquivo uma vez e devolve os acumuladores por cenário, na ordem de aparição"""
+    scenarios = {}
+    for chunk in read_chunks(path, chunksize):
+        # Um único groupby separa todos os cenários e APIs do bloco
+        grouped = chunk.groupby(['query_scenario', 'api_type'], observed=True, sort=False)
+        columns = {}
+        for (scenario, api), index in grouped.indices.items():
+            columns.setdefault(scenario, {})[api] = {
+                'response_time_ms': chunk['response_time_ms'].to_numpy()[index],
+                'response_size_bytes': chunk['response_size_bytes'].to_numpy()[index]
+            }
+        for scenario, by_api in columns.items():
+            if scenario not in scenarios:
+                scenarios[scenario] = ScenarioAccumulator(scenario, pairing_memory)
+            scenarios[scenario].update(by_api)
+    for scenario in scenarios.values():
+        scenario.close()
+    return list(scenarios.values())
@@ -0,0 +1,91 @@
+"""
+Sessões HTTP com medição do tempo de conexão para o cliente de benchmark
+
+O TimedHTTPAdapter usa classes de conexão do urllib3 que cronometram o
+connect() (TCP e, em HTTPS, o handshake TLS). O tempo acumulado fica em uma
+variável por thread, de modo que cada medição pode separar o custo de abrir
+conexões do tempo de requisição/resposta.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+_connect_timer = threading.local()
+
+
+def reset_connect_time():
+    """Zera o tempo de conexão acumulado na thread atual"""
+    _connect_timer.seconds = 0.0
+
+
+def connect_time_ms() -> float:
+    """Tempo gasto abrindo conexões na thread atual desde o último reset (ms)"""
+    return getattr(_connect_timer, 'seconds', 0.0) * 1000
+
+
+class _TimedConnectionMixin:
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_timer.seconds = (getattr(_connect_timer, 'seconds', 0.0) +
+                                      time.perf_counter() - start)
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """Adapter do requests cujas conexões registram o tempo de connect()"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+
+def server_timing_ms(header: Optional[str]) -> Dict[str, float]:
+    """
+    Durações do cabeçalho Server-Timing em ms, por nome
+    ex.: 'compress;dur=0.15;desc="gzip"' -> {'compress': 0.15}
+    """
+    timings = {}
+    for metric in (header or '').split(','):
+        name, *params = [part.strip() for part in metric.split(';')]
+        for param in params:
+            if param.startswith('dur='):
+                try:
+                    timings[name] = timings.get(name, 0.0) + float(param[4:])
+                except ValueError:
+                    pass
+    return timings
+
+
+def create_session(pool_size: int = 10) -> requests.Session:
+    """Cria uma sessão com keep-alive e pool de conexões cronometradas"""
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
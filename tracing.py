@@ -0,0 +1,165 @@
+"""
+Rastreamento (tracing) da execução GraphQL por fase e por resolver
+
+Uma fração das requisições (TRACING_SAMPLE_RATE, padrão 0) é rastreada: o
+tempo de análise (parse), validação, execução e serialização e o tempo de
+cada resolver são agregados em histogramas por fase e por campo
+('Tipo.campo'), expostos em GET /graphql/tracing. As requisições que não
+são amostradas executam sem o middleware, sem custo adicional.
+
+Com o cabeçalho `X-GraphQL-Trace: 1` a requisição é sempre rastreada e a
+resposta recebe `extensions.tracing` no formato do Apollo Tracing (tempos em
+nanossegundos relativos ao início da requisição).
+"""
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from inspect import isawaitable
+from typing import Dict, List, Optional, Tuple
+
+from graphql import MiddlewareManager
+
+from latency_histogram import LatencyHistogram
+
+TRACING_VERSION = 1
+PHASES = ('parsing', 'validation', 'execution', 'serialization')
+TRACE_HEADER = 'X-GraphQL-Trace'
+
+
+def _histogram() -> LatencyHistogram:
+    # Resolvers levam de µs a segundos; 2 dígitos mantêm cada histograma pequeno
+    return LatencyHistogram(highest_us=60_000_000, significant_digits=2)
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='milliseconds')
+
+
+class Trace:
+    """Tempos de uma requisição: fases e resolvers (ns, relativos ao início)"""
+
+    def __init__(self):
+        self.start_time = time.time()
+        self._start_ns = time.perf_counter_ns()
+        self.duration_ns = None
+        self.phases: Dict[str, Tuple[int, int]] = {}
+        self.resolvers: List[Tuple[List, str, str, str, int, int]] = []
+
+    def record_phase(self, name: str, start_ns: int, end_ns: int):
+        """Registra uma fase a partir de instantes de time.perf_counter_ns()"""
+        self.phases[name] = (start_ns - self._start_ns, end_ns - start_ns)
+
+    def record_resolver(self, info, start_ns: int, end_ns: int):
+        self.resolvers.append((info.path.as_list(), info.parent_type.name, info.field_name,
+                               str(info.return_type), start_ns - self._start_ns,
+                               end_ns - start_ns))
+
+    def finish(self):
+        self.duration_ns = time.perf_counter_ns() - self._start_ns
+
+    def phase(self, name: str) -> Tuple[int, int]:
+        """(início, duração) da fase; fases que não ocorreram (ex.: documento em cache) valem 0"""
+        return self.phases.get(name, (0, 0))
+
+    def extension(self) -> Dict:
+        """Trace no formato do Apollo Tracing (extensions.tracing)"""
+        duration_ns = self.duration_ns
+        if duration_ns is None:
+            duration_ns = time.perf_counter_ns() - self._start_ns
+        tracing = {
+            'version': TRACING_VERSION,
+            'startTime': _iso(self.start_time),
+            'endTime': _iso(self.start_time + duration_ns / 1e9),
+            'duration': duration_ns,
+        }
+        for name in ('parsing', 'validation'):
+            start, duration = self.phase(name)
+            tracing[name] = {'startOffset': start, 'duration': duration}
+        tracing['execution'] = {'resolvers': [
+            {'path': path, 'parentType': parent_type, 'fieldName': field_name,
+             'returnType': return_type, 'startOffset': start, 'duration': duration}
+            for path, parent_type, field_name, return_type, start, duration in self.resolvers
+        ]}
+        return tracing
+
+
+class TracingMiddleware:
+    """Middleware do graphql-core que cronometra os resolvers do trace da requisição"""
+
+    def resolve(self, next_, root, info, **args):
+        trace = info.context.trace
+        start = time.perf_counter_ns()
+        result = next_(root, info, **args)
+        if isawaitable(result):
+            return self._resolve_async(result, trace, info, start)
+        trace.record_resolver(info, start, time.perf_counter_ns())
+        return result
+
+    async def _resolve_async(self, result, trace, info, start):
+        value = await result
+        trace.record_resolver(info, start, time.perf_counter_ns())
+        return value
+
+
+# Compartilhado: o MiddlewareManager guarda os resolvers já envolvidos
+tracing_middleware = MiddlewareManager(TracingMiddleware())
+
+
+class Tracer:
+    """Amostragem das requisições e histogramas agregados por fase e por campo"""
+
+    def __init__(self, sample_rate: float = 0.0):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"Taxa de amostragem deve estar entre 0 e 1: {sample_rate}")
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.sampled = 0
+        self.phases = {name: _histogram() for name in (*PHASES, 'total')}
+        self.fields: Dict[str, LatencyHistogram] = {}
+
+    def start(self, force: bool = False) -> Optional[Trace]:
+        """Trace para a requisição, se amostrada (ou forçada pelo cliente), senão None"""
+        with self._lock:
+            self.requests += 1
+        if force or (self.sample_rate and random.random() < self.sample_rate):
+            return Trace()
+        return None
+
+    def record(self, trace: Trace):
+        """Agrega um trace finalizado nos histogramas"""
+        if trace.duration_ns is None:
+            trace.finish()
+        with self._lock:
+            self.sampled += 1
+            for name in PHASES:
+                self.phases[name].record(trace.phase(name)[1] / 1e6)
+            self.phases['total'].record(trace.duration_ns / 1e6)
+            for _, parent_type, field_name, _, _, duration in trace.resolvers:
+                key = f"{parent_type}.{field_name}"
+                histogram = self.fields.get(key)
+                if histogram is None:
+                    histogram = self.fields[key] = _histogram()
+                histogram.record(duration / 1e6)
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.sampled = 0
+            self.phases = {name: _histogram() for name in (*PHASES, 'total')}
+            self.fields = {}
+
+    def stats(self) -> Dict:
+        """Resumo (ms) por fase e por campo, campos ordenados pelo tempo total"""
+        with self._lock:
+            fields = [{'field': key, **histogram.summary(),
+                       'total': histogram.mean * histogram.total_count}
+                      for key, histogram in self.fields.items()]
+            return {
+                'sample_rate': self.sample_rate,
+                'requests': self.requests,
+                'sampled': self.sampled,
+                'phases': {name: histogram.summary() for name, histogram in self.phases.items()},
+                'resolvers': sorted(fields, key=lambda field: -field['total']),
+            }